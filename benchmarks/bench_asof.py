@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_asof.py
+
+Put SPY's forward return onto a silver panel whose tickers trade on mixed
+calendars (a fifth on a non-US exchange calendar), three ways:
+
+ - pandas   the original per-ticker `grp.join(spy_df)` on exact dates
+ - exact    the NumPy exact-date searchsorted (src/panel.align) the gold
+            stage used until the as-of layer
+ - asof     one DuckDB ASOF JOIN against a sorted benchmark series (src/pit.py)
+
+Each is timed from silver.prices in DuckDB to aligned values in memory. "holes"
+counts rows left without a benchmark value although SPY has a bar on or
+before their date.
+
+    python benchmarks/bench_asof.py --tickers 500 5000 --days 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from etl.generate_gold import BENCHMARK_AGE, BENCHMARK_TKR, RETURN_DAYS, SRC_TABLE
+from src import labels, pit
+from src.panel import Panel, align, column
+
+FOREIGN_SHARE = 0.2  # tickers on a non-US calendar
+
+
+def synthetic_silver(con, n_tickers: int, n_days: int, seed: int = 0) -> int:
+    """silver.prices with US tickers missing every 20th weekday and foreign ones a shifted set."""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range("2018-01-01", periods=n_days).values.astype("datetime64[D]")
+    us = np.delete(days, np.s_[5::20])
+    foreign = np.delete(days, np.s_[11::20])
+    n_foreign = int(n_tickers * FOREIGN_SHARE)
+    tickers = [BENCHMARK_TKR] + [f"T{i:05d}" for i in range(n_tickers - 1 - n_foreign)] \
+        + [f"F{i:05d}.SS" for i in range(n_foreign)]
+    cal = [foreign if t.endswith(".SS") else us for t in tickers]
+    px = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, sum(map(len, cal)))))
+    silver = pa.table({
+        "date": np.concatenate(cal),
+        "ticker": np.repeat(tickers, [len(c) for c in cal]),
+        "adj_close": px,
+    })
+    con.execute("CREATE SCHEMA IF NOT EXISTS silver")
+    con.execute(f"CREATE OR REPLACE TABLE {SRC_TABLE} AS SELECT * FROM silver ORDER BY ticker, date")
+    return silver.num_rows
+
+
+def pandas_join(con) -> np.ndarray:
+    df = con.execute(f"SELECT date, ticker, adj_close FROM {SRC_TABLE} ORDER BY ticker, date").fetchdf()
+    spy_df = df[df["ticker"] == BENCHMARK_TKR].set_index("date")
+    spy_df = spy_df["adj_close"].pct_change(periods=RETURN_DAYS).shift(-RETURN_DAYS).rename("spy_fwd_ret")
+    out = []
+    for _, group in df.groupby("ticker"):
+        out.append(group.set_index("date").join(spy_df, how="left")["spy_fwd_ret"].to_numpy())
+    return np.concatenate(out)
+
+
+def exact_align(con) -> np.ndarray:
+    silver = con.execute(f"SELECT date, ticker, adj_close FROM {SRC_TABLE} ORDER BY ticker, date").fetch_arrow_table()
+    spy = con.execute(f"SELECT date, adj_close FROM {SRC_TABLE} WHERE ticker = ? ORDER BY date",
+                      [BENCHMARK_TKR]).fetch_arrow_table()
+    spy_adj = column(spy, "adj_close")
+    spy_fwd = Panel(np.zeros(len(spy_adj), dtype=np.int8)).pct_change(spy_adj, -RETURN_DAYS)
+    return align(silver.column("date").to_numpy(), spy.column("date").to_numpy(), spy_fwd)
+
+
+def asof_join(con) -> np.ndarray:
+    pit.create_series(con, "benchmark_bench", labels.forward_sql(
+        SRC_TABLE, {"fwd": RETURN_DAYS}, [BENCHMARK_TKR], "DATE '1900-01-01'"
+    ), key="benchmark", temp=True)
+    silver = con.execute(pit.asof_sql(
+        f"SELECT date, ticker, adj_close FROM {SRC_TABLE}", "benchmark_bench", {"fwd_log_fwd": "spy_fwd_log"},
+        max_age=BENCHMARK_AGE, order_by=["ticker", "date"],
+    )).fetch_arrow_table()
+    return np.expm1(column(silver, "spy_fwd_log"))
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - t0, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--days", type=int, default=1000, help="weekdays per calendar (~4 years)")
+    args = parser.parse_args(argv)
+
+    print(f"{'tickers':>8} {'rows':>11} {'method':>7} {'seconds':>8} {'holes':>9}")
+    for n in args.tickers:
+        con = duckdb.connect()
+        rows = synthetic_silver(con, n, args.days)
+        # rows where SPY's forward return is known as of their date
+        known = asof_join(con)
+        for name, fn in [("pandas", pandas_join), ("exact", exact_align), ("asof", asof_join)]:
+            seconds, values = timed(fn, con)
+            holes = int(np.sum(np.isnan(values) & ~np.isnan(known)))
+            print(f"{n:>8} {rows:>11,} {name:>7} {seconds:>8.2f} {holes:>9,}")
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_gold.py
+
+Compare the vectorised gold engine (etl/generate_gold.compute) with the old
+per-ticker pandas groupby loop on synthetic silver panels of growing size.
+The loop makes the original 12-month SPY labels only; the engine makes the
+whole label grid (src/labels.py).
+
+    python benchmarks/bench_gold.py --tickers 100 1000 5000 --days 3000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from etl.generate_gold import BENCHMARK_TKR, HIT_THRESHOLD, HORIZONS, RETURN_DAYS, compute
+from src.panel import Panel, align, column
+
+
+def synthetic_silver(n_tickers: int, n_days: int, seed: int = 0) -> pa.Table:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2013-01-01", periods=n_days).values.astype("datetime64[D]")
+    tickers = [BENCHMARK_TKR] + [f"T{i:05d}" for i in range(n_tickers - 1)]
+    px = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_tickers, n_days)), axis=1)).ravel()
+    return pa.table({
+        "date":      np.tile(dates, n_tickers),
+        "ticker":    np.repeat(tickers, n_days),
+        "open":      px, "high": px, "low": px, "close": px, "adj_close": px,
+        "volume":    np.full(n_tickers * n_days, 1000, dtype=np.int64),
+    }).sort_by([("ticker", "ascending"), ("date", "ascending")])
+
+
+def with_benchmark(silver: pa.Table) -> pa.Table:
+    """Add the benchmark columns the gold load attaches with its as-of joins (one calendar here)."""
+    spy = silver.filter(pc.equal(silver.column("ticker"), BENCHMARK_TKR))
+    log_spy = np.log(column(spy, "adj_close"))
+    spy_panel = Panel(np.zeros(len(log_spy), dtype=np.int8))
+    dates, spy_dates = silver.column("date").to_numpy(), spy.column("date").to_numpy()
+    silver = silver.append_column("benchmark", pa.array([BENCHMARK_TKR] * silver.num_rows))
+    for h, n in HORIZONS.items():
+        fwd = pa.array(align(dates, spy_dates, spy_panel.shift(log_spy, -n) - log_spy))
+        silver = silver.append_column(f"spy_fwd_log_{h}", fwd).append_column(f"bench_fwd_log_{h}", fwd)
+    return silver
+
+
+def legacy_loop(df: pd.DataFrame):
+    """The original generate_gold.py per-ticker loop."""
+    spy_df = df[df["ticker"] == BENCHMARK_TKR].copy()
+    spy_df.set_index("date", inplace=True)
+    spy_df["stock_fwd_ret"] = spy_df["adj_close"].pct_change(periods=RETURN_DAYS).shift(-RETURN_DAYS)
+    spy_df = spy_df[["stock_fwd_ret"]].rename(columns={"stock_fwd_ret": "spy_fwd_ret"})
+
+    features_list, labels_list = [], []
+    for tkr, group in df.groupby("ticker"):
+        if tkr == BENCHMARK_TKR:
+            continue
+        grp = group.copy()
+        grp.set_index("date", inplace=True)
+        grp["momentum_12m"] = grp["adj_close"].pct_change(periods=252)
+        grp["stock_fwd_ret"] = grp["adj_close"].pct_change(periods=RETURN_DAYS).shift(-RETURN_DAYS)
+        grp = grp.join(spy_df, how="left")
+        grp["excess_return_12m"] = grp["stock_fwd_ret"] - grp["spy_fwd_ret"]
+        grp["hit_2pct"] = (grp["excess_return_12m"] >= HIT_THRESHOLD).astype(int)
+        features_list.append(grp[["open", "high", "low", "close", "adj_close", "volume", "momentum_12m"]])
+        labels_list.append(grp[["ticker", "stock_fwd_ret", "spy_fwd_ret", "excess_return_12m", "hit_2pct"]])
+    return pd.concat(features_list).reset_index(), pd.concat(labels_list).reset_index()
+
+
+def timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--days", type=int, default=3000, help="trading days per ticker (~12 years)")
+    parser.add_argument("--legacy-max", type=int, default=5000, help="skip the loop above this many tickers")
+    args = parser.parse_args(argv)
+
+    print(f"{'tickers':>8} {'rows':>12} {'engine s':>10} {'loop s':>10} {'speed-up':>9}")
+    for n in args.tickers:
+        silver = with_benchmark(synthetic_silver(n, args.days))
+        t_engine = timed(compute, silver)
+
+        t_loop = float("nan")
+        if n <= args.legacy_max:
+            df = synthetic_silver(n, args.days).to_pandas()
+            t_loop = timed(legacy_loop, df)
+        print(f"{n:>8} {silver.num_rows:>12,} {t_engine:>10.2f} {t_loop:>10.2f} {t_loop / t_engine:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_loader.py
+
+Compare the old trainer load path (SELECT * → fetchdf → drop → second SELECT
+→ reset_index → NaN mask) with src.training_data.load_training_data, cold and
+from the .npy memmap cache. Each measurement runs in a fresh process so peak
+RSS is attributable to that path alone.
+
+    python benchmarks/bench_loader.py --tickers 500 2000 --days 3000
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import duckdb
+
+from benchmarks.bench_gold import synthetic_silver
+from etl import generate_gold
+from etl.generate_gold import BENCHMARK_TKR, FEATURES, PASSTHROUGH
+from src.feature_cache import FeatureCache
+from src.perf import Timer, peak_rss_mb
+from src.training_data import load_training_data
+
+
+def build_db(path: str, n_tickers: int, n_days: int):
+    con = duckdb.connect(path)
+    con.execute("SET enable_progress_bar=false")
+    con.register("synthetic", synthetic_silver(n_tickers, n_days))
+    con.execute("CREATE SCHEMA silver")
+    con.execute("CREATE TABLE silver.prices AS SELECT * FROM synthetic")
+    con.unregister("synthetic")
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_gold.run(con, full=True)
+    con.close()
+    return 0
+
+
+def legacy(db: str, workdir: str):
+    con = duckdb.connect(db, read_only=True)
+    df_feat = con.execute("SELECT * FROM gold.features ORDER BY ticker, date").fetchdf()
+    X = df_feat.drop(columns=["date", "ticker"])
+    y = con.execute("SELECT excess_return_12m FROM gold.labels ORDER BY ticker, date").fetchdf()["excess_return_12m"]
+    X = X.reset_index(drop=True)
+    y = y.reset_index(drop=True)
+    mask = ~(X.isna().any(axis=1) | y.isna())
+    X, y = X[mask], y[mask]
+    return len(X)
+
+
+def loader(db: str, workdir: str, npy: bool = False):
+    con = duckdb.connect(db, read_only=True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = load_training_data(
+            con, FEATURES, passthrough=PASSTHROUGH, exclude=[BENCHMARK_TKR],
+            cache=FeatureCache(os.path.join(workdir, "features")),
+            npy_cache=os.path.join(workdir, "npy") if npy else None,
+        )
+    return len(data.X)
+
+
+def _measure(fn, args, queue):
+    with Timer() as t:
+        rows = fn(*args)
+    queue.put((rows, t.elapsed, peak_rss_mb()))
+
+
+def measure(fn, *args):
+    """Run fn(*args) in a fresh process → (rows, seconds, peak RSS MiB)."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(fn, args, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--days", type=int, default=3000)
+    args = parser.parse_args(argv)
+
+    print(f"{'tickers':>8} {'path':<16} {'rows':>12} {'seconds':>8} {'peak MiB':>9}")
+    for n in args.tickers:
+        with tempfile.TemporaryDirectory() as workdir:
+            db = os.path.join(workdir, "bench.duckdb")
+            measure(build_db, db, n, args.days)  # keeps this process (and its children) small
+            measure(loader, db, workdir)        # warm the Parquet feature cache
+            measure(loader, db, workdir, True)  # write the .npy cache
+            for name, fn, extra in [
+                ("legacy fetchdf", legacy, ()),
+                ("loader", loader, ()),
+                ("loader + memmap", loader, (True,)),
+            ]:
+                rows, secs, rss = measure(fn, db, workdir, *extra)
+                print(f"{n:>8} {name:<16} {rows:>12,} {secs:>8.2f} {rss:>9,.0f}")
+
+
+if __name__ == "__main__":
+    main()
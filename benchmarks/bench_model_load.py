@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_model_load.py
+
+Cold-start model loading: the joblib pickles the trainers used to write
+against the registry's native artifacts (src/registry.py), for the
+Elastic-Net coefficients and a LightGBM booster.
+
+Each cold load runs in a fresh interpreter and is timed from before the
+first import to the first prediction, so library imports count. "warm" is a
+second load in the same process (the registry's in-process cache).
+
+    python benchmarks/bench_model_load.py --rounds 1000 --features 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import joblib
+import lightgbm as lgb
+import numpy as np
+from sklearn.linear_model import ElasticNet
+
+from src import registry
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+COLD = """
+import time; t0 = time.perf_counter()
+import sys; sys.path.insert(0, {root!r})
+import numpy as np
+{load}
+model.predict(np.zeros((1, {p}), dtype=np.float32))
+t1 = time.perf_counter()
+{load}
+print(t1 - t0, time.perf_counter() - t1)
+"""
+PICKLE   = "import joblib; model = joblib.load({path!r})"
+REGISTRY = "from src.models import load_model; model = load_model({path!r})"
+
+
+def fit(n_rows: int, n_features: int, rounds: int):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    y = X[:, 0] - 0.5 * X[:, 1] + 0.1 * rng.normal(size=n_rows)
+    enet = ElasticNet(alpha=0.01).fit(X, y)
+    booster = lgb.train({"objective": "regression", "verbosity": -1, "num_leaves": 63},
+                        lgb.Dataset(X, y), rounds)
+    return {"elasticnet": enet, "lightgbm": booster}
+
+
+def cold(load: str, path: str, p: int):
+    out = subprocess.run([sys.executable, "-c", COLD.format(root=ROOT, load=load.format(path=path), p=p)],
+                         capture_output=True, text=True, check=True, cwd=ROOT)
+    return map(float, out.stdout.split())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--features", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    print(f"{'model':>10} {'format':>8} {'bytes':>11} {'cold s':>8} {'warm ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, model in fit(args.rows, args.features, args.rounds).items():
+            pkl = os.path.join(tmp, f"{name}.pkl")
+            joblib.dump(model, pkl)
+            registry.save(name, model, root=tmp)
+            pointer = registry.current_path(name, tmp)
+            native = sum(os.path.getsize(os.path.join(registry.version_dir(pointer), f))
+                         for f in os.listdir(registry.version_dir(pointer)))
+            for fmt, load, path, size in [("pickle", PICKLE, pkl, os.path.getsize(pkl)),
+                                          ("native", REGISTRY, pointer, native)]:
+                seconds, warm = cold(load, path, args.features)
+                print(f"{name:>10} {fmt:>8} {size:>11,} {seconds:>8.3f} {warm * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+benchmarks/bench_stages.py
+
+Scaling benchmark for every ETL and training stage on synthetic universes
+(src/synthetic.py): raw → bronze → silver → gold → train → score.
+
+Each universe size gets a fresh DuckDB file and working directory (models,
+caches). Every stage then runs in its own spawned process, so wall time and
+peak RSS are attributable to that stage alone.
+
+Results are written to benchmarks/results/stages-<timestamp>.json and
+compared with benchmarks/baselines/stages.json. A stage more than
+TOLERANCE slower (and at least MIN_DELTA_S seconds slower) or bigger than its
+baseline is flagged as a regression. `--save-baseline` replaces the baseline
+and `--check` exits non-zero on any regression. The committed baseline is the
+default grid (100 and 500 tickers × 1,000 days); rerun with --save-baseline on
+the machine that does the comparing.
+
+    python benchmarks/bench_stages.py --tickers 500 5000 20000 --days 3000
+    python benchmarks/bench_stages.py --tickers 500 --stages bronze silver gold --check
+    PUNTA_MEMORY_LIMIT=1GB python benchmarks/bench_stages.py --tickers 500 2000 --stages gold
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import multiprocessing as mp
+import os
+import platform
+import sys
+import tempfile
+import warnings
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import duckdb
+
+from src import memory
+from src.perf import Timer, peak_rss_mb
+
+BASELINE     = os.path.join(os.path.dirname(__file__), "baselines", "stages.json")
+RESULTS_DIR  = os.path.join(os.path.dirname(__file__), "results")
+STAGES       = ["raw", "bronze", "silver", "gold", "train_elasticnet", "train_lightgbm", "score"]
+BENCH_TRIALS = 2     # Optuna trials for train_lightgbm
+TOLERANCE    = 0.25  # relative slack before a stage counts as a regression
+MIN_DELTA_S  = 0.5   # ignore timing noise below this many seconds
+
+
+def labelled_rows(con) -> int:
+    return con.execute("SELECT COUNT(*) FROM gold.labels WHERE excess_return_12m IS NOT NULL").fetchone()[0]
+
+
+def run_stage(stage: str, con, n_tickers: int, n_days: int, seed: int) -> int:
+    """Run one stage on `con`; returns the rows it wrote or trained on."""
+    from etl import bronze_transform, generate_gold, score, silver_transform, train_baseline, train_lightgbm
+    from src import synthetic
+
+    if stage == "raw":
+        return synthetic.write_raw_prices(con, n_tickers, n_days, seed)
+    if stage == "bronze":
+        return bronze_transform.run(con)
+    if stage == "silver":
+        return silver_transform.run(con)
+    if stage == "gold":
+        con.execute("CREATE SCHEMA IF NOT EXISTS gold")
+        return sum(generate_gold.run(con))
+    if stage == "train_elasticnet":
+        train_baseline.run(con)
+        return labelled_rows(con)
+    if stage == "train_lightgbm":
+        train_lightgbm.run(con, trials=BENCH_TRIALS, workers=1, fresh=True)
+        return labelled_rows(con)
+    if stage == "score":
+        return sum(score.run(con).values())
+    raise ValueError(f"unknown stage {stage!r}")
+
+
+def _measure(stage, workdir, n_tickers, n_days, seed, queue):
+    os.chdir(workdir)  # models/ and data/cache/ land in the scratch directory
+    con = duckdb.connect("bench.duckdb")
+    memory.configure(con)  # PUNTA_MEMORY_LIMIT, spilling to the scratch directory
+    con.execute("SET enable_progress_bar=false")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()), \
+                warnings.catch_warnings(), Timer() as t:
+            warnings.simplefilter("ignore")
+            rows = run_stage(stage, con, n_tickers, n_days, seed)
+        queue.put((rows, t.elapsed, peak_rss_mb(), None))
+    except Exception as exc:
+        queue.put((0, 0.0, peak_rss_mb(), repr(exc)))
+    finally:
+        con.close()
+
+
+def measure(stage: str, workdir: str, n_tickers: int, n_days: int, seed: int):
+    """Run one stage in a fresh process → (rows, seconds, peak RSS MiB, error)."""
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_measure, args=(stage, workdir, n_tickers, n_days, seed, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def key(r: dict) -> str:
+    return f"{r['tickers']}x{r['days']}:{r['stage']}"
+
+
+def regressions(results: list, baseline: list) -> dict:
+    """{key: reason} for results noticeably worse than their baseline."""
+    base = {key(b): b for b in baseline}
+    out = {}
+    for r in results:
+        b = base.get(key(r))
+        if b is None or r["error"]:
+            continue
+        reasons = []
+        if r["seconds"] > b["seconds"] * (1 + TOLERANCE) and r["seconds"] - b["seconds"] > MIN_DELTA_S:
+            reasons.append(f"time {b['seconds']:.2f}s → {r['seconds']:.2f}s")
+        if r["peak_rss_mb"] > b["peak_rss_mb"] * (1 + TOLERANCE):
+            reasons.append(f"RSS {b['peak_rss_mb']:,.0f} → {r['peak_rss_mb']:,.0f} MiB")
+        if reasons:
+            out[key(r)] = ", ".join(reasons)
+    return out
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "duckdb": duckdb.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, nargs="+", default=[100, 500])
+    parser.add_argument("--days", type=int, default=1000, help="trading days per ticker (~4 years)")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES,
+                        help="stages to time (later stages need the earlier ones)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any stage regressed")
+    args = parser.parse_args(argv)
+
+    baseline = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = []
+    print(f"{'tickers':>8} {'stage':<17} {'rows':>12} {'seconds':>8} {'rows/s':>11} {'peak MiB':>9}")
+    for n in args.tickers:
+        with tempfile.TemporaryDirectory() as workdir:
+            # earlier stages always run: later ones read their tables
+            upto = max(STAGES.index(s) for s in args.stages)
+            for stage in STAGES[:upto + 1]:
+                rows, secs, rss, error = measure(stage, workdir, n, args.days, args.seed)
+                if stage not in args.stages:
+                    continue
+                r = {"tickers": n, "days": args.days, "stage": stage, "rows": rows,
+                     "seconds": round(secs, 3), "peak_rss_mb": round(rss, 1), "error": error}
+                results.append(r)
+                rate = f"{rows / secs:>11,.0f}" if secs > 0 else f"{'-':>11}"
+                print(f"{n:>8} {stage:<17} {rows:>12,} {secs:>8.2f} {rate} {rss:>9,.0f}"
+                      + (f"  ❌ {error}" if error else ""))
+
+    flagged = regressions(results, baseline)
+    for k, reason in flagged.items():
+        print(f"⚠️  regression {k}: {reason}")
+    if baseline and not flagged:
+        print("✅ no regressions against the baseline")
+
+    report = {"created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+              "environment": environment(), "results": results}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"stages-{datetime.datetime.now():%Y%m%dT%H%M%S}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 results saved to {path}")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 baseline saved to {args.baseline}")
+
+    if args.check and (flagged or any(r["error"] for r in results)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
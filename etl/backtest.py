@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+etl/backtest.py
+
+Walk-forward back-test (charter Stage 4) of ElasticNet and LightGBM on
+gold.features → gold.labels (see src/backtest.py for the engine).
+
+At every rebalance date each model is trained on all rows whose 12-month
+label was realised before that date (purge + embargo). It then scores that
+day's cross-section, holds the top TOP_FRACTION equal-weighted, and is judged
+on their realised excess return. Results are appended to backtest.steps (one
+row per model and rebalance date) and backtest.runs (one summary row per
+model: alpha, hit-rate, IR, IC, annual turnover).
+"""
+
+import argparse
+import datetime
+import os
+import duckdb
+
+from etl.generate_gold import BENCHMARK_TKR, FEATURES, HIT_THRESHOLD, PASSTHROUGH, RETURN_DAYS
+from src import backtest, incremental, perf
+from src.perf import Timer
+from src.training_data import NPY_CACHE, load_training_data
+
+# ─── Config ───────────────────────────────────────────────────────────────────────
+DB_PATH        = os.path.join("data", "punta.duckdb")
+MODELS         = ["elasticnet", "lightgbm"]
+REBALANCE      = "M"          # "M" monthly or "W" weekly
+PURGE_DAYS     = RETURN_DAYS  # label horizon in trading days
+EMBARGO_DAYS   = 21           # extra gap on top of the purge
+MIN_TRAIN_ROWS = 1_000
+TOP_FRACTION   = 0.2
+N_WORKERS      = min(4, os.cpu_count() or 1)
+CONFIG         = {
+    "alpha": 0.1,
+    "l1_ratio": 0.5,
+    "lgb_params": {
+        "objective": "regression",
+        "verbosity": -1,
+        "learning_rate": 0.05,
+        "num_leaves": 31,
+        "min_data_in_leaf": 20,
+    },
+    "initial_rounds": 200,
+    "step_rounds": 20,
+    "top_fraction": TOP_FRACTION,
+    "hit_threshold": HIT_THRESHOLD,
+}
+PERIODS_PER_YEAR = {"M": 12, "W": 52}
+
+
+def create_tables(con):
+    con.execute("CREATE SCHEMA IF NOT EXISTS backtest")
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS backtest.runs (
+            run_id          VARCHAR,
+            model           VARCHAR,
+            started_at      TIMESTAMP,
+            rebalance       VARCHAR,
+            purge_days      INTEGER,
+            embargo_days    INTEGER,
+            steps           INTEGER,
+            alpha           DOUBLE,
+            hit_rate        DOUBLE,
+            ir              DOUBLE,
+            ic              DOUBLE,
+            annual_turnover DOUBLE,
+            seconds         DOUBLE,
+            PRIMARY KEY (run_id, model)
+        )
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS backtest.steps (
+            run_id         VARCHAR,
+            model          VARCHAR,
+            rebalance_date DATE,
+            train_rows     BIGINT,
+            universe       INTEGER,
+            selected       INTEGER,
+            alpha          DOUBLE,
+            hit_rate       DOUBLE,
+            ic             DOUBLE,
+            turnover       DOUBLE,
+            PRIMARY KEY (run_id, model, rebalance_date)
+        )
+    """)
+
+
+@perf.instrument("backtest")
+def run(con, models=MODELS, rebalance: str = REBALANCE, embargo: int = EMBARGO_DAYS,
+        workers: int = N_WORKERS):
+    data = load_training_data(
+        con, FEATURES, passthrough=PASSTHROUGH, exclude=[BENCHMARK_TKR], npy_cache=NPY_CACHE
+    )
+    perf.current().rows(rows_in=len(data.X))
+    steps = backtest.make_grid(data.dates, rebalance, PURGE_DAYS, embargo, MIN_TRAIN_ROWS)
+    if not steps:
+        print("⚠️  not enough labelled history for a single walk-forward step")
+        return
+    print(f"🚶 {len(steps)} {rebalance} steps · {steps[0].rebalance} → {steps[-1].rebalance} "
+          f"· {workers} worker(s)")
+
+    started = datetime.datetime.now()
+    run_id = started.strftime("%Y%m%dT%H%M%S")
+    with Timer() as t:
+        results = backtest.run(data.X, data.y, data.tickers, steps, models, CONFIG, workers)
+
+    create_tables(con)
+    with incremental.transaction(con):
+        for model, rows in results.items():
+            perf.current().rows(rows_out=len(rows))
+            summary = backtest.summarise(rows, PERIODS_PER_YEAR[rebalance])
+            con.executemany(
+                "INSERT INTO backtest.steps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, model, str(r["rebalance_date"]), r["train_rows"], r["universe"], r["selected"],
+                  r["alpha"], r["hit_rate"], r["ic"], r["turnover"]) for r in rows],
+            )
+            con.execute(
+                "INSERT INTO backtest.runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [run_id, model, started, rebalance, PURGE_DAYS, embargo, summary["steps"],
+                 summary["alpha"], summary["hit_rate"], summary["ir"], summary["ic"],
+                 summary["annual_turnover"], t.elapsed],
+            )
+            print(f"✅ {model:<10} α={summary['alpha']:+.4f} · hit={summary['hit_rate']:.1%} "
+                  f"· IR={summary['ir']:.2f} · IC={summary['ic']:.3f} "
+                  f"· turnover={summary['annual_turnover']:.0%}/yr")
+    print(f"💾 back-test {run_id} written to backtest.runs / backtest.steps in {t.elapsed:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward back-test")
+    parser.add_argument("--models", nargs="+", default=MODELS, choices=MODELS)
+    parser.add_argument("--rebalance", default=REBALANCE, choices=sorted(PERIODS_PER_YEAR))
+    parser.add_argument("--embargo", type=int, default=EMBARGO_DAYS)
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    run(con, args.models, args.rebalance, args.embargo, args.workers)
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,48 +6,86 @@ Clean raw.prices into bronze.prices:
  - enforce types
  - remove duplicates
  - drop rows with volume<=0 or price<=0
+
+Only (ticker, date) partitions that are new or changed since the last run are
+processed and upserted on the (ticker, date) key; --full rebuilds the table.
 """
 
-import duckdb
+import argparse
 import os
 
-DB_PATH = os.path.join("data", "punta.duckdb")
-
-# Connect & ensure schema
-con = duckdb.connect(DB_PATH)
-con.execute("CREATE SCHEMA IF NOT EXISTS bronze")
-
-# Count raw rows
-raw_count = con.execute("SELECT COUNT(*) FROM raw.prices").fetchone()[0]
-print(f"🔍 raw.prices row count: {raw_count}")
-
-# Drop old bronze.prices
-con.execute("DROP TABLE IF EXISTS bronze.prices")
-
-# Create bronze.prices with cleaning
-con.execute("""
-CREATE TABLE bronze.prices AS
-SELECT
-  CAST(date       AS DATE)    AS date,
-  CAST(open       AS DOUBLE)  AS open,
-  CAST(high       AS DOUBLE)  AS high,
-  CAST(low        AS DOUBLE)  AS low,
-  CAST(close      AS DOUBLE)  AS close,
-  CAST(adj_close  AS DOUBLE)  AS adj_close,
-  CAST(volume     AS BIGINT)  AS volume,
-  CAST(ticker     AS VARCHAR) AS ticker
-FROM raw.prices
-WHERE volume > 0
-  AND close  > 0
-  AND open   > 0
-  AND high   > 0
-  AND low    > 0
-QUALIFY ROW_NUMBER() OVER (
-    PARTITION BY ticker, date
-    ORDER BY date
-) = 1
-""")
-
-# Count bronze rows
-bronze_count = con.execute("SELECT COUNT(*) FROM bronze.prices").fetchone()[0]
-print(f"✅ bronze.prices row count: {bronze_count}")
+import duckdb
+from src import incremental, perf
+
+DB_PATH   = os.path.join("data", "punta.duckdb")
+STAGE     = "bronze"
+SRC_TABLE = "raw.prices"
+DST_TABLE = "bronze.prices"
+COLUMNS   = """
+    date       DATE,
+    open       DOUBLE,
+    high       DOUBLE,
+    low        DOUBLE,
+    close      DOUBLE,
+    adj_close  DOUBLE,
+    volume     BIGINT,
+    ticker     VARCHAR
+"""
+
+
+@perf.instrument(STAGE)
+def run(con, full: bool = False) -> int:
+    # Count raw rows
+    raw_count = con.execute(f"SELECT COUNT(*) FROM {SRC_TABLE}").fetchone()[0]
+    print(f"🔍 raw.prices row count: {raw_count}")
+
+    with incremental.transaction(con):
+        incremental.ensure_table(con, STAGE, DST_TABLE, COLUMNS, full=full)
+        n_tickers = incremental.plan(con, STAGE, SRC_TABLE)
+        print(f"🔍 {n_tickers} ticker(s) with new or changed rows")
+
+        # Clean only the planned partitions
+        with perf.current().profile(con, "upsert"):
+            written = incremental.upsert(con, STAGE, DST_TABLE, f"""
+                SELECT
+                  CAST(r.date       AS DATE)    AS date,
+                  CAST(r.open       AS DOUBLE)  AS open,
+                  CAST(r.high       AS DOUBLE)  AS high,
+                  CAST(r.low        AS DOUBLE)  AS low,
+                  CAST(r.close      AS DOUBLE)  AS close,
+                  CAST(r.adj_close  AS DOUBLE)  AS adj_close,
+                  CAST(r.volume     AS BIGINT)  AS volume,
+                  CAST(r.ticker     AS VARCHAR) AS ticker
+                FROM {SRC_TABLE} r
+                JOIN plan_{STAGE} p USING (ticker)
+                WHERE r.date >= p.write_from
+                  AND r.volume > 0
+                  AND r.close  > 0
+                  AND r.open   > 0
+                  AND r.high   > 0
+                  AND r.low    > 0
+                QUALIFY ROW_NUMBER() OVER (
+                    PARTITION BY r.ticker, r.date
+                    ORDER BY r.date
+                ) = 1
+            """)
+        incremental.commit(con, STAGE, SRC_TABLE)
+    perf.current().rows(rows_in=raw_count, rows_out=written)
+
+    # Count bronze rows
+    bronze_count = con.execute(f"SELECT COUNT(*) FROM {DST_TABLE}").fetchone()[0]
+    print(f"✅ upserted {written} rows · bronze.prices row count: {bronze_count}")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean raw.prices into bronze.prices")
+    parser.add_argument("--full", action="store_true", help="drop bronze.prices and rebuild it")
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    run(con, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
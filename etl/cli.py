@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+etl/cli.py
+
+The `punta` command: one entry point for every stage.
+
+    punta bronze --full
+    punta train lightgbm --trials 20
+    punta pipeline --target weekly
+
+Each subcommand hands the rest of the command line to that stage's own
+main(), and its module is imported only once the subcommand is known, so
+`punta bronze` never loads sklearn, LightGBM, Optuna or SHAP. The stages
+themselves import their heavy libraries inside the functions that use them
+(tests/test_cli.py holds them to an import-time budget).
+"""
+
+import argparse
+import importlib
+import sys
+
+COMMANDS = {  # subcommand → (module, help)
+    "ingest":   ("etl.ingest_raw",       "download raw daily bars into raw.prices"),
+    "bronze":   ("etl.bronze_transform", "clean raw.prices into bronze.prices"),
+    "silver":   ("etl.silver_transform", "bronze.prices with point-in-time validity into silver.prices"),
+    "gold":     ("etl.generate_gold",    "features and labels into gold.features / gold.labels"),
+    "grade":    ("etl.grade",            "cross-sectional 0–5 grade into gold.grades"),
+    "train":    (None,                   "train a model: elasticnet or lightgbm"),
+    "score":    ("etl.score",            "score new gold.features rows"),
+    "explain":  ("etl.explain",          "SHAP values for newly scored rows"),
+    "drift":    ("etl.drift",            "feature-drift (PSI) monitor"),
+    "validate": ("etl.validate",         "data-quality checks"),
+    "backtest": ("etl.backtest",         "walk-forward back-test"),
+    "publish":  ("etl.publish",          "publish a read-only snapshot for readers"),
+    "pipeline": ("etl.pipeline",         "run the whole DAG"),
+}
+TRAINERS = {
+    "elasticnet": "etl.train_baseline",
+    "lightgbm":   "etl.train_lightgbm",
+}
+
+
+def resolve(command: str, args: list):
+    """(module name, remaining args) of a command line."""
+    module = COMMANDS[command][0]
+    if command == "train":
+        if not args or args[0] not in TRAINERS:
+            raise SystemExit(f"usage: punta train {{{','.join(TRAINERS)}}} [options]")
+        module, args = TRAINERS[args[0]], args[1:]
+    return module, args
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="punta", description="punta-ml pipeline stages",
+        epilog="\n".join(f"  {c:<10} {h}" for c, (_, h) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=sorted(COMMANDS), metavar="command")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="options of the stage (see punta <command> -h)")
+    args = parser.parse_args(argv)
+
+    module, rest = resolve(args.command, args.args)
+    sys.argv[0] = " ".join(["punta", args.command] + args.args[:len(args.args) - len(rest)])  # stage usage lines
+    return importlib.import_module(module).main(rest)
+
+
+if __name__ == "__main__":
+    main()
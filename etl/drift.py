@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+etl/drift.py
+
+Nightly feature-drift monitor (PSI) for every scored model.
+
+ - reference histograms are saved by the trainers for each model version;
+   versions trained before the monitor existed get theirs built here once,
+   from the same training matrix
+ - the current histograms take in only the rows scored since the last run
+   (see src/drift.py), so the nightly cost follows the new rows, not history
+ - PSI per feature and per ticker group (plus ALL) over the last
+   WINDOW_MONTHS of scored rows goes to ops.drift_results
+ - features are ranked by mean |SHAP| from gold.shap_summary. PSI ≥ 0.25 on
+   one of the TOP_FEATURES breaches the charter KPI and is reported first
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import duckdb
+
+from etl.explain import SUMMARY_TABLE
+from etl.generate_gold import BENCHMARK_TKR, FEATURES, GOLD_FEATURES, PASSTHROUGH
+from etl.score import SCORES_TABLE
+from src import drift, perf
+from src.models import MODEL_PATHS, model_version
+from src.training_data import NPY_CACHE, load_training_data
+
+# ─── Config ───────────────────────────────────────────────────────────────────────
+DB_PATH      = os.path.join("data", "punta.duckdb")
+TOP_FEATURES = 5  # SHAP-ranked features the PSI KPI applies to
+
+
+def create_tables(con):
+    drift.create_tables(con)
+
+
+def save_reference(con, version: str, data=None) -> int:
+    """Reference histograms for `version`; the trainers pass the matrix they fit on."""
+    if data is None:
+        data = load_training_data(con, FEATURES, passthrough=PASSTHROUGH, exclude=[BENCHMARK_TKR],
+                                  npy_cache=NPY_CACHE, stream=True)
+    n = drift.save_reference(con, version, data)
+    print(f"💾 Drift reference for {version}: {len(data.feature_names)} features, {len(data.X):,} rows")
+    return n
+
+
+def shap_ranks(con, version: str) -> dict:
+    rows = con.execute(f"""
+        SELECT feature, ROW_NUMBER() OVER (ORDER BY mean_abs DESC, feature)
+        FROM {SUMMARY_TABLE} WHERE model_version = ?
+    """, [version]).fetchall()
+    return dict(rows)
+
+
+def check_model(con, name: str, path: str, checked_at: datetime.datetime, window_months: int) -> list:
+    version = model_version(name, path)
+    if not drift.has_reference(con, version):
+        save_reference(con, version)
+
+    with perf.current().profile(con, f"drift_update_{name}"):
+        new_rows = drift.update_current(con, version, GOLD_FEATURES, SCORES_TABLE)
+    ranks = shap_ranks(con, version)
+    results = [
+        (checked_at, name, version, feature, grp, ranks.get(feature), value, ref_rows, cur_rows,
+         drift.status_of(value, cur_rows))
+        for feature, grp, value, ref_rows, cur_rows in drift.compute_psi(con, version, window_months)
+    ]
+    results.sort(key=lambda r: (r[5] is None, r[5] or 0, r[4] != drift.ALL_GROUP, r[4]))
+    if results:
+        con.executemany(f"INSERT INTO {drift.RESULTS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", results)
+    perf.current().rows(rows_in=new_rows, rows_out=len(results))
+
+    breaches = [r for r in results if r[9] == "alert" and r[5] is not None and r[5] <= TOP_FEATURES]
+    print(f"{'❌' if breaches else '✅'} {name:<10} {version} · {new_rows:,} new scored row(s) · "
+          f"{len(results)} PSI value(s), {len(breaches)} top-feature breach(es)")
+    for r in results:
+        if r[9] in ("alert", "warn"):
+            icon = "❌" if r in breaches else "⚠️ "
+            rank = f"#{r[5]}" if r[5] is not None else "unranked"
+            print(f"   {icon} {r[3]:<14} {r[4]:<4} {rank:>8} PSI={r[6]:.3f} ({r[8]:,} rows)")
+    return breaches
+
+
+@perf.instrument("drift")
+def run(con, models=None, window_months: int = drift.WINDOW_MONTHS) -> dict:
+    """Update drift sketches and PSI for every model; returns {model: KPI breaches}."""
+    create_tables(con)
+    checked_at = datetime.datetime.now()
+    models = models or [m for m, p in MODEL_PATHS.items() if os.path.exists(p)]
+    return {name: check_model(con, name, MODEL_PATHS[name], checked_at, window_months) for name in models}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Feature drift (PSI) on newly scored rows")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODEL_PATHS))
+    parser.add_argument("--window-months", type=int, default=drift.WINDOW_MONTHS)
+    parser.add_argument("--strict", action="store_true", help="exit 1 on a top-feature PSI breach")
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    breaches = run(con, args.models, args.window_months)
+    con.close()
+    if args.strict and any(breaches.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+etl/explain.py
+
+Explanation service: SHAP values for every scored row, per model version.
+
+ - explains only rows in gold.scores (current model version) that are not
+   yet in gold.shap_values, so nightly runs cover just the newly scored rows
+ - TreeExplainer (path-dependent) for LightGBM; LinearExplainer against a
+   k-means summary of a fixed reservoir sample for ElasticNet (the sample is
+   cached per model version so nightly explanations stay comparable)
+ - chunks are explained on a process pool (see src/explain.py)
+ - per-row values go to gold.shap_values in long form, keyed by
+   (model_version, ticker, date, feature). There is no PRIMARY KEY: the
+   anti-join already keeps keys unique, and maintaining the index made the
+   inserts ~10x slower.
+ - gold.shap_summary keeps a running n and Σ|SHAP| per feature, updated
+   from the new rows only
+ - mean |SHAP| per feature is also written to models/shap_<model>_summary.csv
+"""
+
+import argparse
+import os
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+from etl.generate_gold import BENCHMARK_TKR, GOLD_FEATURES, SHAP_SUMMARY, SHAP_VALUES
+from etl.score import COLUMNS, SCORES_TABLE
+from src import explain, incremental, perf
+from src.models import MODEL_PATHS, load_model, model_version
+from src.perf import Timer
+from src.training_data import to_matrix
+
+# ─── Config ───────────────────────────────────────────────────────────────────────
+DB_PATH           = os.path.join("data", "punta.duckdb")
+VALUES_TABLE      = SHAP_VALUES
+SUMMARY_TABLE     = SHAP_SUMMARY
+BACKGROUND_DIR    = os.path.join("data", "cache", "shap")
+BACKGROUND_SAMPLE = 10_000  # reservoir-sampled feature rows before k-means
+SUMMARY_CSV       = os.path.join("models", "shap_{model}_summary.csv")
+N_WORKERS         = min(4, os.cpu_count() or 1)
+
+
+def create_tables(con):
+    con.execute("CREATE SCHEMA IF NOT EXISTS gold")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VALUES_TABLE} (
+            model_version VARCHAR,
+            ticker        VARCHAR,
+            date          DATE,
+            feature       VARCHAR,
+            shap_value    FLOAT
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+            model         VARCHAR,
+            model_version VARCHAR,
+            feature       VARCHAR,
+            n             BIGINT,
+            sum_abs       DOUBLE,
+            mean_abs      DOUBLE,
+            base_value    DOUBLE,
+            PRIMARY KEY (model_version, feature)
+        )
+    """)
+
+
+def background(con, version: str):
+    """(mean, cov) background for a linear model, fixed per model version."""
+    path = os.path.join(BACKGROUND_DIR, f"{version}.npy")
+    if os.path.exists(path):
+        stacked = np.load(path)
+        return stacked[0], stacked[1:]
+
+    not_null = " AND ".join(f"{c} IS NOT NULL" for c in COLUMNS)
+    sample = con.execute(f"""
+        SELECT {", ".join(f"CAST({c} AS FLOAT) AS {c}" for c in COLUMNS)}
+        FROM {GOLD_FEATURES}
+        WHERE ticker <> '{BENCHMARK_TKR}' AND {not_null}
+        USING SAMPLE reservoir({BACKGROUND_SAMPLE} ROWS) REPEATABLE (42)
+    """).fetch_arrow_table()
+    mean, cov = explain.summarise_background(to_matrix(sample, COLUMNS))
+
+    os.makedirs(BACKGROUND_DIR, exist_ok=True)
+    np.save(path, np.vstack([mean, cov]))
+    return mean, cov
+
+
+def pending(con, name: str, version: str) -> pa.Table:
+    """Scored rows of this model version that have no SHAP values yet."""
+    select = ", ".join(f"CAST(f.{c} AS FLOAT) AS {c}" for c in COLUMNS)
+    return con.execute(f"""
+        SELECT s.ticker, s.date, {select}
+        FROM {SCORES_TABLE} s
+        JOIN {GOLD_FEATURES} f USING (ticker, date)
+        ANTI JOIN (
+            SELECT ticker, date FROM {VALUES_TABLE}
+            WHERE model_version = ? AND feature = ?
+        ) v USING (ticker, date)
+        WHERE s.model = ? AND s.model_version = ?
+        ORDER BY s.date, s.ticker
+    """, [version, COLUMNS[0], name, version]).fetch_arrow_table()
+
+
+def explain_model(con, name: str, path: str, workers: int) -> int:
+    model = load_model(path)
+    version = model_version(name, path)
+
+    # a new model version replaces the previous version's explanations
+    stale = con.execute(f"""
+        DELETE FROM {VALUES_TABLE} WHERE model_version IN (
+            SELECT model_version FROM {SUMMARY_TABLE} WHERE model = ? AND model_version <> ?
+        )
+    """, [name, version]).fetchone()[0]
+    stale += con.execute(f"DELETE FROM {SUMMARY_TABLE} WHERE model = ? AND model_version <> ?",
+                         [name, version]).fetchone()[0]
+
+    with perf.current().profile(con, f"pending_{name}"):
+        rows = pending(con, name, version)
+    if rows.num_rows == 0:
+        if stale:
+            incremental.bump(con, VALUES_TABLE, SUMMARY_TABLE)
+        print(f"✅ {name:<10} {version} · nothing new to explain")
+        return 0
+
+    bg = None if explain.is_tree_model(model) else background(con, version)
+    with Timer() as t:
+        values, base = explain.explain(path, to_matrix(rows, COLUMNS), bg, workers)
+
+    # long form: one row per (ticker, date, feature)
+    n, p = values.shape
+    perf.current().rows(rows_in=n, rows_out=n * p)
+    long = pa.table({
+        "model_version": pa.array([version] * (n * p)),
+        "ticker": pa.array(np.repeat(rows.column("ticker").to_numpy(zero_copy_only=False), p)),
+        "date": pa.array(np.repeat(rows.column("date").to_numpy(), p)),
+        "feature": pa.array(np.tile(np.asarray(COLUMNS), n)),
+        "shap_value": pa.array(values.ravel()),
+    })
+
+    with incremental.transaction(con):
+        con.register("new_shap", long)
+        con.execute(f"INSERT INTO {VALUES_TABLE} SELECT * FROM new_shap")
+        con.execute(f"""
+            INSERT OR REPLACE INTO {SUMMARY_TABLE}
+            SELECT ?, ?, d.feature,
+                   COALESCE(s.n, 0) + d.n,
+                   COALESCE(s.sum_abs, 0) + d.sum_abs,
+                   (COALESCE(s.sum_abs, 0) + d.sum_abs) / (COALESCE(s.n, 0) + d.n),
+                   ?
+            FROM (
+                SELECT feature, COUNT(*) AS n, SUM(ABS(shap_value)) AS sum_abs
+                FROM new_shap GROUP BY feature
+            ) d
+            LEFT JOIN {SUMMARY_TABLE} s ON s.model_version = ? AND s.feature = d.feature
+        """, [name, version, base, version])
+        con.unregister("new_shap")
+    incremental.bump(con, VALUES_TABLE, SUMMARY_TABLE)
+
+    print(f"✅ {name:<10} {version} · explained {n:,} rows in {t.elapsed:.2f}s "
+          f"({n / t.elapsed:,.0f} rows/s)")
+    return n
+
+
+def write_summary(con, name: str, path: str):
+    summary = con.execute(f"""
+        SELECT feature, mean_abs AS mean_abs_shap
+        FROM {SUMMARY_TABLE}
+        WHERE model_version = ?
+        ORDER BY mean_abs DESC
+    """, [model_version(name, path)]).fetchdf()
+    csv = SUMMARY_CSV.format(model=name)
+    os.makedirs(os.path.dirname(csv), exist_ok=True)
+    summary.to_csv(csv, index=False)
+    print(f"💾 SHAP summary saved to {csv}")
+    print(summary)
+
+
+@perf.instrument("explain")
+def run(con, models=None, workers: int = N_WORKERS):
+    create_tables(con)
+    models = models or [m for m, p in MODEL_PATHS.items() if os.path.exists(p)]
+    explained = {}
+    for name in models:
+        explained[name] = explain_model(con, name, MODEL_PATHS[name], workers)
+        write_summary(con, name, MODEL_PATHS[name])
+    return explained
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Explain newly scored rows with SHAP")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODEL_PATHS))
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    run(con, args.models, args.workers)
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,91 +3,297 @@
 etl/generate_gold.py
 
 Reads silver.prices, computes features & labels, writes to gold.features and gold.labels.
+
+Only tickers with new or changed silver rows are recomputed, in memory-sized
+chunks of whole tickers, and upserted on (ticker, date); --full rebuilds both
+tables. Feature rows whose model inputs change lose their scores and SHAP
+values, so the score and explain stages redo them.
 """
 
-import sys, os
-# ensure project root is on sys.path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import argparse
+import os
 
 import duckdb
-import pandas as pd
-from src.features import momentum_12m, compute_excess_return
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from src import features as fx
+from src import incremental, memory, perf, pit
+from src import labels as lb
+from src.panel import Panel, column
+from src.pipeline import table_exists
+from src.prices import BENCHMARK_TKR
 
 # ─── Config ──────────────────────────────────────────────────────────────────────
 DB_PATH        = os.path.join("data", "punta.duckdb")
+STAGE          = "gold"
+SRC_TABLE      = "silver.prices"
 GOLD_FEATURES  = "gold.features"
 GOLD_LABELS    = "gold.labels"
-BENCHMARK_TKR  = "SPY"
-RETURN_DAYS    = 252  # trading days ≈ 1 year
+BENCHMARK_MAP  = "silver.benchmarks"  # ticker → benchmark ticker, e.g. its sector ETF
+SCORES_TABLE   = "gold.scores"        # model scores of feature rows (etl/score.py)
+SHAP_VALUES    = "gold.shap_values"   # their SHAP values (etl/explain.py)
+SHAP_SUMMARY   = "gold.shap_summary"  # running n and Σ|SHAP| per model version and feature
+HORIZONS       = {"1m": 21, "3m": 63, "6m": 126, "12m": 252}  # trading days
+RETURN_DAYS    = HORIZONS["12m"]  # horizon of the original labels
 HIT_THRESHOLD  = 0.02  # 2% excess return
+THRESHOLDS     = {"2pct": HIT_THRESHOLD}
+# every label a trainer may project (load_training_data(label=...)): forward returns of the
+# ticker, of SPY and of its silver.benchmarks benchmark (SPY when unmapped), excess returns
+# over both and hit labels, for each horizon
+LABELS         = lb.LabelSpec(HORIZONS, ("spy", "bench"), THRESHOLDS)
+FEATURES       = ["momentum_12m"]  # registered in src/features.py; the models' inputs
+TECHNICALS     = ["rsi_14", "realized_vol_21", "ma_cross_50_200", "atr_pct_14", "volume_z_21",
+                  "dist_52w_high"]  # also stored for the grade (etl/grade.py), not model inputs yet
+PASSTHROUGH    = ["open", "high", "low", "close", "adj_close", "volume"]  # silver columns kept as features
+LOOKBACK       = fx.required_history(FEATURES + TECHNICALS)[0]  # rows needed before a row for its features
+LOOKAHEAD      = LABELS.lookahead  # rows after a row its forward-return labels look at
+BENCHMARK_AGE  = 7  # days a benchmark bar stays valid for other calendars' dates
+ROW_BYTES      = 1024  # silver row + features + labels + NumPy temporaries, per row of a chunk
+
+FEATURE_COLUMNS = """
+    date          DATE,
+    ticker        VARCHAR,
+    open          DOUBLE,
+    high          DOUBLE,
+    low           DOUBLE,
+    close         DOUBLE,
+    adj_close     DOUBLE,
+    volume        BIGINT""" + "".join(f",\n    {name:<15} DOUBLE" for name in FEATURES + TECHNICALS)
+LABEL_COLUMNS = """
+    date               DATE,
+    ticker             VARCHAR,
+    benchmark          VARCHAR,
+    stock_fwd_ret      DOUBLE,
+    spy_fwd_ret        DOUBLE,
+    excess_return_12m  DOUBLE,
+    hit_2pct           INTEGER""" + "".join(f",\n    {name:<18} {kind}" for name, kind in LABELS.columns())
+# the original labels: the 12-month, SPY, 2% members of the grid
+LEGACY_LABELS = {
+    "stock_fwd_ret":     "fwd_ret_12m",
+    "spy_fwd_ret":       "spy_fwd_ret_12m",
+    "excess_return_12m": "excess_spy_12m",
+    "hit_2pct":          "hit_spy_12m_2pct",
+}
+
+
+def nullable(x: np.ndarray) -> pa.Array:
+    """Arrow array with NaN stored as NULL, as the pandas-based writer did."""
+    return pa.array(x, from_pandas=True)
+
+
+def benchmarks(con) -> list:
+    """
+    Create the ticker → benchmark map if needed; returns every benchmark
+    ticker, market first. A changed mapping relabels only the tickers
+    recomputed next; run --full to relabel everything.
+    """
+    con.execute(f"CREATE SCHEMA IF NOT EXISTS {BENCHMARK_MAP.split('.')[0]}")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {BENCHMARK_MAP} (
+            ticker     VARCHAR PRIMARY KEY,
+            benchmark  VARCHAR NOT NULL
+        )
+    """)
+    mapped = con.execute(
+        f"SELECT DISTINCT benchmark FROM {BENCHMARK_MAP} WHERE benchmark <> ? ORDER BY 1", [BENCHMARK_TKR]
+    ).fetchall()
+    return [BENCHMARK_TKR] + [b for (b,) in mapped]
+
+
+def silver_sql(panel_sql: str, series: str) -> str:
+    """
+    `panel_sql` (silver rows with their benchmark) plus the LABELS inputs:
+    forward log returns of SPY and of the row's benchmark as of its date.
+    As-of, not equal-date, joins: tickers on other calendars (600519.SS,
+    2330.TW) get the latest US bar instead of a NULL label on every day the
+    calendars differ.
+    """
+    market = pit.asof_sql(
+        panel_sql, f"(SELECT * FROM {series} WHERE benchmark = '{BENCHMARK_TKR}')",
+        {f"fwd_log_{h}": f"spy_fwd_log_{h}" for h in HORIZONS}, max_age=BENCHMARK_AGE,
+    )
+    return pit.asof_sql(
+        market, series, {f"fwd_log_{h}": f"bench_fwd_log_{h}" for h in HORIZONS},
+        by="benchmark", max_age=BENCHMARK_AGE, order_by=["ticker", "date"],
+    )
+
+
+def compute(silver: pa.Table):
+    """
+    Compute the feature and label tables for a silver window sorted by
+    (ticker, date), in one vectorised pass over all tickers. `silver` carries
+    the row's benchmark and the benchmark forward log returns of
+    LABELS.inputs() as of each row's date (see silver_sql).
+    """
+    panel = Panel.from_arrow(silver)
+    adj   = column(silver, "adj_close")
+
+    # ─── Features & labels for every ticker at once ─────────────────────────────
+    # 1) registered features, sharing intermediates in one batch
+    names  = FEATURES + TECHNICALS
+    values = fx.compute(panel, {c: column(silver, c) for c in fx.required_inputs(names)}, names)
+    # 2) forward, benchmark and excess returns and hits for every horizon
+    targets = lb.compute(panel, adj, {c: column(silver, c) for c in LABELS.inputs()}, LABELS)
+
+    keep = pc.not_equal(silver.column("ticker"), BENCHMARK_TKR)  # skip SPY itself
+    features = pa.table({
+        "date":         silver.column("date"),
+        "ticker":       silver.column("ticker"),
+        **{c: silver.column(c) for c in PASSTHROUGH},
+        **{name: nullable(v) for name, v in values.items()},
+    }).filter(keep)
+    targets = {**{old: targets[new] for old, new in LEGACY_LABELS.items()}, **targets}
+    labels = pa.table({
+        "date":      silver.column("date"),
+        "ticker":    silver.column("ticker"),
+        "benchmark": silver.column("benchmark"),
+        **{name: v if v.dtype == np.int32 else nullable(v) for name, v in targets.items()},
+    }).filter(keep)
+    return features, labels
+
+
+def write(con, table: str, df: pa.Table, track=None) -> int:
+    """
+    Upsert the rows of `df` (one chunk of the plan) at or after their ticker's
+    planned write_from. With `track` (column names), the keys whose values of
+    those columns change (rows added, altered or gone) are collected in
+    changed_<STAGE> first. Rows rewritten with the same values, like the
+    lookahead margin relabelled every night, are not.
+    """
+    new = f"""
+        SELECT g.* FROM gold_df g
+        JOIN plan_{STAGE} p USING (ticker)
+        WHERE g.date >= p.write_from
+    """
+    con.register("gold_df", df)
+    try:
+        if track:
+            cols = ", ".join(["ticker", "date", *track])
+            old = f"""
+                SELECT {cols} FROM {table} t
+                JOIN plan_{STAGE} p USING (ticker)
+                SEMI JOIN chunk_{STAGE} c USING (ticker)
+                WHERE p.rebuild OR t.date >= p.write_from
+            """
+            con.execute(f"""
+                WITH new AS (SELECT {cols} FROM ({new})), old AS ({old})
+                INSERT INTO changed_{STAGE}
+                SELECT DISTINCT ticker, date FROM (
+                    (FROM new EXCEPT FROM old) UNION ALL (FROM old EXCEPT FROM new)
+                )
+            """)
+        return incremental.upsert(con, STAGE, table, new, chunk=f"chunk_{STAGE}")
+    finally:
+        con.unregister("gold_df")
+
+
+def forget_scores(con) -> int:
+    """
+    Delete the scores and SHAP values of the changed feature rows (see write),
+    taking the SHAP values out of the summary, so they are redone. Returns
+    the number of scores deleted.
+    """
+    if not con.execute(f"SELECT COUNT(*) FROM changed_{STAGE}").fetchone()[0]:
+        return 0
+    scores = 0
+    if table_exists(con, SCORES_TABLE):
+        scores = con.execute(f"""
+            DELETE FROM {SCORES_TABLE} s USING changed_{STAGE} c
+            WHERE s.ticker = c.ticker AND s.date = c.date
+        """).fetchone()[0]
+    shap = 0
+    if table_exists(con, SHAP_VALUES) and table_exists(con, SHAP_SUMMARY):
+        con.execute(f"""
+            UPDATE {SHAP_SUMMARY} s
+            SET n = s.n - d.n,
+                sum_abs = s.sum_abs - d.sum_abs,
+                mean_abs = (s.sum_abs - d.sum_abs) / NULLIF(s.n - d.n, 0)
+            FROM (
+                SELECT model_version, feature, COUNT(*) AS n, SUM(ABS(shap_value)) AS sum_abs
+                FROM {SHAP_VALUES} SEMI JOIN changed_{STAGE} USING (ticker, date)
+                GROUP BY ALL
+            ) d
+            WHERE s.model_version = d.model_version AND s.feature = d.feature
+        """)
+        shap = con.execute(f"""
+            DELETE FROM {SHAP_VALUES} v USING changed_{STAGE} c
+            WHERE v.ticker = c.ticker AND v.date = c.date
+        """).fetchone()[0]
+    if scores:
+        incremental.bump(con, SCORES_TABLE)
+    if shap:
+        incremental.bump(con, SHAP_VALUES, SHAP_SUMMARY)
+    return scores
+
+
+@perf.instrument(STAGE)
+def run(con, full: bool = False, chunk_rows: int = None):
+    with incremental.transaction(con):
+        incremental.ensure_table(con, STAGE, GOLD_FEATURES, FEATURE_COLUMNS, full=full)
+        incremental.ensure_table(con, STAGE, GOLD_LABELS, LABEL_COLUMNS, full=full)
+        bench = benchmarks(con)
+        n_tickers = incremental.plan(
+            con, STAGE, SRC_TABLE, lookback=LOOKBACK, lookahead=LOOKAHEAD, benchmark=bench
+        )
+        print(f"🔍 {n_tickers} ticker(s) to recompute")
+        if n_tickers == 0:
+            return 0, 0
+
+        # ─── Benchmark forward log returns as a sorted series, for the as-of joins ─
+        pit.create_series(con, f"benchmark_{STAGE}", lb.forward_sql(
+            SRC_TABLE, HORIZONS, bench, f"(SELECT MIN(write_from) FROM plan_{STAGE}) - {BENCHMARK_AGE}"
+        ), key="benchmark", temp=True)
+
+        # features and labels are computed within a ticker, so chunking changes no value
+        chunks = incremental.chunks(con, STAGE, SRC_TABLE, chunk_rows or memory.chunk_rows(ROW_BYTES))
+        con.execute(f"CREATE OR REPLACE TEMP TABLE changed_{STAGE} (ticker VARCHAR, date DATE)")
+        if len(chunks) > 1:
+            print(f"🧩 {len(chunks)} chunk(s) of ≤ {max(len(c) for c in chunks)} ticker(s)")
+        n_read = n_feat = n_lab = 0
+        for tickers in chunks:
+            con.execute(f"CREATE OR REPLACE TEMP TABLE chunk_{STAGE} AS SELECT UNNEST(?::VARCHAR[]) AS ticker",
+                        [tickers])
+
+            # ─── Load the chunk's planned silver window ───────────────────────────
+            with perf.current().profile(con, "load_silver"):
+                silver = con.execute(silver_sql(f"""
+                    SELECT s.date, s.ticker, s.open, s.high, s.low, s.close, s.adj_close, s.volume,
+                           COALESCE(m.benchmark, '{BENCHMARK_TKR}') AS benchmark
+                    FROM {SRC_TABLE} s
+                    JOIN plan_{STAGE} p USING (ticker)
+                    LEFT JOIN {BENCHMARK_MAP} m USING (ticker)
+                    SEMI JOIN chunk_{STAGE} c USING (ticker)
+                    WHERE s.date >= p.read_from
+                """, f"benchmark_{STAGE}")).fetch_arrow_table()
+
+            # ─── Compute & write to DuckDB ───────────────────────────────────────
+            features, labels = compute(silver)
+            n_read += silver.num_rows
+            n_feat += write(con, GOLD_FEATURES, features, track=PASSTHROUGH + FEATURES)
+            n_lab  += write(con, GOLD_LABELS, labels)
+            del silver, features, labels
+        stale = forget_scores(con)
+        incremental.commit(con, STAGE, SRC_TABLE)
+    perf.current().rows(rows_in=n_read, rows_out=n_feat + n_lab)
+
+    print(f"✅ Written {n_feat} rows to {GOLD_FEATURES}")
+    print(f"✅ Written {n_lab} rows to {GOLD_LABELS}")
+    if stale:
+        print(f"♻️  {stale} score(s) of changed feature rows dropped for rescoring")
+    return n_feat, n_lab
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute gold.features and gold.labels from silver.prices")
+    parser.add_argument("--full", action="store_true", help="drop the gold tables and rebuild them")
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    memory.configure(con)
+    con.execute("CREATE SCHEMA IF NOT EXISTS gold")
+    run(con, full=args.full)
+
 
-# ─── Load silver data ─────────────────────────────────────────────────────────────
-con = duckdb.connect(DB_PATH)
-con.execute("CREATE SCHEMA IF NOT EXISTS gold")
-df = con.execute("SELECT * FROM silver.prices ORDER BY ticker, date").fetchdf()
-
-# ─── PRECOMPUTE SPY benchmark series ──────────────────────────────────────────────
-spy_df = df[df["ticker"] == BENCHMARK_TKR].copy()
-spy_df.set_index("date", inplace=True)
-# stock forward return for SPY
-spy_df["stock_fwd_ret"] = spy_df["adj_close"].pct_change(periods=RETURN_DAYS).shift(-RETURN_DAYS)
-# keep only the benchmark return column and rename
-spy_df = spy_df[["stock_fwd_ret"]].rename(columns={"stock_fwd_ret": "spy_fwd_ret"})
-
-# ─── Compute Features & Labels ────────────────────────────────────────────────────
-features_list = []
-labels_list   = []
-
-for tkr, group in df.groupby("ticker"):
-    if tkr == BENCHMARK_TKR:
-        continue  # skip SPY itself
-
-    grp = group.copy()
-    grp.set_index("date", inplace=True)
-
-    # 1) momentum feature
-    grp["momentum_12m"] = momentum_12m(grp)
-
-    # 2) stock 12m forward return
-    grp["stock_fwd_ret"] = grp["adj_close"].pct_change(periods=RETURN_DAYS).shift(-RETURN_DAYS)
-
-    # 3) merge in SPY forward return
-    grp = grp.join(spy_df, how="left")
-
-    # 4) compute excess return label
-    grp["excess_return_12m"] = compute_excess_return(grp["stock_fwd_ret"], grp["spy_fwd_ret"])
-    grp["hit_2pct"] = (grp["excess_return_12m"] >= HIT_THRESHOLD).astype(int)
-
-    # 5) collect feature columns
-    features_list.append(grp[[
-        "open", "high", "low", "close",
-        "adj_close", "volume", "momentum_12m"
-    ]])
-
-    # 6) collect label columns
-    labels_list.append(grp[[
-        # keep ticker & date as columns
-        "ticker",
-        "stock_fwd_ret", "spy_fwd_ret",
-        "excess_return_12m", "hit_2pct"
-    ]])
-
-# ─── Concatenate & reset index ───────────────────────────────────────────────────
-features_df = pd.concat(features_list).reset_index()
-labels_df   = pd.concat(labels_list).reset_index()
-
-# ─── Write to DuckDB ─────────────────────────────────────────────────────────────
-# Features
-con.execute(f"DROP TABLE IF EXISTS {GOLD_FEATURES}")
-con.register("f_df", features_df)
-con.execute(f"CREATE TABLE {GOLD_FEATURES} AS SELECT * FROM f_df")
-con.unregister("f_df")
-
-# Labels
-con.execute(f"DROP TABLE IF EXISTS {GOLD_LABELS}")
-con.register("l_df", labels_df)
-con.execute(f"CREATE TABLE {GOLD_LABELS} AS SELECT * FROM l_df")
-con.unregister("l_df")
-
-print(f"✅ Written {len(features_df)} rows to {GOLD_FEATURES}")
-print(f"✅ Written {len(labels_df)} rows to {GOLD_LABELS}")
+if __name__ == "__main__":
+    main()
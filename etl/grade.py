@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+etl/grade.py
+
+The charter's 0–5 grade per security and date: gold.features → gold.grades.
+
+For every date, across the universe (src/cross_section.py):
+ 1. every feature a pillar uses is z-scored and winsorised at ±3σ
+ 2. each pillar is the weighted mean of its features' z-scores (a negative
+    weight: lower is better), z-scored again so pillars are comparable
+ 3. the pillars are blended with the charter weights (Fundamentals 50%,
+    Technicals 15%, Outlook 20%, Macro 15%) over the pillars a row has
+ 4. grade = 5 × the blended score's percentile rank on that date
+
+Benchmarks (SPY and the sector ETFs in silver.benchmarks) are not graded:
+they are what the securities are measured against, not part of the
+universe, and would shift every security's rank.
+
+Pillars without inputs yet (no fundamentals, outlook or macro feed) stay
+NULL and drop out of the blend. All dates are ranked in one pass: the rows
+are loaded sorted by date and every statistic is a grouped reduction.
+
+Only dates from REGRADE_DAYS before the last graded one on are (re)graded,
+so bars arriving a little late from other exchanges are ranked with their
+date, in chunks of whole dates sized to the memory ceiling; --full regrades
+the whole history.
+"""
+
+import argparse
+import os
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+from etl.generate_gold import GOLD_FEATURES, benchmarks
+from src import incremental, memory, perf
+from src.cross_section import CrossSection
+from src.panel import column
+
+# ─── Config ───────────────────────────────────────────────────────────────────────
+DB_PATH      = os.path.join("data", "punta.duckdb")
+STAGE        = "grade"
+GRADES_TABLE = "gold.grades"
+GRADE_MAX    = 5
+ROW_BYTES    = 256  # features, z-scores and pillar scores per row of a chunk
+REGRADE_DAYS = 7  # calendar days before the last graded date that are graded again
+PILLARS      = {  # pillar → (charter weight, {gold.features column: signed weight})
+    "fundamentals": (0.50, {}),
+    "technicals":   (0.15, {
+        "momentum_12m":    0.30,
+        "ma_cross_50_200": 0.20,
+        "dist_52w_high":   0.15,
+        "rsi_14":          0.10,
+        "volume_z_21":     0.05,
+        "realized_vol_21": -0.10,
+        "atr_pct_14":      -0.10,
+    }),
+    "outlook":      (0.20, {}),
+    "macro":        (0.15, {}),
+}
+INPUTS       = [c for _, cols in PILLARS.values() for c in cols]
+COLUMNS      = """
+    date          DATE,
+    ticker        VARCHAR,""" + "".join(f"\n    {p:<13} DOUBLE," for p in PILLARS) + """
+    score         DOUBLE,
+    grade         DOUBLE
+"""
+
+
+def compute(rows: pa.Table) -> pa.Table:
+    """Pillar scores, blended score and grade for whole dates of gold.features rows, sorted by date."""
+    cs = CrossSection(rows.column("date").to_numpy())
+    Z = cs.zscore(np.column_stack([column(rows, c) for c in INPUTS]))
+
+    pillars, at = {}, 0
+    for name, (_, weights) in PILLARS.items():
+        block = Z[:, at:at + len(weights)]
+        at += len(weights)
+        if weights:
+            pillars[name] = cs.zscore(cs.blend(block, list(weights.values()))[:, None])[:, 0]
+        else:
+            pillars[name] = np.full(rows.num_rows, np.nan)
+
+    score = cs.blend(np.column_stack(list(pillars.values())), [w for w, _ in PILLARS.values()])
+    keep = pa.array(~np.isnan(score))  # rows without any feature yet get no grade
+    return pa.table({
+        "date":   rows.column("date"),
+        "ticker": rows.column("ticker"),
+        **{name: pa.array(v, from_pandas=True) for name, v in pillars.items()},
+        "score":  pa.array(score, from_pandas=True),
+        "grade":  pa.array(GRADE_MAX * cs.rank(score), from_pandas=True),
+    }).filter(keep)
+
+
+def date_chunks(con, since, max_rows: int, exclude=()) -> list:
+    """(first, last) date ranges of gold.features from `since` on, ≤ max_rows rows each."""
+    counts = con.execute(
+        f"SELECT date, COUNT(*) FROM {GOLD_FEATURES} WHERE date >= COALESCE(?, DATE '0001-01-01') "
+        "AND NOT list_contains(?, ticker) GROUP BY date ORDER BY date", [since, list(exclude)]
+    ).fetchall()
+    out, first, rows = [], None, 0
+    for i, (date, n) in enumerate(counts):
+        if first is not None and rows + n > max_rows:
+            out.append((first, counts[i - 1][0]))
+            first, rows = None, 0
+        first = first or date
+        rows += n
+    if first is not None:
+        out.append((first, counts[-1][0]))
+    return out
+
+
+@perf.instrument(STAGE)
+def run(con, full: bool = False, chunk_rows: int = None) -> int:
+    with incremental.transaction(con):
+        created = incremental.ensure_table(con, STAGE, GRADES_TABLE, COLUMNS, full=full)
+        bench = benchmarks(con)
+        dropped = con.execute(f"DELETE FROM {GRADES_TABLE} WHERE list_contains(?, ticker)", [bench]).fetchone()[0]
+        since = None if created else con.execute(
+            f"SELECT CAST(MAX(date) - INTERVAL {REGRADE_DAYS} DAY AS DATE) FROM {GRADES_TABLE}"
+        ).fetchone()[0]
+        chunks = date_chunks(con, since, chunk_rows or memory.chunk_rows(ROW_BYTES), bench)
+        print(f"🔍 {len(chunks)} chunk(s) of dates to grade" + (f" from {since}" if since else ""))
+
+        select = ", ".join(f"CAST({c} AS DOUBLE) AS {c}" for c in INPUTS)
+        n_in = n_out = 0
+        for first, last in chunks:
+            rows = con.execute(f"""
+                SELECT date, ticker, {select} FROM {GOLD_FEATURES}
+                WHERE date BETWEEN ? AND ? AND NOT list_contains(?, ticker)
+                ORDER BY date
+            """, [first, last, bench]).fetch_arrow_table()
+            con.register("grade_rows", compute(rows))
+            n_out += con.execute(f"INSERT OR REPLACE INTO {GRADES_TABLE} SELECT * FROM grade_rows").fetchone()[0]
+            con.unregister("grade_rows")
+            n_in += rows.num_rows
+    if n_out or dropped:
+        incremental.bump(con, GRADES_TABLE)
+    perf.current().rows(rows_in=n_in, rows_out=n_out)
+    print(f"✅ Graded {n_out:,} rows into {GRADES_TABLE}")
+    return n_out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-sectional 0–5 grade from gold.features")
+    parser.add_argument("--full", action="store_true", help="drop gold.grades and regrade all dates")
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    memory.configure(con)
+    run(con, full=args.full)
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,70 +2,291 @@
 """
 etl/ingest_raw.py
 
-Backfill 2013–2024 raw price data for your 20‐ticker universe.
+Incrementally load raw price data for the ticker universe into raw.prices.
+
+ - keeps a per-ticker high-water mark (last loaded date) and requests the
+   range after it plus the last REFETCH_DAYS before it, so revised bars are
+   picked up; new tickers are backfilled from START_DATE
+ - if a refetched bar's adj_close differs from the stored one (a split or
+   dividend re-adjusted the history), the ticker's whole history is
+   refetched, so old and new bars share one adjustment basis
+ - downloads run on a bounded thread pool with retry + exponential backoff
+ - raw responses are cached on disk, so re-runs and backfills skip the network
+ - all fetched rows are upserted on (ticker, date) with one bulk Arrow insert
+
+Use --full to drop raw.prices and reload the whole window from scratch.
 """
 
+import argparse
+import datetime as dt
 import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import duckdb
-import yfinance as yf
+import pandas as pd
+import pyarrow as pa
+from src import incremental, perf
+from src.prices import PRICE_COLUMNS, PRICE_SCHEMA, create_raw_table
 
 # === CONFIGURATION ===
 DB_PATH    = os.path.join("data", "punta.duckdb")
+CACHE_DIR  = os.path.join("data", "cache", "prices")
 TICKERS = [
     "SPY","NVDA","AMD","TSLA","AVGO","NFLX","NOW","PGR","LLY","ISRG","AMZN",
     "MSFT","1211.HK","META","RMS","600519.SS","ASML","TMUS","COST",
     "2330.TW","RELIANCE.NS"
 ]
-START_DATE = "2013-01-01"
-END_DATE   = "2024-10-31"
-
-# === CONNECT TO DUCKDB ===
-con = duckdb.connect(DB_PATH)
-con.execute("CREATE SCHEMA IF NOT EXISTS raw")
-
-# Drop and recreate raw.prices to get a clean 2013–2024 window
-con.execute("DROP TABLE IF EXISTS raw.prices")
-con.execute("""
-    CREATE TABLE raw.prices (
-        date       DATE,
-        open       DOUBLE,
-        high       DOUBLE,
-        low        DOUBLE,
-        close      DOUBLE,
-        adj_close  DOUBLE,
-        volume     BIGINT,
-        ticker     VARCHAR
-    )
-""")
-
-# === FETCH & LOAD ===
-for ticker in TICKERS:
-    print(f"📥 Fetching {ticker} from {START_DATE} to {END_DATE}…")
-    df = yf.download(
-        ticker,
-        start=START_DATE,
-        end=END_DATE,
-        progress=False,
-        auto_adjust=False
-    )
-    df = (
-        df
-        .reset_index()
-        .rename(columns={
-            "Date":      "date",
-            "Open":      "open",
-            "High":      "high",
-            "Low":       "low",
-            "Close":     "close",
-            "Adj Close": "adj_close",
-            "Volume":    "volume"
-        })
-    )
+START_DATE   = "2013-01-01"
+END_DATE     = None  # None → today (end is exclusive, so the last bar is yesterday)
+MAX_WORKERS  = 8     # concurrent downloads
+MAX_RETRIES  = 4     # attempts per ticker before giving up
+BACKOFF_S    = 1.0   # base delay, doubled on every retry (plus jitter)
+REFETCH_DAYS = 10    # calendar days before the watermark requested again every run
+ADJ_RTOL     = 1e-6  # relative adj_close change that counts as a revision
+
+RENAME = {
+    "Date":      "date",
+    "Open":      "open",
+    "High":      "high",
+    "Low":       "low",
+    "Close":     "close",
+    "Adj Close": "adj_close",
+    "Volume":    "volume",
+}
+
+
+# ─── Price sources ──────────────────────────────────────────────────────────────
+# A source is anything with fetch(ticker, start, end) -> DataFrame, where start
+# is inclusive and end exclusive (ISO date strings). Sources return frames in
+# the raw.prices column layout; see normalize().
+
+def normalize(df: pd.DataFrame, ticker: str, start: str, end: str) -> pd.DataFrame:
+    """Coerce a yfinance-style frame into the raw.prices column layout."""
+    if isinstance(df.columns, pd.MultiIndex):
+        # yfinance ≥ 0.2.48 returns (field, ticker) columns even for one ticker
+        df = df.droplevel(-1, axis=1)
+    df = df.reset_index() if "date" not in df.columns and "Date" not in df.columns else df
+    df = df.rename(columns=RENAME)
+    if df.empty:
+        return pd.DataFrame(columns=PRICE_COLUMNS)
+
+    df["date"] = pd.to_datetime(df["date"]).dt.tz_localize(None).dt.normalize()
+    df = df[(df["date"] >= pd.Timestamp(start)) & (df["date"] < pd.Timestamp(end))].copy()
     df["ticker"] = ticker
+    return df[PRICE_COLUMNS]
+
+
+class YFinanceSource:
+    """Download daily bars from Yahoo Finance."""
+
+    def fetch(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        import yfinance as yf  # heavy import, only needed when hitting the network
+
+        df = yf.download(
+            ticker,
+            start=start,
+            end=end,
+            progress=False,
+            auto_adjust=False,
+            threads=False,  # we parallelise across tickers ourselves
+        )
+        return normalize(df, ticker, start, end)
+
+
+class FixtureSource:
+    """Read bars from local `<root>/<ticker>.csv` files (tests, offline runs)."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def fetch(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        path = os.path.join(self.root, f"{ticker}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=PRICE_COLUMNS)
+        return normalize(pd.read_csv(path), ticker, start, end)
+
+
+class CachedSource:
+    """
+    Wrap a source with an on-disk Parquet cache keyed by (ticker, start, end).
+    Ranges that end in the future are not cached, as the response is incomplete.
+    """
+
+    def __init__(self, source, cache_dir: str = CACHE_DIR):
+        self.source = source
+        self.cache_dir = cache_dir
+
+    def _path(self, ticker: str, start: str, end: str) -> str:
+        safe = ticker.replace("/", "_")
+        return os.path.join(self.cache_dir, safe, f"{start}_{end}.parquet")
+
+    def fetch(self, ticker: str, start: str, end: str) -> pd.DataFrame:
+        path = self._path(ticker, start, end)
+        if os.path.exists(path):
+            return pd.read_parquet(path)
+
+        df = self.source.fetch(ticker, start, end)
+        if pd.Timestamp(end) <= pd.Timestamp(dt.date.today()):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, path)  # atomic: concurrent readers never see half a file
+        return df
+
+
+# ─── Planning & download ────────────────────────────────────────────────────────
+
+def load_watermarks(con) -> dict:
+    """Per-ticker high-water mark: the last date already present in raw.prices."""
+    rows = con.execute("SELECT ticker, MAX(date) FROM raw.prices GROUP BY ticker").fetchall()
+    return dict(rows)
+
+
+def plan_requests(tickers, watermarks: dict, start: str, end: str,
+                  refetch_days: int = REFETCH_DAYS) -> list:
+    """Return the (ticker, start, end) ranges to fetch: the missing range and the trailing window."""
+    plan = []
+    for ticker in tickers:
+        last = watermarks.get(ticker)
+        tkr_start = max(start, (last - dt.timedelta(days=refetch_days)).isoformat()) if last else start
+        if tkr_start < end:
+            plan.append((ticker, tkr_start, end))
+    return plan
+
+
+def fetch_with_retry(source, ticker: str, start: str, end: str,
+                     retries: int = MAX_RETRIES, backoff: float = BACKOFF_S) -> pd.DataFrame:
+    """Call source.fetch, retrying with exponential backoff and jitter."""
+    for attempt in range(retries):
+        try:
+            return source.fetch(ticker, start, end)
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+
+def download_all(source, plan: list, max_workers: int = MAX_WORKERS,
+                 retries: int = MAX_RETRIES, backoff: float = BACKOFF_S):
+    """Fetch every planned range concurrently. Returns (frames, failures)."""
+    frames, failures = [], {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(fetch_with_retry, source, tkr, start, end, retries, backoff): (tkr, start, end)
+            for tkr, start, end in plan
+        }
+        for fut in as_completed(futures):
+            tkr, start, end = futures[fut]
+            try:
+                df = fut.result()
+            except Exception as exc:
+                failures[tkr] = exc
+                print(f"❌ {tkr} {start}→{end}: {exc}")
+                continue
+            print(f"📥 {tkr} {start}→{end}: {len(df)} rows")
+            if len(df):
+                frames.append(df)
+    return frames, failures
+
+
+# ─── Load ───────────────────────────────────────────────────────────────────────
+
+def to_arrow(frames: list) -> pa.Table:
+    df = pd.concat(frames, ignore_index=True)
+    df["volume"] = df["volume"].fillna(0)
+    return pa.Table.from_pandas(df[PRICE_COLUMNS], schema=PRICE_SCHEMA, preserve_index=False)
+
+
+def revised(con, frames: list, rtol: float = ADJ_RTOL) -> set:
+    """Tickers whose fetched bars disagree with raw.prices on adj_close for a date both have."""
+    if not frames:
+        return set()
+    con.register("fetched_prices", to_arrow(frames))
+    try:
+        rows = con.execute("""
+            SELECT DISTINCT f.ticker
+            FROM fetched_prices f JOIN raw.prices r USING (ticker, date)
+            WHERE ABS(f.adj_close - r.adj_close) > ? * ABS(r.adj_close)
+        """, [rtol]).fetchall()
+    finally:
+        con.unregister("fetched_prices")
+    return {t for (t,) in rows}
+
+
+def bulk_insert(con, frames: list, replace=()) -> int:
+    """
+    Upsert all frames into raw.prices on (ticker, date) with a single
+    Arrow-backed INSERT. Tickers in `replace` lose every stored row first,
+    not only the dates fetched again.
+    """
+    if not frames:
+        return 0
+    table = to_arrow(frames)
+    con.register("new_prices", table)
+    try:
+        with incremental.transaction(con):
+            con.execute("DELETE FROM raw.prices WHERE list_contains(?, ticker)", [sorted(replace)])
+            con.execute("""
+                DELETE FROM raw.prices r USING new_prices n
+                WHERE r.ticker = n.ticker AND r.date = n.date
+            """)
+            con.execute(f"INSERT INTO raw.prices SELECT {', '.join(PRICE_COLUMNS)} FROM new_prices")
+    finally:
+        con.unregister("new_prices")
+    incremental.bump(con, "raw.prices")
+    return table.num_rows
+
+
+@perf.instrument("ingest")
+def run(con, tickers=TICKERS, start: str = START_DATE, end: str = END_DATE,
+        full: bool = False, source=None, max_workers: int = MAX_WORKERS) -> int:
+    """Fetch the missing range and trailing window of every ticker and upsert them into raw.prices."""
+    end = end or dt.date.today().isoformat()
+    source = source or CachedSource(YFinanceSource())
+
+    create_raw_table(con, full=full)
+    watermarks = {} if full else load_watermarks(con)
+    plan = plan_requests(tickers, watermarks, start, end)
+    print(f"🔍 {len(plan)}/{len(tickers)} tickers need data up to {end}")
+
+    frames, failures = download_all(source, plan, max_workers=max_workers)
+    stale = revised(con, frames)
+    if stale:
+        print(f"🔁 adj_close revised for {sorted(stale)}: refetching their whole history")
+        frames = [df for df in frames if df["ticker"].iloc[0] not in stale]
+        history, more = download_all(source, [(t, start, end) for t in sorted(stale)], max_workers=max_workers)
+        frames += history
+        failures.update(more)
+        stale -= set(more)  # keep what is stored rather than delete it unreplaced
+    with perf.current().profile(con, "insert"):
+        inserted = bulk_insert(con, frames, replace=stale)
+    perf.current().rows(rows_in=inserted, rows_out=inserted)
+    print(f"✅ Upserted {inserted} rows into raw.prices")
+    if failures:
+        raise RuntimeError(f"Failed to fetch {len(failures)} ticker(s): {sorted(failures)}")
+    return inserted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="drop raw.prices and reload everything")
+    parser.add_argument("--start", default=START_DATE, help="backfill start for new tickers")
+    parser.add_argument("--end", default=END_DATE, help="exclusive end date (default: today)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="concurrent downloads")
+    parser.add_argument("--fixtures", help="read <dir>/<ticker>.csv instead of yfinance")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the on-disk response cache")
+    args = parser.parse_args(argv)
+
+    source = FixtureSource(args.fixtures) if args.fixtures else YFinanceSource()
+    if not args.no_cache:
+        source = CachedSource(source)
+
+    con = duckdb.connect(DB_PATH)
+    run(con, start=args.start, end=args.end, full=args.full, source=source, max_workers=args.workers)
+    print("🎉 RAW ingest complete.")
 
-    con.register("tmp", df)
-    con.execute("INSERT INTO raw.prices SELECT * FROM tmp")
-    con.unregister("tmp")
-    print(f"✅ Loaded {len(df)} rows for {ticker}")
 
-print("🎉 FULL RAW backfill complete.")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+etl/pipeline.py
+
+Run the whole pipeline in one process on one DuckDB connection.
+
+    ingest → bronze → silver → gold ─┬→ score_elasticnet → explain_elasticnet → drift_elasticnet
+                                     ├→ score_lightgbm   → explain_lightgbm   → drift_lightgbm
+                                     └→ grade (cross-sectional 0–5 grade)
+             silver + gold.labels ───┬→ train_elasticnet ┐
+                                     ├→ train_lightgbm   ┴→ (new model files feed scoring)
+                                     └→ backtest
+    raw + bronze + silver + gold ────→ validate (data-quality checks on new partitions)
+    gold + scores + SHAP + drift + dq ───→ publish (read-only Parquet snapshot for readers)
+
+Every stage is skipped when its fingerprint (input table versions, model
+file hashes, code and config; see src/pipeline.py) matches the last
+successful run. Independent branches run concurrently: the two models train
+side by side, and one model's SHAP run overlaps the other's scoring.
+
+Targets:
+ - nightly: ingest through grade, explain, drift, validate and publish, with the models already on disk
+ - weekly:  everything, including training and the back-test
+
+Set PUNTA_PERF=1 (or =sql for DuckDB query profiles) to record every stage
+in ops.stage_runs (see src/perf.py). --memory-limit (or PUNTA_MEMORY_LIMIT)
+caps DuckDB and sizes the chunks the Python-side stages work in (see
+src/memory.py).
+"""
+
+import argparse
+import datetime
+import os
+import duckdb
+
+from etl import (backtest, bronze_transform, drift, explain, generate_gold, grade, ingest_raw, publish, score,
+                 silver_transform, train_baseline, train_lightgbm, validate)
+from src.models import MODEL_PATHS
+from src import memory, perf, quality, snapshot
+from src.pipeline import Pipeline, Stage, configure
+
+# ─── Config ───────────────────────────────────────────────────────────────────────
+DB_PATH      = os.path.join("data", "punta.duckdb")
+MEMORY_LIMIT = os.environ.get(memory.ENV_VAR, memory.DEFAULT_LIMIT)  # DuckDB + Python chunks
+THREADS      = os.cpu_count() or 1
+MAX_PARALLEL = 2  # stages running at once
+NIGHTLY      = ["ingest", "bronze", "silver", "gold", "grade",
+                "score_elasticnet", "score_lightgbm", "explain_elasticnet", "explain_lightgbm",
+                "drift_elasticnet", "drift_lightgbm", "validate", "publish"]
+TRAINING     = ("src.training_data", "src.feature_cache", "src.features", "etl.generate_gold")
+
+
+def build(ingest_source=None) -> Pipeline:
+    stages = [
+        Stage("ingest", lambda con: ingest_raw.run(con, source=ingest_source),
+              outputs=("raw.prices",),
+              code=("etl.ingest_raw",),
+              config={"tickers": ingest_raw.TICKERS, "start": ingest_raw.START_DATE},
+              volatile=lambda: datetime.date.today().isoformat()),  # new bars every day
+        Stage("bronze", bronze_transform.run,
+              inputs=("raw.prices",), outputs=("bronze.prices",),
+              code=("etl.bronze_transform", "src.incremental")),
+        Stage("silver", silver_transform.run,
+              inputs=("bronze.prices",), outputs=("silver.prices",),
+              code=("etl.silver_transform", "src.incremental")),
+        Stage("gold", generate_gold.run,
+              inputs=("silver.prices",), outputs=("gold.features", "gold.labels"),
+              code=("etl.generate_gold", "src.features", "src.labels", "src.panel", "src.pit",
+                    "src.incremental")),
+        Stage("grade", grade.run,
+              inputs=("gold.features",), outputs=(grade.GRADES_TABLE,),
+              code=("etl.grade", "src.cross_section"),
+              config={"pillars": grade.PILLARS}),
+        Stage("train_elasticnet", train_baseline.run,
+              inputs=("silver.prices", "gold.labels"), outputs=(train_baseline.MODEL_PATH,),
+              code=("etl.train_baseline", "src.registry") + TRAINING,
+              config={"n_splits": train_baseline.N_SPLITS}),
+        Stage("train_lightgbm", train_lightgbm.run,
+              inputs=("silver.prices", "gold.labels"), outputs=(train_lightgbm.MODEL_PATH,),
+              code=("etl.train_lightgbm", "src.registry") + TRAINING,
+              config={"trials": train_lightgbm.N_TRIALS, "params": train_lightgbm.BASE_PARAMS}),
+        Stage("backtest", backtest.run,
+              inputs=("silver.prices", "gold.labels"), outputs=("backtest.runs", "backtest.steps"),
+              code=("etl.backtest", "src.backtest") + TRAINING,
+              config=backtest.CONFIG),
+        Stage("validate", validate.run,
+              inputs=("raw.prices", "bronze.prices", "silver.prices", "gold.features", "gold.labels",
+                      grade.GRADES_TABLE),
+              outputs=(quality.RESULTS_TABLE,),
+              code=("etl.validate", "src.quality")),
+        # every table readers see comes from upstream, so this runs last
+        Stage("publish", publish.run,
+              inputs=publish.TABLES, outputs=(snapshot.current_path(),),
+              code=("etl.publish", "src.snapshot")),
+    ]
+    for name, path in MODEL_PATHS.items():
+        # scoring and SHAP read the same inputs; the registry's CURRENT pointer
+        # (its content is the promoted version) ties them to training
+        stages.append(Stage(f"score_{name}", lambda con, name=name: score.run(con, [name]),
+                            inputs=("gold.features", path), outputs=("gold.scores",),
+                            code=("etl.score", "src.models", "src.registry")))
+        stages.append(Stage(f"explain_{name}", lambda con, name=name: explain.run(con, [name]),
+                            inputs=("gold.features", path), outputs=("gold.shap_summary",),
+                            after=(f"score_{name}",),
+                            code=("etl.explain", "src.explain", "src.models", "src.registry")))
+        # PSI ranks features by their SHAP summary, so it runs after explain
+        stages.append(Stage(f"drift_{name}", lambda con, name=name: drift.run(con, [name]),
+                            inputs=("gold.scores", "gold.shap_summary", path), outputs=("ops.drift_results",),
+                            after=(f"explain_{name}",),
+                            code=("etl.drift", "src.drift", "src.models")))
+    return Pipeline(stages)
+
+
+def prepare(con):
+    """Create shared tables up front so concurrent stages never race on DDL."""
+    for schema in ("raw", "gold", "ops", "backtest"):
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+    score.create_tables(con)
+    explain.create_tables(con)
+    backtest.create_tables(con)
+    perf.create_table(con)
+    quality.create_tables(con)
+    drift.create_tables(con)
+
+
+def run(con, target: str = "nightly", only=None, force: bool = False,
+        max_parallel: int = MAX_PARALLEL, ingest_source=None) -> dict:
+    pipeline = build(ingest_source)
+    if only is None and target == "nightly":
+        only = NIGHTLY
+    prepare(con)
+    status = pipeline.run(con, only=only, force=force, max_workers=max_parallel)
+    failed = sorted(s for s, v in status.items() if v in ("failed", "blocked"))
+    if failed:
+        raise RuntimeError(f"pipeline stage(s) did not complete: {failed}")
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=["nightly", "weekly"], default="nightly")
+    parser.add_argument("--only", nargs="+", help="run just these stages (upstream treated as done)")
+    parser.add_argument("--force", action="store_true", help="ignore fingerprints and rerun")
+    parser.add_argument("--parallel", type=int, default=MAX_PARALLEL, help="stages running at once")
+    parser.add_argument("--memory-limit", default=MEMORY_LIMIT,
+                        help="memory ceiling shared by DuckDB (spilling to data/tmp) and chunked Python work")
+    parser.add_argument("--threads", type=int, default=THREADS)
+    parser.add_argument("--fixtures", help="ingest from <dir>/<ticker>.csv instead of yfinance")
+    args = parser.parse_args(argv)
+
+    source = None
+    if args.fixtures:
+        source = ingest_raw.CachedSource(ingest_raw.FixtureSource(args.fixtures))
+
+    os.environ[memory.ENV_VAR] = args.memory_limit  # chunk sizes follow the ceiling too
+    con = duckdb.connect(DB_PATH)
+    configure(con, args.memory_limit, args.threads)
+    try:
+        status = run(con, args.target, args.only, args.force, args.parallel, source)
+    finally:
+        con.close()
+    print("🎉 Pipeline complete:", ", ".join(f"{k}={v}" for k, v in status.items()))
+
+
+if __name__ == "__main__":
+    main()
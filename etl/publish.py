@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+etl/publish.py
+
+Publish the tables readers use as a read-only Parquet snapshot
+(src/snapshot.py) and garbage-collect old snapshots.
+
+This is the pipeline's last stage, so a snapshot is only ever a state the
+whole nightly run has reached. Tables unchanged since the last snapshot are
+hard-linked, not exported again. Readers never open data/punta.duckdb:
+
+    from src import snapshot
+    con = snapshot.connect()   # gold.features, gold.scores, … as views
+"""
+
+import argparse
+import os
+
+import duckdb
+
+from etl.explain import SUMMARY_TABLE
+from etl.generate_gold import GOLD_FEATURES, GOLD_LABELS, SRC_TABLE
+from etl.grade import GRADES_TABLE
+from etl.score import SCORES_TABLE
+from src import drift, perf, quality, snapshot
+
+# ─── Config ───────────────────────────────────────────────────────────────────────
+DB_PATH = os.path.join("data", "punta.duckdb")
+TABLES  = (SRC_TABLE, GOLD_FEATURES, GOLD_LABELS, GRADES_TABLE, SCORES_TABLE, SUMMARY_TABLE,
+           drift.RESULTS_TABLE, quality.RESULTS_TABLE)
+
+
+@perf.instrument("publish")
+def run(con, root: str = snapshot.ROOT, keep: int = snapshot.KEEP) -> str:
+    published = snapshot.publish(con, TABLES, root)
+    tables = snapshot.manifest(published, root)["tables"]
+    exported = [t for t, info in tables.items() if info["exported"]]
+    perf.current().rows(rows_out=sum(tables[t]["rows"] for t in exported))
+    print(f"💾 Published snapshot {published}: {len(exported)} table(s) exported, "
+          f"{len(tables) - len(exported)} unchanged (linked)")
+    for table in exported:
+        print(f"   • {table}: {tables[table]['rows']:,} rows")
+
+    removed = snapshot.gc(root, keep)
+    if removed:
+        print(f"🧹 Removed {len(removed)} old snapshot(s)")
+    return published
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish a read-only Parquet snapshot for readers")
+    parser.add_argument("--keep", type=int, default=snapshot.KEEP, help="old snapshots to keep")
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    run(con, keep=args.keep)
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
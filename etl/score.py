@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+etl/score.py
+
+Nightly batch scoring: gold.features → gold.scores.
+
+Every model is loaded once. Only (ticker, date) rows that have no score yet
+for the model's current version are selected: an anti-join against
+gold.scores, run inside DuckDB. Those rows are streamed in Arrow record
+batches and predicted chunk by chunk; the scores (three narrow columns) are
+inserted once the stream is drained. A retrained model gets a new version
+(its registry version) and rescores history once, replacing the old version's rows;
+a rerun on the same night finds nothing to do.
+
+Each run logs rows, latency, rows/sec and peak RSS per model to
+ops.score_runs, so the distance to the 06:00 ET deadline is visible as the
+universe grows.
+
+Benchmarks (SPY and the sector ETFs, generate_gold.benchmarks()) are not
+scored, as they are not graded (etl/grade.py).
+"""
+
+import argparse
+import datetime
+import os
+import duckdb
+import pyarrow as pa
+
+from etl.generate_gold import FEATURES, GOLD_FEATURES, PASSTHROUGH, SCORES_TABLE, benchmarks
+from src import incremental, perf
+from src.models import MODEL_PATHS, load_model, model_features, model_version, predict
+from src.perf import Timer, peak_rss_mb
+from src.training_data import to_matrix
+
+# ─── Config ───────────────────────────────────────────────────────────────────────
+DB_PATH        = os.path.join("data", "punta.duckdb")
+RUNS_TABLE     = "ops.score_runs"
+COLUMNS        = PASSTHROUGH + FEATURES  # same order as the training matrix
+CHUNK_ROWS     = 250_000
+BUDGET_SECONDS = 15 * 60  # share of the nightly window allotted to scoring
+
+
+def create_tables(con):
+    con.execute("CREATE SCHEMA IF NOT EXISTS gold")
+    con.execute("CREATE SCHEMA IF NOT EXISTS ops")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SCORES_TABLE} (
+            ticker        VARCHAR,
+            date          DATE,
+            model         VARCHAR,
+            model_version VARCHAR,
+            score         DOUBLE,
+            scored_at     TIMESTAMP,
+            PRIMARY KEY (ticker, date, model)
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+            started_at     TIMESTAMP,
+            model          VARCHAR,
+            model_version  VARCHAR,
+            rows           BIGINT,
+            load_seconds   DOUBLE,
+            seconds        DOUBLE,
+            rows_per_sec   DOUBLE,
+            peak_rss_mb    DOUBLE,
+            budget_seconds DOUBLE
+        )
+    """)
+
+
+def pending_sql(name: str, version: str) -> str:
+    """Feature rows without a score from this model version (complete rows only); takes the benchmarks as ?."""
+    not_null = " AND ".join(f"f.{c} IS NOT NULL" for c in COLUMNS)
+    select = ", ".join(f"CAST(f.{c} AS FLOAT) AS {c}" for c in COLUMNS)
+    return f"""
+        SELECT f.ticker, f.date, {select}
+        FROM {GOLD_FEATURES} f
+        ANTI JOIN (
+            SELECT ticker, date FROM {SCORES_TABLE}
+            WHERE model = '{name}' AND model_version = '{version}'
+        ) s USING (ticker, date)
+        WHERE NOT list_contains(?, f.ticker) AND {not_null}
+    """
+
+
+def score_model(con, name: str, path: str, started: datetime.datetime) -> int:
+    with Timer() as load:
+        model = load_model(path)
+        version = model_version(name, path)
+    if model_features(path) not in (None, COLUMNS):
+        raise ValueError(f"{version} was trained on other features than {GOLD_FEATURES} has; retrain it")
+
+    with Timer() as t:
+        bench = benchmarks(con)
+        parts = []
+        with perf.current().profile(con, f"pending_{name}"):
+            reader = con.execute(pending_sql(name, version), [bench]).fetch_record_batch(CHUNK_ROWS)
+            for batch in reader:
+                chunk = pa.Table.from_batches([batch])
+                parts.append(pa.table({
+                    "ticker": chunk.column("ticker"),
+                    "date": chunk.column("date"),
+                    "score": predict(model, to_matrix(chunk, COLUMNS)),
+                }))
+        rows = sum(p.num_rows for p in parts)
+        perf.current().rows(rows_in=rows, rows_out=rows)
+
+        # the anti-join leaves only keys without a current-version score, so once
+        # older versions' rows are gone a plain INSERT suffices (no upsert probe)
+        with incremental.transaction(con):
+            stale = con.execute(f"""
+                DELETE FROM {SCORES_TABLE}
+                WHERE model = ? AND (model_version <> ? OR list_contains(?, ticker))
+            """, [name, version, bench]).fetchone()[0]
+            if rows:
+                con.register("score_rows", pa.concat_tables(parts))
+                con.execute(f"""
+                    INSERT INTO {SCORES_TABLE}
+                    SELECT ticker, date, ?, ?, score, ? FROM score_rows
+                """, [name, version, started])
+                con.unregister("score_rows")
+        if stale or rows:
+            incremental.bump(con, SCORES_TABLE)
+
+    rate = rows / t.elapsed if t.elapsed > 0 else 0.0
+    con.execute(
+        f"INSERT INTO {RUNS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [started, name, version, rows, load.elapsed, t.elapsed, rate, peak_rss_mb(), BUDGET_SECONDS],
+    )
+    print(f"✅ {name:<10} {version} · {rows:,} rows in {t.elapsed:.2f}s "
+          f"({rate:,.0f} rows/s) · load {load.elapsed:.2f}s · peak RSS {peak_rss_mb():,.0f} MiB")
+    return rows
+
+
+@perf.instrument("score")
+def run(con, models=None):
+    """Score every available model; returns {model: rows scored}."""
+    create_tables(con)
+    started = datetime.datetime.now()
+    models = models or [m for m, p in MODEL_PATHS.items() if os.path.exists(p)]
+    scored = {}
+    with Timer() as t:
+        for name in models:
+            scored[name] = score_model(con, name, MODEL_PATHS[name], started)
+    if t.elapsed > BUDGET_SECONDS:
+        print(f"⚠️  scoring took {t.elapsed:.0f}s, over its {BUDGET_SECONDS}s budget")
+    return scored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score new gold.features rows")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODEL_PATHS))
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    run(con, args.models)
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,48 +2,85 @@
 """
 etl/silver_transform.py
 
-Transforms bronze.prices → silver.prices by:
- 1. Recording point-in-time validity.
- 2. Winsorising price columns to ±3σ.
+Transforms bronze.prices → silver.prices by recording point-in-time validity:
+valid_from = date, valid_to = the ticker's next date (NULL for its latest
+row), see src/pit.py.
+
+Prices are not winsorised here: a ±3σ clip over all tickers at once cut every
+high-priced name down to the pooled bound. Outliers are handled per date
+across the universe instead, on the features (src/cross_section.py).
+
+Only (ticker, date) partitions that are new or changed since the last run are
+processed and upserted; --full rebuilds the table.
 """
 
-import duckdb
-import pandas as pd
+import argparse
 import os
 
+import duckdb
+from src import incremental, memory, perf, pit
+
 # ─── Configuration ─────────────────────────────────────────────────────────────
 DB_PATH   = os.path.join("data", "punta.duckdb")
+STAGE     = "silver"
 SRC_TABLE = "bronze.prices"
 DST_TABLE = "silver.prices"
-SIGMA     = 3  # winsorisation threshold
-
-# ─── Connect & load bronze data ────────────────────────────────────────────────
-con = duckdb.connect(DB_PATH)
-# Ensure the silver schema exists
-con.execute("CREATE SCHEMA IF NOT EXISTS silver")
-
-df = con.execute(f"SELECT * FROM {SRC_TABLE}").fetchdf()
-print(f"🔍 Loaded {len(df)} rows from {SRC_TABLE}")
-
-# ─── Stamp point-in-time validity ──────────────────────────────────────────────
-# Add a column showing that this row was valid exactly at 'date'
-df["valid_from"] = df["date"]
-df["valid_to"]   = pd.NaT  # open-ended; training code will fill valid_to = next row
-
-# ─── Winsorise price columns ──────────────────────────────────────────────────
-num_cols = ["open", "high", "low", "close", "adj_close"]
-for col in num_cols:
-    mu = df[col].mean()
-    sigma = df[col].std()
-    lower, upper = mu - SIGMA * sigma, mu + SIGMA * sigma
-    df[col] = df[col].clip(lower=lower, upper=upper)
-    print(f"• {col}: clipped to [{lower:.2f}, {upper:.2f}]")
-
-# ─── Write out silver.prices ──────────────────────────────────────────────────
-# Drop old table
-con.execute(f"DROP TABLE IF EXISTS {DST_TABLE}")
-# Write from DataFrame
-con.register("tmp", df)
-con.execute(f"CREATE TABLE {DST_TABLE} AS SELECT * FROM tmp")
-con.unregister("tmp")
-print(f"✅ Wrote {len(df)} rows to {DST_TABLE}")
+COLUMNS   = """
+    date       DATE,
+    open       DOUBLE,
+    high       DOUBLE,
+    low        DOUBLE,
+    close      DOUBLE,
+    adj_close  DOUBLE,
+    volume     BIGINT,
+    ticker     VARCHAR,
+    valid_from DATE,
+    valid_to   DATE
+"""
+
+
+@perf.instrument(STAGE)
+def run(con, full: bool = False) -> int:
+    with incremental.transaction(con):
+        incremental.ensure_table(con, STAGE, DST_TABLE, COLUMNS, full=full)
+        n_tickers = incremental.plan(con, STAGE, SRC_TABLE)
+        print(f"🔍 {n_tickers} ticker(s) with new or changed rows in {SRC_TABLE}")
+
+        # ─── Upsert planned partitions ─────────────────────────────────────────
+        # valid_from stamps that the row was valid exactly at 'date'; valid_to is
+        # the next bar's date (one window pass over the rewritten rows)
+        with perf.current().profile(con, "upsert"):
+            written = incremental.upsert(con, STAGE, DST_TABLE, f"""
+                SELECT
+                  b.date,
+                  b.open, b.high, b.low, b.close, b.adj_close,
+                  b.volume,
+                  b.ticker,
+                  b.date          AS valid_from,
+                  {pit.valid_to_sql("b.date", "b.ticker")} AS valid_to
+                FROM {SRC_TABLE} b
+                JOIN plan_{STAGE} p USING (ticker)
+                WHERE b.date >= p.write_from
+            """)
+            # the last row before each rewritten range now has a successor
+            pit.close_intervals(con, DST_TABLE, f"plan_{STAGE}")
+        if pit.open_intervals(con, DST_TABLE) > 0:  # written before valid_to was filled
+            print(f"🔍 Filled valid_to on {pit.fill_valid_to(con, DST_TABLE)} older row(s)")
+        incremental.commit(con, STAGE, SRC_TABLE)
+    perf.current().rows(rows_in=written, rows_out=written)  # one silver row per bronze row
+    print(f"✅ Wrote {written} rows to {DST_TABLE}")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transform bronze.prices into silver.prices")
+    parser.add_argument("--full", action="store_true", help="drop silver.prices and rebuild it")
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    memory.configure(con)  # the upsert runs in DuckDB and spills past the ceiling
+    run(con, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
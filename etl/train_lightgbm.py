@@ -3,104 +3,237 @@
 etl/train_lightgbm.py
 
 Train a LightGBM model on gold.features → gold.labels using Optuna for hyperparameter tuning.
-Saves the best model to models/lightgbm_optuna.pkl.
+Registers the final booster (LightGBM's text format) as a new version of
+"lightgbm" in the model registry (src/registry.py) and makes it current.
+
+ - the training matrix is streamed to .npy files and binned into a LightGBM
+   binary Dataset batch by batch (src/lgb_dataset.py), so neither the raw
+   matrix nor a second copy of it has to fit in memory. The binary is reused
+   while the features and labels are unchanged.
+ - each worker loads that binary: every TimeSeriesSplit fold is a subset of
+   it and is reused by every trial
+ - each trial reports its running mean RMSE after every fold, so the median
+   pruner stops bad trials early
+ - trials run in parallel worker processes sharing a journal-file study, with
+   LightGBM threads split between workers; rerunning resumes the study until
+   it holds N_TRIALS finished trials (`--fresh` starts over)
 """
 
+import argparse
+import multiprocessing as mp
 import os
-import sys
 import duckdb
-import pandas as pd
-import joblib
-import lightgbm as lgb
-import optuna
-from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import mean_squared_error
+import numpy as np
 
-# ensure src/ is importable
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from etl.generate_gold import BENCHMARK_TKR, FEATURES, PASSTHROUGH
+from etl import drift
+from src import memory, perf, registry, snapshot
+from src.models import MODEL_PATHS
+from src.training_data import NPY_CACHE, load_training_data
 
 # ─── Config ───────────────────────────────────────────────────────────────────────
 DB_PATH       = os.path.join("data", "punta.duckdb")
-FEATURE_TABLE = "gold.features"
-LABEL_TABLE   = "gold.labels"
-MODEL_PATH    = os.path.join("models", "lightgbm_optuna.pkl")
+MODEL_NAME    = "lightgbm"
+MODEL_PATH    = MODEL_PATHS[MODEL_NAME]  # the registry's CURRENT pointer
+STUDY_PATH    = os.path.join("models", "lightgbm_optuna.journal")
+STUDY_NAME    = "lightgbm_optuna"
 N_SPLITS      = 5
 N_TRIALS      = 50  # adjust as needed
-
-# ─── Load data ───────────────────────────────────────────────────────────────────
-con     = duckdb.connect(DB_PATH)
-df_feat = con.execute(f"SELECT * FROM {FEATURE_TABLE}").fetchdf()
-X       = df_feat.drop(columns=["date"], errors="ignore")
-y       = con.execute(f"SELECT excess_return_12m FROM {LABEL_TABLE}").fetchdf()["excess_return_12m"]
-
-# reset indexes & drop null rows
-X = X.reset_index(drop=True)
-y = y.reset_index(drop=True)
-mask = ~(X.isna().any(axis=1) | y.isna())
-X, y = X[mask], y[mask]
-
-# ─── TimeSeries cross-validation splits ──────────────────────────────────────────
-tscv  = TimeSeriesSplit(n_splits=N_SPLITS)
-splits = list(tscv.split(X))
-
-def objective(trial):
-    # define hyperparameter search space
-    params = {
-        "objective": "regression",
-        "metric": "rmse",
-        "verbosity": -1,
-        "boosting_type": "gbdt",
-        "learning_rate": trial.suggest_float("learning_rate", 1e-3, 1e-1, log=True),
-        "num_leaves": trial.suggest_int("num_leaves", 16, 128),
-        "feature_fraction": trial.suggest_float("feature_fraction", 0.5, 1.0),
-        "bagging_fraction": trial.suggest_float("bagging_fraction", 0.5, 1.0),
-        "bagging_freq": trial.suggest_int("bagging_freq", 1, 10),
-        "min_data_in_leaf": trial.suggest_int("min_data_in_leaf", 5, 50),
-        "lambda_l1": trial.suggest_float("lambda_l1", 1e-3, 10.0, log=True),
-        "lambda_l2": trial.suggest_float("lambda_l2", 1e-3, 10.0, log=True),
-    }
-
-    rmses = []
-    for train_idx, test_idx in splits:
-        X_tr, X_te = X.iloc[train_idx], X.iloc[test_idx]
-        y_tr, y_te = y.iloc[train_idx], y.iloc[test_idx]
-
-        train_data = lgb.Dataset(X_tr, label=y_tr)
-        valid_data = lgb.Dataset(X_te, label=y_te, reference=train_data)
-
-        bst = lgb.train(
-            params,
-            train_data,
-            num_boost_round=1000,
-            valid_sets=[valid_data],
-            callbacks=[
-                lgb.early_stopping(stopping_rounds=50),
-                lgb.log_evaluation(period=0),
-            ]
-        )
-
-        y_pred = bst.predict(X_te)
-        # compute RMSE since mean_squared_error no longer accepts squared=False
-        mse = mean_squared_error(y_te, y_pred)
-        rmse = mse ** 0.5
-        rmses.append(rmse)
-
-
-    # average RMSE across folds
-    return sum(rmses) / len(rmses)
-
-# ─── Run the Optuna study ─────────────────────────────────────────────────────────
-study = optuna.create_study(direction="minimize")
-study.optimize(objective, n_trials=N_TRIALS)
-
-print("✅ Best trial parameters:", study.best_params)
-print("   Best RMSE:", study.best_value)
-
-# ─── Train final model on full data ──────────────────────────────────────────────
-final_data  = lgb.Dataset(X, label=y)
-final_model = lgb.train(study.best_params, final_data, num_boost_round=study.best_trial.number * 10)
-
-# ─── Save the model ───────────────────────────────────────────────────────────────
-os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-joblib.dump(final_model, MODEL_PATH)
-print(f"💾 LightGBM model saved to {MODEL_PATH}")
+N_WORKERS     = min(4, os.cpu_count() or 1)
+MAX_ROUNDS    = 1000
+EARLY_STOP    = 50
+BASE_PARAMS   = {
+    "objective": "regression",
+    "metric": "rmse",
+    "verbosity": -1,
+    "boosting_type": "gbdt",
+}
+DATASET_PARAMS = {
+    "feature_pre_filter": False,  # lets trials change min_data_in_leaf on one binned Dataset
+    "verbosity": -1,
+}
+
+
+def storage(path: str = STUDY_PATH):
+    from optuna.storages import JournalStorage
+    from optuna.storages.journal import JournalFileBackend
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return JournalStorage(JournalFileBackend(path))
+
+
+def fold_datasets(full, n_splits: int = N_SPLITS):
+    """Every fold is a (train, valid) pair of subsets of the binned lgb.Dataset `full`."""
+    from sklearn.model_selection import TimeSeriesSplit
+
+    folds = []
+    for train_idx, test_idx in TimeSeriesSplit(n_splits=n_splits).split(np.arange(full.num_data())):
+        train = full.subset(train_idx).construct()
+        valid = full.subset(test_idx).construct()
+        folds.append((train, valid))
+    return folds
+
+
+def make_objective(folds, num_threads: int):
+    import lightgbm as lgb
+    import optuna
+
+    def objective(trial):
+        # define hyperparameter search space
+        params = {
+            **BASE_PARAMS,
+            "num_threads": num_threads,
+            "learning_rate": trial.suggest_float("learning_rate", 1e-3, 1e-1, log=True),
+            "num_leaves": trial.suggest_int("num_leaves", 16, 128),
+            "feature_fraction": trial.suggest_float("feature_fraction", 0.5, 1.0),
+            "bagging_fraction": trial.suggest_float("bagging_fraction", 0.5, 1.0),
+            "bagging_freq": trial.suggest_int("bagging_freq", 1, 10),
+            "min_data_in_leaf": trial.suggest_int("min_data_in_leaf", 5, 50),
+            "lambda_l1": trial.suggest_float("lambda_l1", 1e-3, 10.0, log=True),
+            "lambda_l2": trial.suggest_float("lambda_l2", 1e-3, 10.0, log=True),
+        }
+
+        rmses, rounds = [], []
+        for step, (train_data, valid_data) in enumerate(folds):
+            bst = lgb.train(
+                params,
+                train_data,
+                num_boost_round=MAX_ROUNDS,
+                valid_sets=[valid_data],
+                callbacks=[
+                    lgb.early_stopping(stopping_rounds=EARLY_STOP, verbose=False),
+                    lgb.log_evaluation(period=0),
+                ]
+            )
+            rmses.append(bst.best_score["valid_0"]["rmse"])
+            rounds.append(bst.best_iteration or MAX_ROUNDS)
+
+            # report the running mean so the pruner compares trials fold by fold
+            trial.report(float(np.mean(rmses)), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+
+        trial.set_user_attr("num_boost_round", int(np.mean(rounds)))
+        # average RMSE across folds
+        return float(np.mean(rmses))
+
+    return objective
+
+
+def open_study(path: str = STUDY_PATH, fresh: bool = False):
+    """The persisted study, resumed unless `fresh`."""
+    import optuna
+
+    if fresh and os.path.exists(path):
+        os.remove(path)
+    return optuna.create_study(
+        study_name=STUDY_NAME,
+        storage=storage(path),
+        direction="minimize",
+        pruner=optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=0),
+        load_if_exists=True,
+    )
+
+
+def final_booster(study, binary: str):
+    """(booster, params) refit on the whole binned Dataset with the best trial's parameters and rounds."""
+    import lightgbm as lgb
+    from src import lgb_dataset
+
+    params = {**BASE_PARAMS, **study.best_params}
+    rounds = study.best_trial.user_attrs["num_boost_round"]
+    booster = lgb.train(params, lgb_dataset.load(binary, DATASET_PARAMS), num_boost_round=rounds)
+    return booster, {**params, "num_boost_round": rounds}
+
+
+def worker(binary: str, n_trials: int, num_threads: int, study_path: str):
+    """One worker process: load the binned folds once, then pull trials until the study is full."""
+    import optuna
+    from optuna.trial import TrialState
+    from src import lgb_dataset
+
+    study = optuna.load_study(study_name=STUDY_NAME, storage=storage(study_path))
+    # MaxTrialsCallback only checks after a trial, so a full study must not start one
+    if len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED))) >= n_trials:
+        return
+    folds = fold_datasets(lgb_dataset.load(binary, DATASET_PARAMS))
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study.optimize(
+        make_objective(folds, num_threads),
+        callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=(TrialState.COMPLETE, TrialState.PRUNED))],
+    )
+
+
+@perf.instrument("train_lightgbm")
+def run(con, trials: int = N_TRIALS, workers: int = N_WORKERS, fresh: bool = False,
+        reference: bool = True):
+    from optuna.trial import TrialState
+    from src import lgb_dataset
+
+    # ─── Load data ───────────────────────────────────────────────────────────────
+    data = load_training_data(
+        con, FEATURES, passthrough=PASSTHROUGH, exclude=[BENCHMARK_TKR], npy_cache=NPY_CACHE, stream=True
+    )
+    binary = lgb_dataset.build(data.path, data.feature_names, DATASET_PARAMS)
+    perf.current().rows(rows_in=len(data.X))
+
+    # ─── Run the Optuna study ────────────────────────────────────────────────────
+    study = open_study(STUDY_PATH, fresh)
+    done = len(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED)))
+    workers = max(1, min(workers, trials - done))
+    num_threads = max(1, (os.cpu_count() or 1) // workers)  # no oversubscription
+    print(f"🔎 {done}/{trials} trials done · {workers} worker(s) × {num_threads} thread(s)")
+
+    if done < trials:
+        # every worker loads the binned Dataset from the binary file
+        ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+        procs = [
+            ctx.Process(target=worker, args=(binary, trials, num_threads, STUDY_PATH))
+            for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        if any(p.exitcode for p in procs):
+            raise RuntimeError("an Optuna worker failed; rerun to resume the study")
+
+    pruned = len(study.get_trials(deepcopy=False, states=(TrialState.PRUNED,)))
+    print("✅ Best trial parameters:", study.best_params)
+    print("   Best RMSE:", study.best_value)
+    print(f"   {pruned} trial(s) pruned")
+
+    # ─── Train final model on full data ──────────────────────────────────────────
+    final_model, final_params = final_booster(study, binary)
+
+    # ─── Register the model version ──────────────────────────────────────────────
+    version = registry.save(
+        MODEL_NAME, final_model, data, params=final_params, metrics={"cv_rmse": study.best_value},
+    )
+    print(f"💾 LightGBM model registered as {version}")
+
+    # ─── Reference histograms for the drift monitor ──────────────────────────────
+    if reference:
+        drift.save_reference(con, version, data)
+    else:  # a snapshot connection is thrown away; the drift stage builds it from the warehouse
+        print("⏭️  Drift reference left to the drift stage")
+    return final_model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optuna-tuned LightGBM on gold features")
+    parser.add_argument("--trials", type=int, default=N_TRIALS, help="finished trials the study should hold")
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    parser.add_argument("--fresh", action="store_true", help="discard the persisted study and start over")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="train on the last published snapshot (src/snapshot.py) while the pipeline runs")
+    args = parser.parse_args(argv)
+
+    con = snapshot.connect() if args.snapshot else duckdb.connect(DB_PATH)
+    memory.configure(con)
+    run(con, args.trials, args.workers, args.fresh, reference=not args.snapshot)
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+etl/validate.py
+
+Data-quality checks for every layer, pushed down into DuckDB (src/quality.py):
+one aggregate scan per table over the partitions added since the last
+check. Results land in ops.dq_results; failures are printed and,
+with --strict, make the run exit non-zero.
+
+ - raw:    schema, minimum size, no NULL keys
+ - bronze: schema, unique (ticker, date), no NULLs, positive prices and
+           volume, low ≤ open/close ≤ high, no long gaps between trading days
+ - silver: as bronze, plus valid_from
+ - gold:   schema and keys of gold.features / gold.labels / gold.grades,
+           label, indicator and grade ranges
+
+Use --full to forget the watermarks and re-check whole tables.
+"""
+
+import argparse
+import os
+import sys
+import duckdb
+
+from etl import bronze_transform, generate_gold, grade, silver_transform
+from src import perf, quality
+from src.pipeline import table_exists
+from src.quality import Suite, between, max_gap, not_null, ohlc_consistent, parse_columns, unique
+
+# ─── Config ───────────────────────────────────────────────────────────────────────
+DB_PATH   = os.path.join("data", "punta.duckdb")
+MIN_ROWS  = 500  # raw.prices must hold at least this many rows
+MAX_GAP_D = 10   # calendar days between consecutive bars of a ticker
+PRICES    = ["open", "high", "low", "close", "adj_close"]
+
+CLEAN_PRICES = [
+    unique("ticker", "date"),
+    *not_null("date", "ticker", *PRICES, "volume"),
+    *[between(c, lo=0, strict=True) for c in PRICES],
+    between("volume", lo=0, strict=True),
+    ohlc_consistent(),
+    max_gap(MAX_GAP_D),
+]
+
+SUITES = {
+    # raw.prices has the bronze layout, before any cleaning
+    "raw": [Suite("raw.prices", parse_columns(bronze_transform.COLUMNS),
+                  not_null("date", "ticker"), min_rows=MIN_ROWS)],
+    "bronze": [Suite("bronze.prices", parse_columns(bronze_transform.COLUMNS), CLEAN_PRICES)],
+    "silver": [Suite("silver.prices", parse_columns(silver_transform.COLUMNS),
+                     CLEAN_PRICES + not_null("valid_from"))],
+    "gold": [
+        Suite(generate_gold.GOLD_FEATURES, parse_columns(generate_gold.FEATURE_COLUMNS), [
+            unique("ticker", "date"),
+            *not_null("date", "ticker", *PRICES),
+            between("momentum_12m", lo=-1),
+            between("rsi_14", lo=0, hi=100),
+            between("dist_52w_high", lo=-1, hi=0),
+        ]),
+        Suite(generate_gold.GOLD_LABELS, parse_columns(generate_gold.LABEL_COLUMNS), [
+            unique("ticker", "date"),
+            *not_null("date", "ticker"),
+            between("stock_fwd_ret", lo=-1),
+            between("hit_2pct", lo=0, hi=1),
+            *(between(name, lo=-1) for name, _ in generate_gold.LABELS.columns() if "fwd_ret_" in name),
+            *(between(name, lo=0, hi=1) for name, _ in generate_gold.LABELS.columns() if name.startswith("hit_")),
+        ]),
+        Suite(grade.GRADES_TABLE, parse_columns(grade.COLUMNS), [
+            unique("ticker", "date"),
+            *not_null("date", "ticker", "score", "grade"),
+            between("grade", lo=0, hi=grade.GRADE_MAX),
+        ]),
+    ],
+}
+
+
+@perf.instrument("validate")
+def run(con, layers=None, full: bool = False) -> list:
+    """Validate the given layers (default: all); returns the failed result rows."""
+    quality.create_tables(con)
+    failed = []
+    for layer in layers or SUITES:
+        for suite in SUITES[layer]:
+            if not table_exists(con, suite.table):
+                print(f"⏭️  {suite.table}: table does not exist yet")
+                continue
+            rows = quality.validate(con, layer, suite, full=full)
+            checked = rows[-1][4]
+            perf.current().rows(rows_in=checked)
+            bad = [r for r in rows if not r[6]]
+            failed += bad
+            status = "✅" if not bad else "❌"
+            print(f"{status} {suite.table}: {len(rows) - len(bad)}/{len(rows)} checks passed "
+                  f"on {checked:,} new row(s)")
+            for r in bad:
+                print(f"   • {r[3]}: {r[5]:,} failure(s){f' ({r[7]})' if r[7] else ''}")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--layers", nargs="+", choices=list(SUITES))
+    parser.add_argument("--full", action="store_true", help="re-check whole tables, not just new partitions")
+    parser.add_argument("--strict", action="store_true", help="exit 1 if any check fails")
+    args = parser.parse_args(argv)
+
+    con = duckdb.connect(DB_PATH)
+    failed = run(con, args.layers, args.full)
+    con.close()
+    if args.strict and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
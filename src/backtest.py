@@ -0,0 +1,242 @@
+# src/backtest.py
+"""
+Walk-forward back-test engine.
+
+Rows come from src.training_data, ordered by (date, ticker). That makes every
+expanding training window a prefix X[:train_end], and every rebalance
+cross-section a contiguous slice X[lo:hi].
+
+ - grid: the first trading day of each month (or week) is a rebalance date.
+   Training rows must have a label that was fully realised before it. The
+   purge drops the last `horizon` trading days before the rebalance date,
+   and the embargo drops `embargo` more.
+ - ElasticNet: the centred Gram sufficient statistics (n, Σx, Σy, XᵀX, Xᵀy)
+   are updated with the rows added since the previous step. The model is then
+   solved by coordinate descent on the Gram matrix, warm-started from the
+   previous coefficients. Each step costs O(new rows · p² + p²) instead of a
+   refit over the whole history.
+ - LightGBM: X is binned once per worker, and each step is a subset of it.
+   Each step adds `step_rounds` trees on top of the previous trees. This is
+   the same as `init_model`, but `init_model` re-scores the whole window
+   with every existing tree at each step. Here the window's raw score is
+   kept instead: new rows are scored once, and only by trees they have not
+   seen yet.
+ - parallelism: the grid is cut into contiguous segments, one per worker
+   process. A segment cold-starts at its first step and warm-starts after
+   that, so LightGBM results depend slightly on the number of workers.
+"""
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+ROWS_PER_CHUNK = 1_000_000  # Gram updates in float64 chunks of this many rows
+
+
+@dataclass(frozen=True)
+class Step:
+    rebalance: np.datetime64   # rebalance date (the test cross-section)
+    train_end: int             # rows [0, train_end) are the training window
+    test_lo: int               # rows [test_lo, test_hi) are dated `rebalance`
+    test_hi: int
+
+
+def make_grid(dates: np.ndarray, freq: str = "M", horizon: int = 252, embargo: int = 0,
+              min_train_rows: int = 1) -> list:
+    """Rebalance steps over `dates` (sorted ascending, one entry per row)."""
+    calendar = np.unique(dates)
+    periods = calendar.astype(f"datetime64[{freq}]")
+    first = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+
+    steps = []
+    for p in first:
+        cut = p - horizon - embargo  # first trading day whose label overlaps the test date
+        if cut <= 0:
+            continue
+        train_end = int(np.searchsorted(dates, calendar[cut], side="left"))
+        if train_end < min_train_rows:
+            continue
+        lo, hi = np.searchsorted(dates, calendar[p], side="left"), np.searchsorted(dates, calendar[p], side="right")
+        steps.append(Step(calendar[p], train_end, int(lo), int(hi)))
+    return steps
+
+
+# ─── ElasticNet on sufficient statistics ──────────────────────────────────────────
+class GramStats:
+    """Running n, Σx, Σy, XᵀX, Xᵀy in float64."""
+
+    def __init__(self, p: int):
+        self.n = 0
+        self.sx = np.zeros(p)
+        self.sy = 0.0
+        self.sxx = np.zeros((p, p))
+        self.sxy = np.zeros(p)
+
+    def add(self, X: np.ndarray, y: np.ndarray):
+        for lo in range(0, len(X), ROWS_PER_CHUNK):
+            Xc = np.asarray(X[lo:lo + ROWS_PER_CHUNK], dtype=np.float64)
+            yc = np.asarray(y[lo:lo + ROWS_PER_CHUNK], dtype=np.float64)
+            self.n += len(Xc)
+            self.sx += Xc.sum(axis=0)
+            self.sy += yc.sum()
+            self.sxx += Xc.T @ Xc
+            self.sxy += Xc.T @ yc
+
+    def centred(self):
+        """(G, c, x̄, ȳ) with G = XcᵀXc / n and c = Xcᵀyc / n for centred X, y."""
+        xm, ym = self.sx / self.n, self.sy / self.n
+        G = self.sxx / self.n - np.outer(xm, xm)
+        c = self.sxy / self.n - xm * ym
+        return G, c, xm, ym
+
+
+def enet_gram(G: np.ndarray, c: np.ndarray, alpha: float, l1_ratio: float,
+              w: np.ndarray = None, tol: float = 1e-6, max_iter: int = 10_000) -> np.ndarray:
+    """
+    Coordinate descent for sklearn's ElasticNet objective on centred data,
+    ½wᵀGw − cᵀw + α·l1·‖w‖₁ + ½α(1−l1)‖w‖², given only G and c.
+    """
+    p = len(c)
+    w = np.zeros(p) if w is None else np.array(w, dtype=np.float64)
+    l1, l2 = alpha * l1_ratio, alpha * (1.0 - l1_ratio)
+    Gw = G @ w
+    for _ in range(max_iter):
+        max_delta, max_w = 0.0, 0.0
+        for j in range(p):
+            if G[j, j] <= 0.0:
+                continue
+            rho = c[j] - Gw[j] + G[j, j] * w[j]
+            new = np.sign(rho) * max(abs(rho) - l1, 0.0) / (G[j, j] + l2)
+            if new != w[j]:
+                Gw += G[:, j] * (new - w[j])
+                max_delta = max(max_delta, abs(new - w[j]))
+                w[j] = new
+            max_w = max(max_w, abs(w[j]))
+        if max_delta <= tol * max(max_w, 1.0):
+            break
+    return w
+
+
+# ─── Workers ──────────────────────────────────────────────────────────────────────
+_X = _y = _tickers = None
+
+
+def _init_worker(X, y, tickers):
+    global _X, _y, _tickers
+    _X, _y, _tickers = X, y, tickers
+
+
+def _evaluate(step: Step, pred: np.ndarray, top_fraction: float, hit_threshold: float) -> dict:
+    """Equal-weight top-fraction portfolio on the rebalance cross-section."""
+    realised = np.asarray(_y[step.test_lo:step.test_hi], dtype=np.float64)
+    k = max(1, int(round(len(pred) * top_fraction)))
+    top = np.argsort(-pred, kind="stable")[:k]
+    ranks_p = np.argsort(np.argsort(pred))
+    ranks_y = np.argsort(np.argsort(realised))
+    ic = np.corrcoef(ranks_p, ranks_y)[0, 1] if len(pred) > 1 else np.nan
+    return {
+        "rebalance_date": step.rebalance,
+        "train_rows": step.train_end,
+        "universe": len(pred),
+        "selected": k,
+        "alpha": float(realised[top].mean()),
+        "hit_rate": float((realised[top] >= hit_threshold).mean()),
+        "ic": float(ic),
+        "holdings": sorted(_tickers[step.test_lo:step.test_hi][top].tolist()),
+    }
+
+
+def _raw(boosters, X) -> np.ndarray:
+    return np.sum([b.predict(X, raw_score=True) for b in boosters], axis=0)
+
+
+def _segment(model: str, steps, config: dict) -> list:
+    X, y = _X, _y
+    out = []
+    if model == "elasticnet":
+        stats, w, seen = GramStats(X.shape[1]), None, 0
+        for step in steps:
+            stats.add(X[seen:step.train_end], y[seen:step.train_end])
+            seen = step.train_end
+            G, c, xm, ym = stats.centred()
+            w = enet_gram(G, c, config["alpha"], config["l1_ratio"], w)
+            pred = np.asarray(X[step.test_lo:step.test_hi], dtype=np.float64) @ w + (ym - xm @ w)
+            out.append(_evaluate(step, pred, config["top_fraction"], config["hit_threshold"]))
+
+    elif model == "lightgbm":
+        import lightgbm as lgb
+
+        full = lgb.Dataset(X, label=y, params={"feature_pre_filter": False, "verbosity": -1},
+                           free_raw_data=False).construct()
+        params = {**config["lgb_params"], "num_threads": config["num_threads"]}
+        boosters, seen = [], 0
+        score = np.zeros(len(X))  # raw ensemble score of rows [0, seen)
+        for step in steps:
+            # rows new to the window are scored once by the existing trees
+            if boosters:
+                score[seen:step.train_end] = _raw(boosters, X[seen:step.train_end])
+            seen = step.train_end
+
+            train = full.subset(np.arange(step.train_end))
+            if boosters:
+                train.set_init_score(score[:step.train_end])
+            booster = lgb.train(
+                params,
+                train,
+                num_boost_round=config["step_rounds"] if boosters else config["initial_rounds"],
+            )
+            score[:step.train_end] += booster.predict(X[:step.train_end], raw_score=True)
+            boosters.append(booster)
+
+            pred = _raw(boosters, X[step.test_lo:step.test_hi])
+            out.append(_evaluate(step, pred, config["top_fraction"], config["hit_threshold"]))
+
+    else:
+        raise ValueError(f"unknown model {model!r}")
+    return out
+
+
+def run(X, y, tickers, steps, models, config: dict, workers: int = 1) -> dict:
+    """Run every model over `steps`; returns {model: [step result, …]} in date order."""
+    workers = max(1, min(workers, len(steps)))
+    segments = [list(s) for s in np.array_split(np.arange(len(steps)), workers) if len(s)]
+    config = {**config, "num_threads": max(1, (os.cpu_count() or 1) // workers)}
+
+    if workers == 1:
+        _init_worker(X, y, tickers)
+        return {m: _segment(m, steps, config) for m in models}
+
+    # fork where available: workers share X/y instead of pickling them
+    ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(X, y, tickers)) as pool:
+        futures = {m: [pool.submit(_segment, m, [steps[i] for i in seg], config) for seg in segments]
+                   for m in models}
+        return {m: [r for f in fs for r in f.result()] for m, fs in futures.items()}
+
+
+def summarise(results: list, periods_per_year: float) -> dict:
+    """Add per-step turnover in place; return alpha, hit rate, IR, IC and annual turnover."""
+    prev = None
+    for r in results:
+        cur = set(r["holdings"])
+        if prev is None:
+            r["turnover"] = None
+        else:
+            w_prev, w_cur = 1.0 / len(prev), 1.0 / len(cur)
+            r["turnover"] = 0.5 * sum(abs((t in cur) * w_cur - (t in prev) * w_prev) for t in cur | prev)
+        prev = cur
+
+    alpha = np.array([r["alpha"] for r in results])
+    turnover = [r["turnover"] for r in results if r["turnover"] is not None]
+    return {
+        "steps": len(results),
+        "alpha": float(alpha.mean()) if len(alpha) else np.nan,
+        "hit_rate": float(np.mean([r["hit_rate"] for r in results])) if results else np.nan,
+        "ir": float(alpha.mean() / alpha.std(ddof=1)) if len(alpha) > 1 and alpha.std(ddof=1) > 0 else np.nan,
+        "ic": float(np.nanmean([r["ic"] for r in results])) if results else np.nan,
+        "annual_turnover": float(np.mean(turnover) * periods_per_year) if turnover else np.nan,
+    }
@@ -0,0 +1,96 @@
+# src/cross_section.py
+"""
+Cross-sectional (per-date, across the universe) transforms of panel columns.
+
+Rows are sorted by date (the loader orders them), so every date is one
+contiguous block and every per-date statistic is a reduceat over those
+blocks, for all columns of a matrix at once:
+ - zscore:  (x − date mean) / date std, winsorised to ±`clip`
+ - rank:    percentile of x among the date's non-NaN values, 0 (lowest) to 1
+ - blend:   weighted mean of z-scored columns, over the columns a row has
+
+NaN values are left out of every statistic and stay NaN.
+"""
+
+import numpy as np
+
+CLIP = 3.0  # winsorise z-scores at ±CLIP standard deviations
+
+
+class CrossSection:
+    """Row layout of a panel sorted by date; `dates` in row order."""
+
+    def __init__(self, dates: np.ndarray):
+        n = len(dates)
+        boundary = np.ones(n, dtype=bool)
+        boundary[1:] = dates[1:] != dates[:-1]
+        self.n = n
+        self.starts = np.flatnonzero(boundary)           # first row of each date
+        self.sizes = np.diff(np.append(self.starts, n))  # rows per date
+        self.group = np.cumsum(boundary) - 1             # date number of each row
+
+    def _sums(self, X: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """Per-date sums of the valid entries of each column of X."""
+        if self.n == 0:
+            return np.zeros((0,) + X.shape[1:])
+        return np.add.reduceat(np.where(valid, X, 0.0), self.starts, axis=0)
+
+    def _rows(self, per_date: np.ndarray) -> np.ndarray:
+        """Broadcast per-date values back to the rows."""
+        return np.repeat(per_date, self.sizes, axis=0)
+
+    def mean_std(self, X: np.ndarray):
+        """Per-row date mean and sample std of each column of X (rows × columns)."""
+        valid = ~np.isnan(X)
+        n = self._sums(valid, valid)
+        mean = self._rows(self._sums(X, valid) / np.where(n > 0, n, np.nan))
+        dev = X - mean  # two-pass: no cancellation
+        var = self._sums(dev * dev, valid) / np.where(n > 1, n - 1, np.nan)
+        return mean, self._rows(np.sqrt(var))
+
+    def zscore(self, X: np.ndarray, clip: float = CLIP) -> np.ndarray:
+        """Winsorised per-date z-scores of each column of X; a date with no spread gives 0."""
+        mean, std = self.mean_std(X)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = np.where(std > 0, (X - mean) / std, np.where(np.isnan(X), np.nan, 0.0))
+        return np.clip(z, -clip, clip)
+
+    def rank(self, x: np.ndarray) -> np.ndarray:
+        """Percentile rank of x within its date: ties share their mean rank, alone → 0.5."""
+        # sorting each date's block on its own is far faster than one global
+        # (date, value) sort; NaNs sort to the end of their block
+        order = np.empty(self.n, dtype=np.int64)
+        for s, size in zip(self.starts, self.sizes):
+            order[s:s + size] = s + np.argsort(x[s:s + size], kind="stable")
+        v = x[order]
+        keep = np.flatnonzero(~np.isnan(v))
+        out = np.full(self.n, np.nan)
+        if len(keep) == 0:
+            return out
+        g, v = self.group[keep], v[keep]
+
+        # first position of each date and of each run of tied values
+        new_group = np.ones(len(g), dtype=bool)
+        new_group[1:] = g[1:] != g[:-1]
+        new_tie = new_group.copy()
+        new_tie[1:] |= v[1:] != v[:-1]
+        group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(g)), 0))
+        tie_id = np.cumsum(new_tie) - 1
+        tie_start = np.flatnonzero(new_tie)
+        tie_end = np.append(tie_start[1:], len(g)) - 1
+        count = np.bincount(g, minlength=g[-1] + 1)[g]
+        pos = (tie_start[tie_id] + tie_end[tie_id]) / 2 - group_start  # mean 0-based rank of the tie
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[order[keep]] = np.where(count > 1, pos / (count - 1), 0.5)
+        return out
+
+    def blend(self, Z: np.ndarray, weights) -> np.ndarray:
+        """
+        Σ wⱼ·zⱼ / Σ|wⱼ| per row over the columns it has (negative weights flip
+        a column's sign); NaN where a row has none.
+        """
+        w = np.asarray(weights, dtype=np.float64)
+        valid = ~np.isnan(Z)
+        total = valid @ np.abs(w)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(valid, Z, 0.0) @ w / np.where(total > 0, total, np.nan)
@@ -0,0 +1,268 @@
+# src/drift.py
+"""
+Feature drift (PSI) from incremental histogram sketches.
+
+ - reference: when a model is trained, every feature's training values are
+   cut into BINS quantile bins. The bin edges and per-bin counts are stored
+   per model version, for each ticker group and for "ALL".
+ - current: monthly histograms of the scored rows dated after the training
+   data, binned with the same edges inside DuckDB. Each night only the
+   months holding newly scored rows (gold.scores.scored_at past the
+   version's watermark) are recounted. A row rescored after its features
+   changed (generate_gold.forget_scores) is then counted once, with its new
+   values.
+ - PSI = Σ (q - p) · ln(q / p) over bins, p = reference share, q = share
+   over the last WINDOW_MONTHS of current histograms. It reads only the
+   stored counts: O(bins) per feature and group, independent of rows.
+
+Ticker groups are exchanges, taken from the ticker suffix (1211.HK → HK).
+Tickers without a known suffix are US. A bin is "value ≤ edge", so
+np.searchsorted(edges, x) in Python and len(list_filter(edges, e -> e < x))
+in SQL give the same bin.
+"""
+
+import datetime
+
+import numpy as np
+import pyarrow as pa
+
+from src import incremental
+
+EDGES_TABLE      = "ops.drift_edges"
+HISTOGRAMS_TABLE = "ops.drift_histograms"
+STATE_TABLE      = "ops.drift_state"
+RESULTS_TABLE    = "ops.drift_results"
+BINS             = 10
+ALL_GROUP        = "ALL"
+DEFAULT_GROUP    = "US"
+EXCHANGE_GROUPS  = {"HK": "HK", "SS": "CN", "SZ": "CN", "TW": "TW", "NS": "IN", "BO": "IN",
+                    "L": "UK", "T": "JP", "TO": "CA", "AS": "EU", "PA": "EU", "DE": "EU"}
+EPSILON          = 1e-4  # floor for empty bins, keeps ln(q / p) finite
+WARN_PSI         = 0.10
+ALERT_PSI        = 0.25  # charter KPI: PSI on top features < 0.25
+WINDOW_MONTHS    = 3     # current distribution = the last few months of scored rows
+MIN_ROWS         = 100   # fewer current rows than this → PSI is reported as too noisy
+REFERENCE_SAMPLE = 1_000_000  # training rows the bin edges are estimated from
+
+
+def ticker_group(ticker: str) -> str:
+    suffix = ticker.rsplit(".", 1)[1] if "." in ticker else ""
+    return EXCHANGE_GROUPS.get(suffix, DEFAULT_GROUP)
+
+
+def ticker_group_sql(col: str = "ticker") -> str:
+    cases = " ".join(f"WHEN '{s}' THEN '{g}'" for s, g in EXCHANGE_GROUPS.items())
+    return (f"CASE CASE WHEN contains({col}, '.') THEN regexp_extract({col}, '\\.([^.]*)$', 1) END "
+            f"{cases} ELSE '{DEFAULT_GROUP}' END")
+
+
+def quantile_edges(x: np.ndarray, bins: int = BINS) -> np.ndarray:
+    """Interior bin edges at the reference quantiles (ties collapse bins)."""
+    return np.unique(np.quantile(x, np.linspace(0, 1, bins + 1)[1:-1]))
+
+
+def psi(p: np.ndarray, q: np.ndarray, eps: float = EPSILON) -> float:
+    """PSI between two histograms of counts over the same bins."""
+    p = np.maximum(p / p.sum(), eps)
+    q = np.maximum(q / q.sum(), eps)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def status_of(value, rows: int) -> str:
+    if value is None or rows < MIN_ROWS:
+        return "too_few_rows"
+    return "alert" if value >= ALERT_PSI else "warn" if value >= WARN_PSI else "ok"
+
+
+# ─── Storage ──────────────────────────────────────────────────────────────────────
+def create_tables(con):
+    con.execute("CREATE SCHEMA IF NOT EXISTS ops")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {EDGES_TABLE} (
+            model_version VARCHAR,
+            feature       VARCHAR,
+            edges         DOUBLE[],
+            reference_end DATE,
+            PRIMARY KEY (model_version, feature)
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HISTOGRAMS_TABLE} (
+            model_version VARCHAR,
+            kind          VARCHAR,  -- 'reference' | 'current'
+            feature       VARCHAR,
+            grp           VARCHAR,
+            period        DATE,     -- month of the scored rows; reference_end for 'reference'
+            bin           INTEGER,
+            n             BIGINT,
+            PRIMARY KEY (model_version, kind, feature, grp, period, bin)
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+            model_version VARCHAR PRIMARY KEY,
+            scored_through TIMESTAMP
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {RESULTS_TABLE} (
+            checked_at    TIMESTAMP,
+            model         VARCHAR,
+            model_version VARCHAR,
+            feature       VARCHAR,
+            grp           VARCHAR,
+            shap_rank     INTEGER,
+            psi           DOUBLE,
+            ref_rows      BIGINT,
+            cur_rows      BIGINT,
+            status        VARCHAR
+        )
+    """)
+
+
+def has_reference(con, version: str) -> bool:
+    return con.execute(f"SELECT COUNT(*) FROM {EDGES_TABLE} WHERE model_version = ?", [version]).fetchone()[0] > 0
+
+
+# ─── Reference (training time) ────────────────────────────────────────────────────
+def save_reference(con, version: str, data, bins: int = BINS) -> int:
+    """
+    Store edges and reference histograms for `version` from its training
+    matrix (a src.training_data.TrainingData), read in row blocks. Edges come
+    from an evenly strided sample of at most REFERENCE_SAMPLE rows. Returns
+    the histogram rows.
+    """
+    create_tables(con)
+    n = len(data.X)
+    step = max(1, -(-n // REFERENCE_SAMPLE))
+    sample = np.concatenate([block[(-lo) % step::step] for lo, block in data.blocks()])
+    edges = [quantile_edges(col[np.isfinite(col)], bins) for col in sample.T]
+    del sample
+
+    counts, reference_end = {}, None
+    for lo, block in data.blocks():
+        hi = lo + len(block)
+        uniq, inverse = np.unique(np.asarray(data.tickers[lo:hi]), return_inverse=True)
+        row_group = np.asarray([ticker_group(t) for t in uniq])[inverse]
+        end = np.asarray(data.dates[lo:hi]).max()
+        reference_end = end if reference_end is None else max(reference_end, end)
+        for j, e in enumerate(edges):
+            ok = np.isfinite(block[:, j])
+            b, g = np.searchsorted(e, block[ok, j]), row_group[ok]
+            for grp in [*np.unique(g), ALL_GROUP]:
+                c = np.bincount(b if grp == ALL_GROUP else b[g == grp], minlength=len(e) + 1)
+                key = (data.feature_names[j], str(grp))
+                counts[key] = counts[key] + c if key in counts else c
+    reference_end = reference_end.astype(datetime.date)
+
+    edges_rows = [(version, f, e.tolist(), reference_end) for f, e in zip(data.feature_names, edges)]
+    hist = {"feature": [], "grp": [], "bin": [], "n": []}
+    for (feature, grp), c in counts.items():
+        nz = np.flatnonzero(c)
+        hist["feature"] += [feature] * len(nz)
+        hist["grp"] += [grp] * len(nz)
+        hist["bin"] += nz.tolist()
+        hist["n"] += c[nz].tolist()
+
+    with incremental.transaction(con):
+        for table in (EDGES_TABLE, HISTOGRAMS_TABLE, STATE_TABLE):
+            con.execute(f"DELETE FROM {table} WHERE model_version = ?", [version])
+        con.executemany(f"INSERT INTO {EDGES_TABLE} VALUES (?, ?, ?, ?)", edges_rows)
+        con.register("reference_hist", pa.table(hist))
+        con.execute(f"""
+            INSERT INTO {HISTOGRAMS_TABLE}
+            SELECT ?, 'reference', feature, grp, ?, bin, n FROM reference_hist
+        """, [version, reference_end])
+        con.unregister("reference_hist")
+    return len(hist["n"])
+
+
+# ─── Current (nightly) ────────────────────────────────────────────────────────────
+def update_current(con, version: str, features_table: str, scores_table: str) -> int:
+    """
+    Recount the current histograms of the months that hold rows scored for
+    `version` since the last update. Only rows dated after the reference are
+    counted. Returns the number of new scored rows.
+    """
+    features = [r[0] for r in con.execute(
+        f"SELECT feature FROM {EDGES_TABLE} WHERE model_version = ? ORDER BY feature", [version]
+    ).fetchall()]
+    reference_end, scored_through = con.execute(f"""
+        SELECT MAX(e.reference_end), (SELECT scored_through FROM {STATE_TABLE} WHERE model_version = ?)
+        FROM {EDGES_TABLE} e WHERE e.model_version = ?
+    """, [version, version]).fetchone()
+    since = scored_through or datetime.datetime.min
+
+    new_rows, latest = con.execute(f"""
+        SELECT COUNT(*), MAX(scored_at) FROM {scores_table}
+        WHERE model_version = ? AND scored_at > ? AND date > ?
+    """, [version, since, reference_end]).fetchone()
+    if not new_rows:
+        return 0
+
+    select = ", ".join(f"CAST(f.{c} AS FLOAT) AS {c}" for c in features)
+    with incremental.transaction(con):
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE drift_months AS
+            SELECT DISTINCT date_trunc('month', date)::DATE AS period FROM {scores_table}
+            WHERE model_version = ? AND scored_at > ? AND date > ?
+        """, [version, since, reference_end])
+        con.execute(f"""
+            DELETE FROM {HISTOGRAMS_TABLE}
+            WHERE model_version = ? AND kind = 'current' AND period IN (SELECT period FROM drift_months)
+        """, [version])
+        con.execute(f"""
+            INSERT INTO {HISTOGRAMS_TABLE}
+            WITH scored AS (
+                SELECT f.ticker, date_trunc('month', f.date)::DATE AS period, {select}
+                FROM {scores_table} s JOIN {features_table} f USING (ticker, date)
+                WHERE s.model_version = ? AND s.date > ?
+                  AND date_trunc('month', s.date)::DATE IN (SELECT period FROM drift_months)
+            ),
+            long AS (
+                UNPIVOT scored ON {", ".join(features)} INTO NAME feature VALUE value
+            ),
+            binned AS (
+                SELECT l.feature, {ticker_group_sql("l.ticker")} AS grp, l.period,
+                       len(list_filter(e.edges, b -> b < l.value)) AS bin
+                FROM long l JOIN {EDGES_TABLE} e ON e.model_version = ? AND e.feature = l.feature
+                WHERE isfinite(l.value)
+            )
+            SELECT ?, 'current', feature, COALESCE(grp, '{ALL_GROUP}'), period, bin, COUNT(*)
+            FROM binned
+            GROUP BY GROUPING SETS ((feature, grp, period, bin), (feature, period, bin))
+        """, [version, reference_end, version, version])
+        con.execute(f"INSERT OR REPLACE INTO {STATE_TABLE} VALUES (?, ?)", [version, latest])
+    return new_rows
+
+
+def compute_psi(con, version: str, window_months: int = WINDOW_MONTHS, eps: float = EPSILON) -> list:
+    """[(feature, grp, psi, ref_rows, cur_rows)] over the last `window_months` of current histograms."""
+    return con.execute(f"""
+        WITH ref AS (
+            SELECT feature, grp, bin, n FROM {HISTOGRAMS_TABLE}
+            WHERE model_version = $v AND kind = 'reference'
+        ),
+        cur AS (
+            SELECT feature, grp, bin, SUM(n) AS n FROM {HISTOGRAMS_TABLE}
+            WHERE model_version = $v AND kind = 'current'
+              AND period > (SELECT MAX(period) FROM {HISTOGRAMS_TABLE}
+                            WHERE model_version = $v AND kind = 'current') - INTERVAL ($m) MONTH
+            GROUP BY ALL
+        ),
+        shares AS (
+            SELECT feature, grp, COALESCE(r.n, 0) AS rn, COALESCE(c.n, 0) AS cn,
+                   SUM(COALESCE(r.n, 0)) OVER w AS rt, SUM(COALESCE(c.n, 0)) OVER w AS ct
+            FROM ref r FULL JOIN cur c USING (feature, grp, bin)
+            WINDOW w AS (PARTITION BY feature, grp)
+        )
+        SELECT feature, grp,
+               CASE WHEN MAX(ct) > 0 AND MAX(rt) > 0 THEN
+                   SUM((GREATEST(cn / ct, $eps) - GREATEST(rn / rt, $eps))
+                       * LN(GREATEST(cn / ct, $eps) / GREATEST(rn / rt, $eps)))
+               END AS psi,
+               MAX(rt)::BIGINT, MAX(ct)::BIGINT
+        FROM shares
+        GROUP BY feature, grp
+        ORDER BY feature, grp
+    """, {"v": version, "m": window_months, "eps": eps}).fetchall()
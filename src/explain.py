@@ -0,0 +1,95 @@
+# src/explain.py
+"""
+SHAP explanations for the scoring models.
+
+ - LightGBM boosters use TreeExplainer with tree_path_dependent
+   perturbation. That needs no background data and is exact for the trees.
+ - Linear models use LinearExplainer against a fixed-size background: a
+   reservoir sample of feature rows summarised by weighted k-means. Only the
+   weighted mean and covariance of the background enter a linear
+   explanation, so it is passed as (mean, cov).
+ - Rows are explained in chunks on a process pool. Each worker builds its
+   explainer once, in the pool initializer.
+"""
+
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BACKGROUND_K   = 100     # k-means centroids summarising the background sample
+CHUNK_ROWS     = 50_000  # rows per pool task
+
+
+def is_tree_model(model) -> bool:
+    return type(model).__module__.startswith("lightgbm")
+
+
+def summarise_background(sample: np.ndarray, k: int = BACKGROUND_K):
+    """Weighted k-means summary of `sample` → (mean, cov) for LinearExplainer."""
+    import shap
+
+    summary = shap.kmeans(sample, min(k, len(sample)))
+    mean = np.average(summary.data, axis=0, weights=summary.weights)
+    cov = np.atleast_2d(np.cov(summary.data.T, aweights=summary.weights)) if len(summary.data) > 1 \
+        else np.zeros((sample.shape[1], sample.shape[1]))
+    return mean, cov
+
+
+def make_explainer(model, background=None):
+    import shap
+
+    if is_tree_model(model):
+        return shap.TreeExplainer(model, feature_perturbation="tree_path_dependent")
+    if background is None:
+        raise ValueError("a linear model needs a background (mean, cov)")
+    return shap.LinearExplainer(model, background)
+
+
+def base_value(explainer) -> float:
+    return float(np.ravel(explainer.expected_value)[0])
+
+
+# ─── Workers ──────────────────────────────────────────────────────────────────────
+# set only inside pool worker processes; the calling process keeps its
+# explainer local, as two models may be explained on two threads at once
+_explainer = None
+_X = None
+
+
+def _init_worker(model_path, background, X):
+    from src.models import load_model
+
+    global _explainer, _X
+    _explainer = make_explainer(load_model(model_path), background)
+    _X = X
+
+
+def _shap_values(explainer, X: np.ndarray) -> np.ndarray:
+    return np.asarray(explainer.shap_values(X), dtype=np.float32)
+
+
+def _explain_chunk(lo: int, hi: int) -> np.ndarray:
+    return _shap_values(_explainer, _X[lo:hi])
+
+
+def explain(model_path: str, X: np.ndarray, background=None, workers: int = 1,
+            chunk_rows: int = CHUNK_ROWS):
+    """SHAP values (rows, features) float32 and the base value for model_path on X."""
+    from src.models import load_model
+
+    bounds = [(lo, min(lo + chunk_rows, len(X))) for lo in range(0, len(X), chunk_rows)]
+    workers = max(1, min(workers, len(bounds)))
+    explainer = make_explainer(load_model(model_path), background)
+
+    if workers == 1:
+        parts = [_shap_values(explainer, X[lo:hi]) for lo, hi in bounds]
+    else:
+        # fork where available: workers share X instead of pickling it
+        ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(model_path, background, X)) as pool:
+            parts = list(pool.map(_explain_chunk, *zip(*bounds)))
+
+    values = np.concatenate(parts) if parts else np.zeros((0, X.shape[1]), dtype=np.float32)
+    return values, base_value(explainer)
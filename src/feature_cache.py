@@ -0,0 +1,316 @@
+# src/feature_cache.py
+"""
+Content-addressed on-disk cache of registry features, as Parquet partitioned
+by year and ticker bucket:
+
+    <root>/<definition hash>/year=<Y>/bucket=<B>/part.parquet
+
+ - definition hash: every resolved node of the requested features (name,
+   inputs, deps, lookback/lookahead, source code, closure parameters) plus the
+   passthrough columns. Changing a feature gives a new directory.
+ - data key (per ticker and year, in manifest.json): the definition hash and a
+   fingerprint of the ticker's source rows up to the end of that year.
+   The fingerprint is cumulative, so it covers any lookback. Appending a day
+   only makes the current year stale, and a backfill invalidates the years
+   after it.
+
+Tickers are hashed into N_BUCKETS files per year rather than one directory
+per ticker: with thousands of tickers, per-file overhead would dominate every
+scan. Staleness is still tracked per (ticker, year); a stale ticker rewrites
+only its bucket's file for that year. Stale partitions are recomputed one
+bucket at a time, so a cold build holds about 1/N_BUCKETS of the universe.
+
+Reads go through pyarrow.dataset on a memory-mapped filesystem with column
+projection and date/ticker filters (ticker filters also prune buckets). Only
+stale partitions are recomputed. Whole definition directories are evicted
+least-recently-used first once the cache is over its size cap.
+"""
+
+import datetime
+import hashlib
+import inspect
+import json
+import math
+import os
+import shutil
+import time
+import zlib
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+from src import features as fx
+from src.panel import Panel, column
+
+CACHE_DIR      = os.path.join("data", "cache", "features")
+SRC_TABLE      = "silver.prices"
+MAX_BYTES      = 5 * 1024 ** 3  # LRU cap for the whole cache
+N_BUCKETS      = 16             # ticker buckets (files) per year
+ROWS_PER_YEAR  = 200            # conservative trading rows per year (lookahead → years)
+PARTITIONS     = pa.schema([("year", pa.int32()), ("bucket", pa.int32())])  # hive-style
+
+
+def bucket_of(ticker: str) -> int:
+    """Stable bucket of a ticker (crc32, not the salted built-in hash)."""
+    return zlib.crc32(ticker.encode()) % N_BUCKETS
+
+
+def definition_hash(names, passthrough=()) -> str:
+    """Hash of everything that determines the values of `names`."""
+    h = hashlib.sha256()
+    h.update(repr(sorted(passthrough)).encode())
+    for node in sorted(fx.resolve(names)):
+        feat = fx.REGISTRY[node]
+        try:
+            src = inspect.getsource(feat.fn)
+        except (OSError, TypeError):
+            src = feat.fn.__code__.co_code.hex()
+        closure = [c.cell_contents for c in (feat.fn.__closure__ or ())]
+        h.update(repr((node, feat.inputs, feat.deps, feat.lookback, feat.lookahead,
+                       src, closure)).encode())
+    return h.hexdigest()[:16]
+
+
+class FeatureCache:
+    def __init__(self, root: str = CACHE_DIR, max_bytes: int = MAX_BYTES,
+                 src_table: str = SRC_TABLE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.src_table = src_table
+        self.manifest_path = os.path.join(root, "manifest.json")
+
+    # ─── manifest ───────────────────────────────────────────────────────────────
+    def _read_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self.manifest_path)
+
+    def _file(self, def_hash: str, year: int, bucket: int) -> str:
+        return os.path.join(self.root, def_hash, f"year={year}", f"bucket={bucket}", "part.parquet")
+
+    # ─── freshness ──────────────────────────────────────────────────────────────
+    def _data_keys(self, con, def_hash: str, names, passthrough) -> dict:
+        """Current data key of every (ticker, year) partition of the source."""
+        cols = ", ".join(["date"] + fx.required_inputs(names) + list(passthrough))
+        ahead_years = math.ceil(fx.required_history(names)[1] / ROWS_PER_YEAR)
+        rows = con.execute(f"""
+            WITH y AS (
+                SELECT ticker, YEAR(date) AS year, COUNT(*) AS n, SUM(HASH({cols})) AS h
+                FROM {self.src_table}
+                GROUP BY ALL
+            )
+            SELECT ticker, year,
+                   SUM(n) OVER w AS n,
+                   SUM(h) OVER w AS h
+            FROM y
+            WINDOW w AS (PARTITION BY ticker ORDER BY year
+                         ROWS BETWEEN UNBOUNDED PRECEDING AND {ahead_years} FOLLOWING)
+        """).fetchall()
+        return {
+            f"{tkr}|{year}": hashlib.sha256(f"{def_hash}|{n}|{h}".encode()).hexdigest()[:16]
+            for tkr, year, n, h in rows
+        }
+
+    def refresh(self, con, names, passthrough=()) -> str:
+        """Recompute stale partitions of `names`; returns the definition hash."""
+        def_hash = definition_hash(names, passthrough)
+        manifest = self._read_manifest()
+        entry = manifest.setdefault(def_hash, {"names": list(names),
+                                               "passthrough": list(passthrough),
+                                               "partitions": {}})
+        current = self._data_keys(con, def_hash, names, passthrough)
+        cached = entry["partitions"]
+
+        gone = set(cached) - set(current)
+        stale = {k for k, v in current.items() if cached.get(k) != v}
+        if stale:
+            print(f"🔄 feature cache: recomputing {len(stale)}/{len(current)} partition(s)")
+        # one bucket at a time: memory is bounded by a bucket's tickers, and
+        # every file is still written once
+        by_bucket = {}
+        for key in stale | gone:
+            by_bucket.setdefault(bucket_of(key.split("|")[0]), set()).add(key)
+        for keys in by_bucket.values():
+            todo = keys & stale
+            fresh = self._compute(con, names, passthrough, todo) if todo else None
+            self._rewrite(def_hash, keys, fresh)
+            del fresh
+        for key in gone:
+            del cached[key]
+        for key in stale:
+            cached[key] = current[key]
+
+        entry["last_used"] = time.time()
+        self._write_manifest(manifest)
+        self.evict(keep=def_hash)
+        return def_hash
+
+    def _compute(self, con, names, passthrough, stale: set) -> pa.Table:
+        """Rows of every stale (ticker, year) partition, with `year` and `bucket` columns."""
+        lookback = fx.required_history(names)[0]
+        first_year = {}
+        for key in stale:
+            tkr, year = key.split("|")
+            first_year[tkr] = min(first_year.get(tkr, 9999), int(year))
+
+        con.execute("CREATE OR REPLACE TEMP TABLE feature_cache_stale (ticker VARCHAR, year INTEGER)")
+        con.executemany("INSERT INTO feature_cache_stale VALUES (?, ?)", list(first_year.items()))
+        inputs = fx.required_inputs(names)
+        cols = ", ".join(f"s.{c}" for c in dict.fromkeys(["date", "ticker"] + inputs + list(passthrough)))
+        table = con.execute(f"""
+            WITH ranked AS (
+                SELECT ticker, date, ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date) AS rn
+                FROM {self.src_table}
+                WHERE ticker IN (SELECT ticker FROM feature_cache_stale)
+            ),
+            first_row AS (
+                SELECT r.ticker, MIN(r.rn) AS rn
+                FROM ranked r JOIN feature_cache_stale f USING (ticker)
+                WHERE YEAR(r.date) >= f.year
+                GROUP BY r.ticker
+            ),
+            read_from AS (
+                SELECT r.ticker, MIN(r.date) AS date
+                FROM ranked r JOIN first_row f USING (ticker)
+                WHERE r.rn >= f.rn - {lookback}
+                GROUP BY r.ticker
+            )
+            SELECT {cols}
+            FROM {self.src_table} s JOIN read_from p USING (ticker)
+            WHERE s.date >= p.date
+            ORDER BY s.ticker, s.date
+        """).fetch_arrow_table()
+
+        panel = Panel.from_arrow(table)
+        values = fx.compute(panel, {c: column(table, c) for c in inputs}, names)
+        out = pa.table({
+            "ticker": table.column("ticker"),
+            "date": table.column("date"),
+            **{c: table.column(c) for c in passthrough},
+            **{name: pa.array(v, from_pandas=True) for name, v in values.items()},  # NaN → null
+        })
+
+        # keep only rows of stale partitions (the lookback warm-up is not stale);
+        # fingerprints are cumulative, so a ticker is stale from its first stale year on
+        years = table.column("date").to_numpy().astype("datetime64[Y]").astype(np.int32) + 1970
+        tickers = table.column("ticker").take(pa.array(panel.starts)).to_pylist()
+        since = np.array([first_year[t] for t in tickers], dtype=np.int32)
+        buckets = np.array([bucket_of(t) for t in tickers], dtype=np.int32)[panel.group]
+        keep = years >= since[panel.group]
+        out = out.append_column("year", pa.array(years)).append_column("bucket", pa.array(buckets))
+        return out.filter(pa.array(keep))
+
+    def _rewrite(self, def_hash: str, keys: set, fresh: pa.Table = None):
+        """Replace the rows of `keys` ("ticker|year") in their bucket files by `fresh`."""
+        files = {}  # (year, bucket) → tickers whose rows are replaced or dropped
+        for key in keys:
+            tkr, year = key.split("|")
+            files.setdefault((int(year), bucket_of(tkr)), set()).add(tkr)
+
+        slices = {}
+        if fresh is not None and fresh.num_rows:
+            # group the fresh rows by file: sort by (year, bucket) and cut at changes
+            years, buckets = fresh.column("year").to_numpy(), fresh.column("bucket").to_numpy()
+            order = np.lexsort((buckets, years))
+            fresh = fresh.drop(["year", "bucket"]).take(pa.array(order))
+            years, buckets = years[order], buckets[order]
+            change = np.flatnonzero((np.diff(years) != 0) | (np.diff(buckets) != 0)) + 1
+            for lo, hi in zip(np.append(0, change), np.append(change, len(years))):
+                slices[(int(years[lo]), int(buckets[lo]))] = fresh.slice(lo, hi - lo)
+
+        for (year, bucket), tickers in files.items():
+            path = self._file(def_hash, year, bucket)
+            parts = []
+            if os.path.exists(path):
+                old = pq.read_table(path, partitioning=None)
+                parts.append(old.filter(pc.invert(pc.is_in(old.column("ticker"),
+                                                           value_set=pa.array(sorted(tickers))))))
+            if (year, bucket) in slices:
+                parts.append(slices[(year, bucket)])
+            out = pa.concat_tables(parts).sort_by([("ticker", "ascending"), ("date", "ascending")]) if parts else None
+
+            if out is None or out.num_rows == 0:
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            pq.write_table(out, tmp)
+            os.replace(tmp, path)
+
+    # ─── reads ──────────────────────────────────────────────────────────────────
+    def load(self, con, names, passthrough=(), columns=None, start=None, end=None,
+             tickers=None, exclude=(), refresh: bool = True, sort: bool = True) -> pa.Table:
+        """
+        Refresh (unless refresh=False), then read features as an Arrow table
+        with columns ticker, date, *columns (default: passthrough + names),
+        optionally restricted to [start, end] dates and to / excluding some tickers.
+        Rows are sorted by (ticker, date) unless sort=False.
+        """
+        if refresh:
+            def_hash = self.refresh(con, names, passthrough)
+        else:
+            def_hash = definition_hash(names, passthrough)
+        import pyarrow.dataset as ds  # imports pandas: only readers of the cache pay for it
+
+        dataset = ds.dataset(
+            os.path.join(self.root, def_hash),
+            format="parquet",
+            partitioning=ds.partitioning(PARTITIONS, flavor="hive"),
+            filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True),
+        )
+
+        expr = ds.scalar(True)
+        if start is not None:
+            start = datetime.date.fromisoformat(str(start)[:10])
+            expr &= (ds.field("year") >= start.year) & (ds.field("date") >= pa.scalar(start, pa.date32()))
+        if end is not None:
+            end = datetime.date.fromisoformat(str(end)[:10])
+            expr &= (ds.field("year") <= end.year) & (ds.field("date") <= pa.scalar(end, pa.date32()))
+        if tickers is not None:
+            tickers = list(tickers)
+            expr &= ds.field("bucket").isin(sorted({bucket_of(t) for t in tickers}))
+            expr &= ds.field("ticker").isin(tickers)
+        if exclude:
+            expr &= ~ds.field("ticker").isin(list(exclude))
+
+        columns = list(columns) if columns is not None else list(passthrough) + list(names)
+        table = dataset.to_table(columns=["ticker", "date"] + columns, filter=expr)
+        if sort:
+            table = table.sort_by([("ticker", "ascending"), ("date", "ascending")])
+        return table
+
+    # ─── eviction ───────────────────────────────────────────────────────────────
+    def evict(self, keep: str = None):
+        """Drop least-recently-used definitions until the cache fits max_bytes."""
+        manifest = self._read_manifest()
+
+        def size(def_hash):
+            total = 0
+            for dirpath, _, files in os.walk(os.path.join(self.root, def_hash)):
+                total += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+            return total
+
+        sizes = {h: size(h) for h in manifest}
+        total = sum(sizes.values())
+        for def_hash in sorted(manifest, key=lambda h: manifest[h].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            if def_hash == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, def_hash), ignore_errors=True)
+            total -= sizes[def_hash]
+            del manifest[def_hash]
+            print(f"🧹 feature cache: evicted {def_hash}")
+        self._write_manifest(manifest)
@@ -1,16 +1,245 @@
 # src/features.py
+"""
+Declarative feature registry.
 
-import pandas as pd
+Every feature declares the raw panel columns it reads (`inputs`), the other
+registered nodes it builds on (`deps`) and how many rows of history
+(`lookback`) or future (`lookahead`) it needs on top of them. The engine
+resolves the dependency DAG, computes each node once over the whole
+(ticker × date) panel and shares intermediates (returns, rolling means and
+stdevs) between every feature that uses them — adding a feature adds a node,
+not another pass over the data.
 
-def momentum_12m(df: pd.DataFrame) -> pd.Series:
+Feature functions receive the Panel followed by their inputs and deps, in
+declaration order, as flat NumPy arrays:
+
+    @feature("momentum_12m", inputs=("adj_close",), lookback=252)
+    def momentum_12m(panel, adj_close):
+        return panel.pct_change(adj_close, 252)
+"""
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from src.panel import Panel
+
+
+@dataclass(frozen=True)
+class Feature:
+    name: str
+    fn: Callable[..., np.ndarray]
+    inputs: tuple = ()        # raw panel columns
+    deps: tuple = ()          # other registered nodes
+    lookback: int = 0         # rows of history needed beyond those of deps
+    lookahead: int = 0        # rows of future needed beyond those of deps
+    intermediate: bool = False  # shared building block, not a model feature
+
+
+REGISTRY: dict = {}
+
+
+def register(feat: Feature) -> Feature:
+    if feat.name in REGISTRY and REGISTRY[feat.name] != feat:
+        raise ValueError(f"Feature {feat.name!r} is already registered")
+    REGISTRY[feat.name] = feat
+    return feat
+
+
+def feature(name: str, inputs=(), deps=(), lookback: int = 0, lookahead: int = 0,
+            intermediate: bool = False):
+    """Decorator registering `fn(panel, *inputs, *deps) -> ndarray` as a feature."""
+    def wrap(fn):
+        register(Feature(name, fn, tuple(inputs), tuple(deps), lookback, lookahead, intermediate))
+        return fn
+    return wrap
+
+
+# ─── DAG resolution ─────────────────────────────────────────────────────────────
+
+def resolve(names) -> list:
+    """Topologically ordered list of every node needed for `names`."""
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Feature dependency cycle: {' → '.join(path + [name])}")
+        if name not in REGISTRY:
+            raise KeyError(f"Unknown feature {name!r}")
+        state[name] = "visiting"
+        for dep in REGISTRY[name].deps:
+            visit(dep, path + [name])
+        state[name] = "done"
+        order.append(name)
+
+    for name in names:
+        visit(name, [])
+    return order
+
+
+def required_inputs(names) -> list:
+    """Raw panel columns needed to compute `names`."""
+    cols = []
+    for node in resolve(names):
+        cols += [c for c in REGISTRY[node].inputs if c not in cols]
+    return cols
+
+
+def required_history(names) -> tuple:
+    """
+    (lookback, lookahead) in rows that `names` need around each output row —
+    how much extra history the incremental pipeline must reload.
+    """
+    back, ahead = {}, {}
+    for node in resolve(names):
+        feat = REGISTRY[node]
+        back[node] = feat.lookback + max((back[d] for d in feat.deps), default=0)
+        ahead[node] = feat.lookahead + max((ahead[d] for d in feat.deps), default=0)
+    return max((back[n] for n in names), default=0), max((ahead[n] for n in names), default=0)
+
+
+def compute(panel: Panel, columns: dict, names) -> dict:
+    """
+    Evaluate `names` over the panel in one batch. `columns` maps raw input
+    names to row-aligned arrays; every intermediate is computed exactly once.
+    """
+    values = {}
+    for node in resolve(names):
+        feat = REGISTRY[node]
+        args = [columns[c] for c in feat.inputs] + [values[d] for d in feat.deps]
+        values[node] = feat.fn(panel, *args)
+    return {name: values[name] for name in names}
+
+
+# ─── Shared intermediates ───────────────────────────────────────────────────────
+
+def rolling_mean(dep: str, window: int) -> str:
+    """Register (once) and return the node `<dep>_mean_<window>`."""
+    name = f"{dep}_mean_{window}"
+    if name not in REGISTRY:
+        register(Feature(name, lambda panel, x: panel.rolling_mean(x, window),
+                         deps=(dep,), lookback=window - 1, intermediate=True))
+    return name
+
+
+def rolling_std(dep: str, window: int) -> str:
+    """Register (once) and return the node `<dep>_std_<window>`."""
+    name = f"{dep}_std_{window}"
+    if name not in REGISTRY:
+        register(Feature(name, lambda panel, x: panel.rolling_std(x, window),
+                         deps=(dep,), lookback=window - 1, intermediate=True))
+    return name
+
+
+def rolling_max(dep: str, window: int) -> str:
+    """Register (once) and return the node `<dep>_max_<window>`."""
+    name = f"{dep}_max_{window}"
+    if name not in REGISTRY:
+        register(Feature(name, lambda panel, x: panel.rolling_max(x, window),
+                         deps=(dep,), lookback=window - 1, intermediate=True))
+    return name
+
+
+@feature("price", inputs=("adj_close",), intermediate=True)
+def price(panel, adj_close):
+    """Adjusted close as a node, so rolling intermediates can build on it."""
+    return adj_close
+
+
+@feature("shares", inputs=("volume",), intermediate=True)
+def shares(panel, volume):
+    """Traded volume as a node."""
+    return volume
+
+
+@feature("ret_1d", inputs=("adj_close",), lookback=1, intermediate=True)
+def ret_1d(panel, adj_close):
+    """Daily simple return."""
+    return panel.pct_change(adj_close, 1)
+
+
+@feature("log_ret_1d", inputs=("adj_close",), lookback=1, intermediate=True)
+def log_ret_1d(panel, adj_close):
+    """Daily log return."""
+    return np.log(adj_close / panel.shift(adj_close, 1))
+
+
+# ─── Features ───────────────────────────────────────────────────────────────────
+
+@feature("momentum_12m", inputs=("adj_close",), lookback=252)
+def momentum_12m(panel, adj_close):
     """
     12-month momentum: (adj_close today / adj_close 252 trading days ago) – 1.
-    Assumes df is sorted by date ascending with a DatetimeIndex.
     """
-    return df["adj_close"].pct_change(periods=252)
+    return panel.pct_change(adj_close, 252)
+
+
+@feature("gain_1d", inputs=("adj_close",), lookback=1, intermediate=True)
+def gain_1d(panel, adj_close):
+    """Up-move of the adjusted close (0 on down days)."""
+    return np.maximum(adj_close - panel.shift(adj_close, 1), 0.0)
+
+
+@feature("loss_1d", inputs=("adj_close",), lookback=1, intermediate=True)
+def loss_1d(panel, adj_close):
+    """Down-move of the adjusted close, as a positive number (0 on up days)."""
+    return np.maximum(panel.shift(adj_close, 1) - adj_close, 0.0)
+
+
+@feature("true_range", inputs=("high", "low", "close"), lookback=1, intermediate=True)
+def true_range(panel, high, low, close):
+    """max(high − low, |high − previous close|, |low − previous close|)."""
+    prev = panel.shift(close, 1)
+    return np.maximum(high - low, np.maximum(np.abs(high - prev), np.abs(low - prev)))
+
+
+# ─── Technical indicators ───────────────────────────────────────────────────────
+# Simple-average forms (Cutler's RSI, SMA of true range) so every kernel is a
+# running sum over the whole panel; Wilder's recursive smoothing is not.
+
+@feature("rsi_14", deps=(rolling_mean("gain_1d", 14), rolling_mean("loss_1d", 14)))
+def rsi_14(panel, gain, loss):
+    """14-day relative strength index, 0–100."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 * gain / (gain + loss)
+
+
+@feature("realized_vol_21", deps=(rolling_std("log_ret_1d", 21),))
+def realized_vol_21(panel, std):
+    """Annualised standard deviation of 21 daily log returns."""
+    return std * np.sqrt(252)
+
+
+@feature("ma_cross_50_200", deps=(rolling_mean("price", 50), rolling_mean("price", 200)))
+def ma_cross_50_200(panel, fast, slow):
+    """50-day over 200-day moving average of the adjusted close, − 1 (> 0: golden cross)."""
+    return fast / slow - 1
+
+
+@feature("atr_pct_14", inputs=("close",), deps=(rolling_mean("true_range", 14),))
+def atr_pct_14(panel, close, atr):
+    """14-day average true range as a fraction of the close."""
+    return atr / close
+
+
+@feature("volume_z_21", inputs=("volume",), deps=(rolling_mean("shares", 21), rolling_std("shares", 21)))
+def volume_z_21(panel, volume, mean, std):
+    """Today's volume in standard deviations from its 21-day mean."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (volume - mean) / std
+
+
+@feature("dist_52w_high", deps=("price", rolling_max("price", 252)))
+def dist_52w_high(panel, px, high):
+    """Adjusted close relative to its 252-day high, − 1 (0 at a new high)."""
+    return px / high - 1
+
 
 # Stub for label computation (we’ll do ETL in generate_gold.py)
-def compute_excess_return(stock_ret: float, spy_ret: float) -> float:
+def compute_excess_return(stock_ret, spy_ret):
     """
     Excess return = stock_return − SPY_return over same horizon.
     """
@@ -0,0 +1,275 @@
+# src/incremental.py
+"""
+Watermark bookkeeping for incremental (ticker, date) materialisation.
+
+Every stage records, per ticker, the last upstream date it processed and how
+many upstream rows existed up to that date, with a signature of their values
+(meta.watermarks). On the next run a ticker is
+ - new/extended  → upstream has rows after its watermark: only those are redone
+ - rewritten     → the row count or the signature up to the watermark changed
+                   (backfill, re-ingest, split-adjusted prices): the whole
+                   ticker is rebuilt
+ - unchanged     → skipped
+
+Rolling-window stages pass a lookback/lookahead (in rows) so the recomputed
+range also covers rows whose windows reach into the new data.
+
+Every write to a table also bumps its counter in meta.table_versions
+(bump(); upsert() and ensure_table() do it themselves). Together with the
+row count that is the table's version for the pipeline's fingerprints and
+the snapshots (src/pipeline.table_version), so neither hashes whole tables.
+"""
+
+import contextlib
+import re
+import threading
+
+META_TABLE     = "meta.watermarks"
+VERSIONS_TABLE = "meta.table_versions"
+SIGNATURE      = "SUM(HASH(date, open, high, low, close, adj_close, volume))"  # of a ticker's price rows
+
+_bump_lock = threading.Lock()  # concurrent stages may bump the same table (gold.scores)
+
+
+def ensure_meta(con):
+    con.execute("CREATE SCHEMA IF NOT EXISTS meta")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {META_TABLE} (
+            stage       VARCHAR,
+            ticker      VARCHAR,
+            last_date   DATE,
+            row_count   BIGINT,
+            updated_at  TIMESTAMP,
+            signature   HUGEINT,
+            PRIMARY KEY (stage, ticker)
+        )
+    """)
+    con.execute(f"ALTER TABLE {META_TABLE} ADD COLUMN IF NOT EXISTS signature HUGEINT")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (
+            table_name  VARCHAR PRIMARY KEY,
+            version     BIGINT,
+            updated_at  TIMESTAMP
+        )
+    """)
+
+
+def bump(con, *tables):
+    """
+    Record a write to `tables`. Call it outside a transaction that other
+    stages may race with on the same table: DuckDB rejects two open
+    transactions updating the same row.
+    """
+    ensure_meta(con)
+    with _bump_lock:
+        con.executemany(f"""
+            INSERT INTO {VERSIONS_TABLE} VALUES (?, 1, now())
+            ON CONFLICT (table_name) DO UPDATE SET version = version + 1, updated_at = now()
+        """, [[t] for t in tables])
+
+
+def version(con, table: str) -> int:
+    """How many times `table` was written (bump()), 0 if never."""
+    ensure_meta(con)
+    row = con.execute(f"SELECT version FROM {VERSIONS_TABLE} WHERE table_name = ?", [table]).fetchone()
+    return row[0] if row else 0
+
+
+@contextlib.contextmanager
+def transaction(con):
+    """BEGIN … COMMIT around the block; ROLLBACK if it raises, so no half-written stage is left behind."""
+    con.begin()
+    try:
+        yield con
+    except BaseException:
+        con.rollback()
+        raise
+    con.commit()
+
+
+def reset(con, stage: str):
+    """Forget every watermark of `stage` (next run rebuilds from scratch)."""
+    ensure_meta(con)
+    con.execute(f"DELETE FROM {META_TABLE} WHERE stage = ?", [stage])
+
+
+def ensure_table(con, stage: str, table: str, columns: str, full: bool = False) -> bool:
+    """
+    Create `table` with a (ticker, date) primary key if needed.
+
+    Tables from the old DROP/CREATE pipeline have no key, so they cannot be
+    upserted into; those, tables whose columns differ from `columns` (and
+    every table when full=True) are dropped and the stage's watermarks reset.
+    Returns True if the table was (re)created.
+    """
+    schema, name = table.split(".")
+    con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+    exists = con.execute(
+        "SELECT COUNT(*) FROM duckdb_tables() WHERE schema_name = ? AND table_name = ?",
+        [schema, name],
+    ).fetchone()[0]
+    has_key = con.execute(
+        "SELECT COUNT(*) FROM duckdb_constraints() "
+        "WHERE schema_name = ? AND table_name = ? AND constraint_type = 'PRIMARY KEY'",
+        [schema, name],
+    ).fetchone()[0]
+    same_columns = [c for c, _ in re.findall(r"(\w+)\s+(\w+)", columns)] == [
+        c for (c,) in con.execute(
+            "SELECT column_name FROM duckdb_columns() WHERE schema_name = ? AND table_name = ? "
+            "ORDER BY column_index", [schema, name],
+        ).fetchall()
+    ]
+    if exists and has_key and same_columns and not full:
+        return False
+
+    con.execute(f"DROP TABLE IF EXISTS {table}")
+    con.execute(f"CREATE TABLE {table} ({columns}, PRIMARY KEY (ticker, date))")
+    reset(con, stage)
+    bump(con, table)
+    return True
+
+
+def plan(con, stage: str, src_table: str, lookback: int = 0, lookahead: int = 0,
+         benchmark=None) -> int:
+    """
+    Work out which rows of `src_table` `stage` has to recompute.
+
+    Creates the temp table plan_<stage>(ticker, rebuild, read_from, write_from):
+    rows with date >= write_from must be rewritten, and computing them needs
+    upstream rows from read_from on (`lookback` rows earlier). `lookahead`
+    extends write_from backwards for labels that peek into the future.
+
+    If `benchmark` (a ticker or a list of them) is given, its dirty range
+    propagates to every ticker (e.g. excess returns vs SPY change for all
+    names when SPY gets new bars).
+    Returns the number of tickers in the plan.
+    """
+    ensure_meta(con)
+    dirty = f"dirty_{stage}"
+    out = f"plan_{stage}"
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {dirty} AS
+        WITH w AS (SELECT * FROM {META_TABLE} WHERE stage = '{stage}'),
+        src AS (
+            SELECT s.ticker,
+                   MAX(s.date)                               AS max_date,
+                   COUNT(*) FILTER (WHERE s.date <= w.last_date) AS n_seen,
+                   {SIGNATURE} FILTER (WHERE s.date <= w.last_date) AS signature
+            FROM {src_table} s
+            LEFT JOIN w USING (ticker)
+            GROUP BY s.ticker
+        )
+        SELECT src.ticker,
+               -- NULL → rebuild the whole ticker
+               CASE WHEN w.ticker IS NULL OR src.n_seen <> w.row_count OR src.signature <> w.signature
+                    THEN NULL ELSE w.last_date END AS since
+        FROM src
+        LEFT JOIN w USING (ticker)
+        WHERE w.ticker IS NULL
+           OR src.n_seen <> w.row_count
+           OR src.signature <> w.signature  -- NULL (watermark from before signatures): trusted
+           OR src.max_date > w.last_date
+    """)
+
+    benchmarks = [benchmark] if isinstance(benchmark, str) else list(benchmark or [])
+    bench_in = ", ".join(f"'{b}'" for b in benchmarks) or "NULL"
+    bench_dirty = bool(benchmarks) and con.execute(
+        f"SELECT COUNT(*) FROM {dirty} WHERE ticker IN ({bench_in})"
+    ).fetchone()[0] > 0
+    # Without a dirty benchmark only the dirty tickers need their rows ranked
+    scope = "" if bench_dirty else f"WHERE ticker IN (SELECT ticker FROM {dirty})"
+
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE {out} AS
+        WITH ranked AS (
+            SELECT ticker, date,
+                   ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY date) AS rn
+            FROM (SELECT DISTINCT ticker, date FROM {src_table} {scope})
+        ),
+        first_new AS (
+            SELECT r.ticker, MIN(r.rn) AS rn, ANY_VALUE(d.since IS NULL) AS rebuild
+            FROM ranked r JOIN {dirty} d USING (ticker)
+            WHERE d.since IS NULL OR r.date > d.since
+            GROUP BY r.ticker
+        ),
+        bench_from AS (
+            SELECT MIN(r.date) AS date
+            FROM ranked r JOIN first_new f USING (ticker)
+            WHERE r.ticker IN ({bench_in}) AND r.rn >= f.rn - {lookahead}
+        ),
+        write_rn AS (
+            SELECT r.ticker,
+                   LEAST(
+                       ANY_VALUE(f.rn) - {lookahead},
+                       MIN(r.rn) FILTER (WHERE r.date >= (SELECT date FROM bench_from))
+                   ) AS rn,
+                   COALESCE(ANY_VALUE(f.rebuild), FALSE) AS rebuild
+            FROM ranked r LEFT JOIN first_new f USING (ticker)
+            GROUP BY r.ticker
+            HAVING ANY_VALUE(f.rn) IS NOT NULL
+                OR MIN(r.rn) FILTER (WHERE r.date >= (SELECT date FROM bench_from)) IS NOT NULL
+        )
+        SELECT w.ticker,
+               ANY_VALUE(w.rebuild)                                          AS rebuild,
+               MIN(r.date) FILTER (WHERE r.rn >= w.rn - {lookback})          AS read_from,
+               MIN(r.date) FILTER (WHERE r.rn >= w.rn)                       AS write_from
+        FROM write_rn w JOIN ranked r USING (ticker)
+        GROUP BY w.ticker
+    """)
+    return con.execute(f"SELECT COUNT(*) FROM {out}").fetchone()[0]
+
+
+def upsert(con, stage: str, table: str, select_sql: str, chunk: str = None) -> int:
+    """
+    Write the rows of `select_sql` into `table` for the current plan: rebuilt
+    tickers are deleted first, everything else is INSERT OR REPLACE'd on the
+    (ticker, date) key. Returns the number of rows written.
+
+    When the plan is written chunk by chunk, `chunk` names a table of the
+    chunk's tickers, so only their rows are deleted.
+    """
+    scope = f"AND ticker IN (SELECT ticker FROM {chunk})" if chunk else ""
+    deleted = con.execute(f"""
+        DELETE FROM {table}
+        WHERE ticker IN (SELECT ticker FROM plan_{stage} WHERE rebuild) {scope}
+    """).fetchone()[0]
+    written = con.execute(f"INSERT OR REPLACE INTO {table} {select_sql}").fetchone()[0]
+    if deleted or written:
+        bump(con, table)
+    return written
+
+
+def chunks(con, stage: str, src_table: str, max_rows: int) -> list:
+    """
+    Split the planned tickers into lists whose rows to read (from read_from
+    on) add up to at most `max_rows`. A ticker is never split.
+    """
+    counts = con.execute(f"""
+        SELECT p.ticker, COUNT(*)
+        FROM {src_table} s JOIN plan_{stage} p USING (ticker)
+        WHERE s.date >= p.read_from
+        GROUP BY p.ticker
+        ORDER BY p.ticker
+    """).fetchall()
+    out, current, rows = [], [], 0
+    for ticker, n in counts:
+        if current and rows + n > max_rows:
+            out.append(current)
+            current, rows = [], 0
+        current.append(ticker)
+        rows += n
+    if current:
+        out.append(current)
+    return out
+
+
+def commit(con, stage: str, src_table: str):
+    """Advance the watermarks of every planned ticker to the current upstream state."""
+    con.execute(f"""
+        INSERT OR REPLACE INTO {META_TABLE} (stage, ticker, last_date, row_count, updated_at, signature)
+        SELECT '{stage}', ticker, MAX(date), COUNT(*), now(), {SIGNATURE}
+        FROM {src_table}
+        WHERE ticker IN (SELECT ticker FROM dirty_{stage})
+        GROUP BY ticker
+    """)
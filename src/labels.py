@@ -0,0 +1,89 @@
+# src/labels.py
+"""
+Label engine: forward, benchmark-relative and hit labels for every horizon ×
+benchmark × threshold in one pass over a (ticker, date)-sorted panel.
+
+ - log prices are the shared cumulative log-return array: the h-row forward
+   log return of a row is log_px[i + h] - log_px[i] within its ticker, one
+   grouped shift per horizon whatever the number of benchmarks and thresholds
+ - benchmark forward log returns are computed once per benchmark series in
+   DuckDB (forward_sql) and put onto the panel as of each row's date
+   (src/pit.py), as <benchmark>_fwd_log_<horizon> columns
+ - excess = stock − benchmark simple return over the horizon; a hit is
+   excess ≥ threshold
+
+Output columns, for each horizon h, benchmark b and threshold t:
+
+    fwd_ret_<h>   <b>_fwd_ret_<h>   excess_<b>_<h>   hit_<b>_<h>_<t>
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.features import compute_excess_return
+from src.panel import Panel
+
+
+@dataclass(frozen=True)
+class LabelSpec:
+    horizons: dict      # name → trading days, e.g. {"1m": 21, "12m": 252}
+    benchmarks: tuple   # benchmark prefixes, e.g. ("spy", "bench")
+    thresholds: dict    # name → minimum excess return for a hit, e.g. {"2pct": 0.02}
+
+    @property
+    def lookahead(self) -> int:
+        return max(self.horizons.values())
+
+    def inputs(self) -> list:
+        """Benchmark forward log-return columns the panel must carry."""
+        return [f"{b}_fwd_log_{h}" for b in self.benchmarks for h in self.horizons]
+
+    def columns(self) -> list:
+        """(name, SQL type) of every label column, in table order."""
+        out = []
+        for h in self.horizons:
+            out.append((f"fwd_ret_{h}", "DOUBLE"))
+            for b in self.benchmarks:
+                out += [(f"{b}_fwd_ret_{h}", "DOUBLE"), (f"excess_{b}_{h}", "DOUBLE")]
+                out += [(f"hit_{b}_{h}_{t}", "INTEGER") for t in self.thresholds]
+        return out
+
+
+def forward_sql(table: str, horizons: dict, benchmarks, since: str) -> str:
+    """
+    Forward log returns fwd_log_<h> of every `benchmarks` ticker in `table`,
+    per (benchmark, date) from `since` (a SQL date expression) on.
+    """
+    names = ", ".join(f"'{b}'" for b in benchmarks)
+    fwd = ",\n               ".join(
+        f"LEAD(ln(adj_close), {n}) OVER w - ln(adj_close) AS fwd_log_{h}" for h, n in horizons.items()
+    )
+    return f"""
+        SELECT ticker AS benchmark, date,
+               {fwd}
+        FROM {table}
+        WHERE ticker IN ({names}) AND date >= {since}
+        WINDOW w AS (PARTITION BY ticker ORDER BY date)
+    """
+
+
+def compute(panel: Panel, adj_close: np.ndarray, bench_fwd_log: dict, spec: LabelSpec) -> dict:
+    """
+    Every label of `spec` for the panel rows. `bench_fwd_log` maps each
+    column of spec.inputs() to its per-row array.
+    """
+    log_px = np.log(adj_close)
+    out = {}
+    for h, n in spec.horizons.items():
+        stock = np.expm1(panel.shift(log_px, -n) - log_px)
+        out[f"fwd_ret_{h}"] = stock
+        for b in spec.benchmarks:
+            bench = np.expm1(bench_fwd_log[f"{b}_fwd_log_{h}"])
+            excess = compute_excess_return(stock, bench)
+            out[f"{b}_fwd_ret_{h}"] = bench
+            out[f"excess_{b}_{h}"] = excess
+            with np.errstate(invalid="ignore"):
+                for t, threshold in spec.thresholds.items():
+                    out[f"hit_{b}_{h}_{t}"] = (excess >= threshold).astype(np.int32)
+    return out
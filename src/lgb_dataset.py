@@ -0,0 +1,76 @@
+# src/lgb_dataset.py
+"""
+LightGBM Datasets built out of core from a training-data .npy cache.
+
+lgb.Dataset normally bins a matrix that is already in memory. Here X.npy is
+wrapped in an lgb.Sequence that reads rows from the file: LightGBM samples
+rows for the bin boundaries, then pushes the rows through in batches of
+BATCH_ROWS. Only the binned Dataset (about 1 byte per value) and y stay in
+memory. The result is saved next to the .npy files as a LightGBM binary, so
+later runs on unchanged data (and every Optuna worker) just load it.
+"""
+
+import hashlib
+import json
+import os
+
+import lightgbm as lgb
+import numpy as np
+
+from src.training_data import npy_layout
+
+BATCH_ROWS = 65_536
+
+
+class NpySequence(lgb.Sequence):
+    """Rows of a 2-D C-order .npy file, read with plain file reads (no memory map)."""
+
+    def __init__(self, path: str, batch_size: int = BATCH_ROWS):
+        (self.n, self.width), self.dtype, self.offset = npy_layout(path)
+        self.row_bytes = self.width * self.dtype.itemsize
+        self.batch_size = batch_size
+        self.file = open(path, "rb")
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _read(self, lo: int, hi: int) -> np.ndarray:
+        self.file.seek(self.offset + lo * self.row_bytes)
+        return np.fromfile(self.file, dtype=self.dtype, count=(hi - lo) * self.width).reshape(hi - lo, self.width)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):  # batches pushed into the Dataset
+            lo, hi, step = idx.indices(self.n)
+            return self._read(lo, hi)[::step]
+        # single rows, sampled for the bin boundaries: LightGBM wants float64 there
+        return self._read(int(idx), int(idx) + 1)[0].astype(np.float64)
+
+    def close(self):
+        self.file.close()
+
+
+def binary_path(npy_dir: str, feature_names, params: dict) -> str:
+    key = json.dumps([list(feature_names), params, lgb.__version__], sort_keys=True)
+    return os.path.join(npy_dir, f"lgb-{hashlib.sha256(key.encode()).hexdigest()[:12]}.bin")
+
+
+def build(npy_dir: str, feature_names, params: dict, batch_rows: int = BATCH_ROWS) -> str:
+    """Bin <npy_dir>/X.npy + y.npy into a LightGBM binary file (once); returns its path."""
+    path = binary_path(npy_dir, feature_names, params)
+    if os.path.exists(path):
+        return path
+    y = np.load(os.path.join(npy_dir, "y.npy"))
+    rows = NpySequence(os.path.join(npy_dir, "X.npy"), batch_rows)
+    try:
+        data = lgb.Dataset(rows, label=y, feature_name=list(feature_names), params=params,
+                           free_raw_data=True).construct()
+    finally:
+        rows.close()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    data.save_binary(tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def load(path: str, params: dict) -> lgb.Dataset:
+    return lgb.Dataset(path, params=params).construct()
@@ -0,0 +1,54 @@
+# src/memory.py
+"""
+Memory ceiling for a run, shared by DuckDB and the Python-side stages.
+
+The ceiling (PUNTA_MEMORY_LIMIT, default 8GB: half of the charter's 16 GB
+laptop) is split in two:
+ - DuckDB gets 1 - PYTHON_SHARE of it as memory_limit. It spills sorts,
+   joins and aggregates to TEMP_DIR instead of failing, and does not keep
+   insertion order for large results.
+ - Work done outside DuckDB (Arrow tables, NumPy panels, LightGBM batches)
+   is cut into chunks of chunk_rows(bytes_per_row) rows, so it fits in
+   PYTHON_SHARE of the ceiling however large the universe is.
+"""
+
+import os
+import re
+
+ENV_VAR       = "PUNTA_MEMORY_LIMIT"
+DEFAULT_LIMIT = "8GB"
+PYTHON_SHARE  = 0.25  # of the ceiling, for chunks processed in Python
+TEMP_DIR      = os.path.join("data", "tmp")
+MIN_ROWS      = 10_000  # never cut chunks smaller than this
+UNITS         = {"": 1, "B": 1, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4,
+                 "KIB": 1024, "MIB": 1024 ** 2, "GIB": 1024 ** 3, "TIB": 1024 ** 4}
+
+
+def parse_bytes(size) -> int:
+    """'8GB', '512MiB', '1.5 GB' or a number of bytes → bytes."""
+    if isinstance(size, (int, float)):
+        return int(size)
+    m = re.fullmatch(r"\s*([\d.]+)\s*([A-Za-z]*)\s*", size)
+    if not m or m.group(2).upper() not in UNITS:
+        raise ValueError(f"not a memory size: {size!r}")
+    return int(float(m.group(1)) * UNITS[m.group(2).upper()])
+
+
+def limit(size=None) -> int:
+    """The ceiling in bytes: `size`, else $PUNTA_MEMORY_LIMIT, else DEFAULT_LIMIT."""
+    return parse_bytes(size or os.environ.get(ENV_VAR) or DEFAULT_LIMIT)
+
+
+def chunk_rows(bytes_per_row: int, size=None) -> int:
+    """Rows per chunk so a chunk of `bytes_per_row`-byte rows fits the Python share."""
+    return max(MIN_ROWS, int(limit(size) * PYTHON_SHARE) // bytes_per_row)
+
+
+def configure(con, size=None, threads: int = None, temp_directory: str = TEMP_DIR):
+    """Apply the ceiling to a DuckDB connection and let it spill to `temp_directory`."""
+    duckdb_bytes = int(limit(size) * (1 - PYTHON_SHARE))
+    con.execute(f"SET memory_limit = '{duckdb_bytes // 1024 ** 2}MiB'")
+    con.execute(f"SET temp_directory = '{temp_directory}'")
+    con.execute("SET preserve_insertion_order = false")
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
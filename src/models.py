@@ -0,0 +1,46 @@
+# src/models.py
+"""
+Load trained model artifacts once and predict on float32 matrices.
+
+A model's path is its CURRENT pointer in the registry (src/registry.py) and
+its version is the registered version id: the name plus a short hash of the
+artifact files, so retraining yields a new version.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from src import registry
+
+MODEL_PATHS = {
+    "elasticnet": registry.current_path("elasticnet"),
+    "lightgbm":   registry.current_path("lightgbm"),
+}
+
+
+def file_hash(path: str, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()[:12]
+
+
+def model_version(name: str, path: str) -> str:
+    return os.path.basename(registry.version_dir(path))
+
+
+def model_features(path: str) -> list:
+    return registry.meta(path)["features"]
+
+
+def load_model(path: str):
+    """Cached per process: boosters are parsed once, linear coefficients memory-mapped."""
+    return registry.load(path)
+
+
+def predict(model, X: np.ndarray) -> np.ndarray:
+    """Predictions as float64 for a LightGBM Booster or a fitted sklearn estimator."""
+    return np.asarray(model.predict(X), dtype=np.float64)
@@ -0,0 +1,133 @@
+# src/panel.py
+"""
+(ticker × date) panels held as one contiguous array sorted by (ticker, date).
+
+Instead of looping over `groupby("ticker")`, every column is a flat NumPy array
+and per-ticker operations become grouped shifts: row i looks at row i ± n,
+masked to NaN wherever that would cross into another ticker.
+"""
+
+import numpy as np
+import pyarrow as pa
+
+
+class Panel:
+    """
+    Row layout of a panel sorted by (ticker, date).
+
+    `codes` are integer ticker ids that are constant within a ticker and change
+    between tickers (e.g. dictionary-encoded tickers of a sorted table).
+    """
+
+    def __init__(self, codes: np.ndarray):
+        n = len(codes)
+        boundary = np.ones(n, dtype=bool)
+        boundary[1:] = codes[1:] != codes[:-1]
+
+        self.n = n
+        self.starts = np.flatnonzero(boundary)             # first row of each ticker
+        self.sizes = np.diff(np.append(self.starts, n))    # rows per ticker
+        self.group = np.cumsum(boundary) - 1               # ticker number of each row
+        self.pos = np.arange(n) - self.starts[self.group]  # row number within ticker
+        self.remaining = self.sizes[self.group] - self.pos - 1  # rows after it
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table, key: str = "ticker") -> "Panel":
+        codes = table.column(key).combine_chunks().dictionary_encode().indices
+        return cls(codes.to_numpy(zero_copy_only=False))
+
+    def shift(self, x: np.ndarray, n: int) -> np.ndarray:
+        """Grouped shift: out[i] = x[i - n] within the same ticker, else NaN."""
+        out = np.full(self.n, np.nan)
+        if n >= 0:
+            valid = np.flatnonzero(self.pos >= n)
+        else:
+            valid = np.flatnonzero(self.remaining >= -n)
+        out[valid] = x[valid - n]
+        return out
+
+    def pct_change(self, x: np.ndarray, n: int) -> np.ndarray:
+        """x[i] / x[i - n] - 1 within each ticker (n < 0 looks forward)."""
+        if n >= 0:
+            return x / self.shift(x, n) - 1
+        return self.shift(x, n) / x - 1
+
+    def group_mean(self, x: np.ndarray) -> np.ndarray:
+        """Per-ticker NaN-mean, broadcast back to rows."""
+        valid = ~np.isnan(x)
+        sums = np.add.reduceat(np.where(valid, x, 0.0), self.starts) if self.n else np.zeros(0)
+        counts = np.add.reduceat(valid.astype(np.int64), self.starts) if self.n else np.zeros(0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (sums / counts)[self.group]
+
+    def rolling_sum(self, x: np.ndarray, window: int) -> np.ndarray:
+        """
+        Trailing `window`-row sum within each ticker in O(n) via one running
+        sum; NaN until the window is full or if it contains a NaN.
+        """
+        valid = ~np.isnan(x)
+        csum = np.concatenate([[0.0], np.cumsum(np.where(valid, x, 0.0))])
+        ccnt = np.concatenate([[0], np.cumsum(valid)])
+        end = np.arange(1, self.n + 1)
+        begin = np.maximum(end - window, 0)
+        out = csum[end] - csum[begin]
+        out[(ccnt[end] - ccnt[begin] < window) | (self.pos < window - 1)] = np.nan
+        return out
+
+    def rolling_mean(self, x: np.ndarray, window: int) -> np.ndarray:
+        # centre on the ticker mean so the running sum stays well-conditioned
+        centre = np.nan_to_num(self.group_mean(x))
+        return self.rolling_sum(x - centre, window) / window + centre
+
+    def rolling_std(self, x: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+        """Trailing sample standard deviation (matches pandas rolling().std())."""
+        xc = x - np.nan_to_num(self.group_mean(x))
+        s1 = self.rolling_sum(xc, window)
+        s2 = self.rolling_sum(xc * xc, window)
+        var = (s2 - s1 * s1 / window) / (window - ddof)
+        return np.sqrt(np.maximum(var, 0.0))
+
+    def rolling_max(self, x: np.ndarray, window: int) -> np.ndarray:
+        """
+        Trailing `window`-row max within each ticker in O(n), whatever the
+        window (van Herk/Gil-Werman: prefix and suffix maxima of fixed blocks
+        of `window` rows, the array form of a monotonic deque); NaN until the
+        window is full or if it contains a NaN.
+        """
+        out = np.full(self.n, np.nan)
+        if self.n < window:
+            return out
+        valid = ~np.isnan(x)
+        pad = -self.n % window
+        blocks = np.concatenate([np.where(valid, x, -np.inf), np.full(pad, -np.inf)]).reshape(-1, window)
+        prefix = np.maximum.accumulate(blocks, axis=1).ravel()
+        suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+        end = np.arange(window - 1, self.n)
+        out[end] = np.maximum(suffix[end - window + 1], prefix[end])
+
+        ccnt = np.concatenate([[0], np.cumsum(valid)])
+        full = np.arange(1, self.n + 1)
+        out[(ccnt[full] - ccnt[np.maximum(full - window, 0)] < window) | (self.pos < window - 1)] = np.nan
+        return out
+
+    def rolling_min(self, x: np.ndarray, window: int) -> np.ndarray:
+        return -self.rolling_max(-x, window)
+
+
+def align(dates: np.ndarray, ref_dates: np.ndarray, ref_values: np.ndarray) -> np.ndarray:
+    """Exact-date lookup of a single (sorted) reference series onto `dates`."""
+    out = np.full(len(dates), np.nan)
+    if len(ref_dates) == 0:
+        return out
+    idx = np.searchsorted(ref_dates, dates).clip(max=len(ref_dates) - 1)
+    hit = ref_dates[idx] == dates
+    out[hit] = ref_values[idx[hit]]
+    return out
+
+
+def column(table: pa.Table, name: str) -> np.ndarray:
+    """A float64 NumPy view of a table column (nulls → NaN)."""
+    arr = table.column(name).combine_chunks()
+    if arr.type != pa.float64():
+        arr = arr.cast(pa.float64())
+    return arr.to_numpy(zero_copy_only=False)
@@ -0,0 +1,218 @@
+# src/perf.py
+"""
+Lightweight timing and memory helpers, and per-stage instrumentation.
+"""
+
+import contextlib
+import datetime
+import functools
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+import duckdb
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+
+
+class Timer:
+    """Context manager measuring wall time: `with Timer() as t: ...; t.elapsed`."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
+
+
+# ─── Stage instrumentation ────────────────────────────────────────────────────────
+# PUNTA_PERF=1 records every instrumented stage in ops.stage_runs; PUNTA_PERF=sql
+# also attaches DuckDB query profiles of the statements wrapped in
+# `run.profile(con, label)`. Unset, `stage()` hands out a shared no-op recorder:
+# one environment lookup per stage call.
+
+ENV_VAR       = "PUNTA_PERF"
+RUNS_TABLE    = "ops.stage_runs"
+TOP_OPERATORS = 5  # slowest plan operators kept per profiled query
+
+_local = threading.local()
+
+
+def _mode() -> str:
+    return os.environ.get(ENV_VAR, "").strip().lower()
+
+
+def create_table(con):
+    con.execute("CREATE SCHEMA IF NOT EXISTS ops")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+            stage       VARCHAR,
+            started_at  TIMESTAMP,
+            status      VARCHAR,
+            wall_s      DOUBLE,
+            cpu_s       DOUBLE,
+            rows_in     BIGINT,
+            rows_out    BIGINT,
+            rows_per_s  DOUBLE,
+            peak_rss_mb DOUBLE,
+            profile     VARCHAR  -- JSON list of query profiles
+        )
+    """)
+
+
+def _cpu_seconds() -> float:
+    """CPU time of this process plus its reaped children (fork pools)."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + kids.ru_utime + kids.ru_stime
+
+
+def _peak_rss_children_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024
+
+
+def _summarise_profile(label: str, profile: dict) -> dict:
+    operators = []
+
+    def walk(node):
+        if node.get("operator_type"):
+            operators.append({
+                "operator": node["operator_type"],
+                "seconds": node.get("operator_timing", 0.0),
+                "rows": node.get("operator_cardinality", 0),
+            })
+        for child in node.get("children", []):
+            walk(child)
+
+    walk(profile)
+    operators.sort(key=lambda o: o["seconds"], reverse=True)
+    return {
+        "label": label,
+        "latency_s": profile.get("latency"),
+        "cpu_s": profile.get("cpu_time"),
+        "rows_scanned": profile.get("cumulative_rows_scanned"),
+        "query": " ".join(profile.get("query_name", "").split())[:500],
+        "operators": operators[:TOP_OPERATORS],
+    }
+
+
+class _NullRun:
+    """Recorder used when instrumentation is off: every call is a no-op."""
+
+    def rows(self, rows_in: int = 0, rows_out: int = 0):
+        pass
+
+    def profile(self, con, label: str):
+        return contextlib.nullcontext()
+
+
+_NULL_RUN = _NullRun()
+
+
+class StageRun:
+    def __init__(self, name: str, profile_sql: bool):
+        self.name = name
+        self.profile_sql = profile_sql
+        self.rows_in = 0
+        self.rows_out = 0
+        self.profiles = []
+
+    def rows(self, rows_in: int = 0, rows_out: int = 0):
+        """Add to the stage's row counters (call as often as convenient)."""
+        self.rows_in += int(rows_in or 0)
+        self.rows_out += int(rows_out or 0)
+
+    @contextlib.contextmanager
+    def profile(self, con, label: str):
+        """
+        Profile the last DuckDB statement run on `con` inside the block
+        (DuckDB keeps one profile per connection), so wrap single heavy
+        statements.
+        """
+        if not self.profile_sql:
+            yield
+            return
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        con.execute("PRAGMA enable_profiling = 'json'")
+        con.execute(f"SET profiling_output = '{path}'")
+        try:
+            yield
+        finally:
+            try:
+                con.execute("PRAGMA disable_profiling")
+                with open(path) as f:
+                    self.profiles.append(_summarise_profile(label, json.load(f)))
+            except (OSError, ValueError, duckdb.Error):
+                pass  # nothing ran inside the block, or its transaction failed
+            os.remove(path)
+
+
+def current():
+    """The recorder of the innermost stage running on this thread."""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else _NULL_RUN
+
+
+@contextlib.contextmanager
+def stage(name: str, con=None):
+    """
+    Record one stage run: wall and CPU time, rows in/out, rows/s, peak RSS
+    and query profiles, written to ops.stage_runs through `con` (if given)
+    even when the stage fails.
+    """
+    mode = _mode()
+    if mode in ("", "0", "off"):
+        yield _NULL_RUN
+        return
+
+    run = StageRun(name, profile_sql=mode == "sql")
+    _local.stack = getattr(_local, "stack", []) + [run]
+    started = datetime.datetime.now()
+    cpu0, wall0 = _cpu_seconds(), time.perf_counter()
+    status = "failed"
+    try:
+        yield run
+        status = "ok"
+    finally:
+        wall = time.perf_counter() - wall0
+        cpu = _cpu_seconds() - cpu0
+        _local.stack = _local.stack[:-1]
+        rows = run.rows_out or run.rows_in
+        if con is not None:
+            # own cursor: the stage's connection may be inside a failed transaction
+            cur = con.cursor()
+            try:
+                create_table(cur)
+                cur.execute(
+                    f"INSERT INTO {RUNS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [name, started, status, wall, cpu, run.rows_in, run.rows_out,
+                     rows / wall if wall > 0 else 0.0, max(peak_rss_mb(), _peak_rss_children_mb()),
+                     json.dumps(run.profiles) if run.profiles else None],
+                )
+            finally:
+                cur.close()
+
+
+def instrument(name: str):
+    """Decorator for stage entry points `fn(con, ...)`: runs them inside `stage(name, con)`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(con, *args, **kwargs):
+            with stage(name, con):
+                return fn(con, *args, **kwargs)
+        return wrapper
+    return decorate
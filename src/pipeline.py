@@ -0,0 +1,217 @@
+# src/pipeline.py
+"""
+In-process DAG runner for the ETL / training / scoring stages.
+
+A Stage is a callable `fn(con)` with declared inputs and outputs. Tables are
+named "schema.table" and files are paths containing "/". A stage's upstream
+stages are the ones that output what it reads, plus any listed in `after`.
+
+Before a stage runs, its fingerprint is computed from:
+ - the version of every input: a table's row count and write counter (see
+   table_version), or the content hash of a file
+ - the source of the modules listed in `code`
+ - its `config`, plus an optional `volatile()` value (e.g. today's date for
+   an external download)
+If the fingerprint matches the one stored in meta.stage_fingerprints and
+every output exists, the stage is skipped.
+
+Every stage gets its own cursor on one shared DuckDB connection, so the
+buffer pool stays warm and the memory limit and thread count apply to
+everything. A stage is submitted to a thread pool as soon as its upstream
+stages are done, so independent branches run concurrently.
+"""
+
+import datetime
+import hashlib
+import importlib.util
+import os
+import queue
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Callable
+
+from src import incremental, memory
+from src.models import file_hash
+from src.perf import Timer
+
+META_TABLE = "meta.stage_fingerprints"
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fn: Callable                 # fn(con) → anything
+    inputs: tuple = ()           # tables / files read
+    outputs: tuple = ()          # tables / files written
+    after: tuple = ()            # upstream stages not implied by inputs/outputs
+    code: tuple = ()             # module names whose source is fingerprinted
+    config: dict = field(default_factory=dict)
+    volatile: Callable = None    # () → str, extra fingerprint material
+
+
+def say(msg: str):
+    """One write per line, so lines from concurrent stages don't interleave."""
+    sys.stdout.write(msg + "\n")
+
+
+def is_file(name: str) -> bool:
+    return "/" in name or os.sep in name
+
+
+def configure(con, memory_limit: str = None, threads: int = None):
+    """Tune the shared connection once for every stage (see src/memory.py)."""
+    memory.configure(con, memory_limit, threads)
+    con.execute("SET enable_progress_bar = false")
+
+
+def table_exists(con, table: str) -> bool:
+    schema, name = table.split(".")
+    return con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = ? AND table_name = ?",
+        [schema, name],
+    ).fetchone()[0] > 0
+
+
+def table_version(con, table: str) -> str:
+    """
+    "<rows>|<writes>": COUNT(*) (answered from row-group metadata, no column
+    is read) and the table's counter in meta.table_versions. Appends change
+    the count; a writer that rewrites rows in place must call
+    incremental.bump() for its readers to notice.
+    """
+    if not table_exists(con, table):
+        return "missing"
+    n = con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    return f"{n}|{incremental.version(con, table)}"
+
+
+def module_hash(module: str) -> str:
+    spec = importlib.util.find_spec(module)
+    with open(spec.origin, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = {s.name: s for s in stages}
+        producers = {}
+        for s in stages:
+            for out in s.outputs:
+                producers.setdefault(out, set()).add(s.name)
+        self.upstream = {
+            s.name: {p for i in s.inputs for p in producers.get(i, ()) if p != s.name} | set(s.after)
+            for s in stages
+        }
+        unknown = {u for ups in self.upstream.values() for u in ups} - set(self.stages)
+        if unknown:
+            raise ValueError(f"unknown upstream stage(s): {sorted(unknown)}")
+        self.order = self._toposort()
+
+    def _toposort(self) -> list:
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"cycle in pipeline: {' → '.join(path + [name])}")
+            state[name] = "visiting"
+            for up in sorted(self.upstream[name]):
+                visit(up, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    # ─── fingerprints ───────────────────────────────────────────────────────────
+    @staticmethod
+    def ensure_meta(con):
+        incremental.ensure_meta(con)
+        con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {META_TABLE} (
+                stage       VARCHAR PRIMARY KEY,
+                fingerprint VARCHAR,
+                seconds     DOUBLE,
+                updated_at  TIMESTAMP
+            )
+        """)
+
+    def fingerprint(self, con, stage: Stage) -> str:
+        parts = [stage.name, repr(sorted(stage.config.items()))]
+        for name in sorted(stage.inputs):
+            if is_file(name):
+                parts.append(f"{name}={file_hash(name) if os.path.exists(name) else 'missing'}")
+            else:
+                parts.append(f"{name}={table_version(con, name)}")
+        parts += [f"{m}={module_hash(m)}" for m in sorted(stage.code)]
+        if stage.volatile:
+            parts.append(str(stage.volatile()))
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+    def _outputs_exist(self, con, stage: Stage) -> bool:
+        return all(os.path.exists(o) if is_file(o) else table_exists(con, o) for o in stage.outputs)
+
+    def _execute(self, con, stage: Stage, force: bool) -> str:
+        cur = con.cursor()
+        try:
+            fp = self.fingerprint(cur, stage)
+            stored = cur.execute(f"SELECT fingerprint FROM {META_TABLE} WHERE stage = ?",
+                                 [stage.name]).fetchone()
+            if not force and stored and stored[0] == fp and self._outputs_exist(cur, stage):
+                say(f"⏭️  {stage.name}: unchanged, skipped")
+                return "skipped"
+
+            say(f"▶️  {stage.name}")
+            with Timer() as t:
+                stage.fn(cur)
+            cur.execute(f"INSERT OR REPLACE INTO {META_TABLE} VALUES (?, ?, ?, ?)",
+                        [stage.name, fp, t.elapsed, datetime.datetime.now()])
+            say(f"✅ {stage.name} done in {t.elapsed:.1f}s")
+            return "ran"
+        finally:
+            cur.close()
+
+    # ─── execution ──────────────────────────────────────────────────────────────
+    def _worker(self, con, stage: Stage, force: bool, done: queue.Queue):
+        try:
+            done.put((stage.name, self._execute(con, stage, force)))
+        except Exception as exc:  # keep independent branches going
+            say(f"❌ {stage.name} failed: {exc!r}")
+            done.put((stage.name, "failed"))
+
+    def run(self, con, only=None, force: bool = False, max_workers: int = 2) -> dict:
+        """
+        Run the stages in `only` (default: all), each after its upstream
+        stages. Returns {stage: "ran" | "skipped" | "failed" | "blocked"}.
+        Upstream stages outside `only` are treated as done.
+
+        Stages run on plain threads rather than a ThreadPoolExecutor: several
+        stages fork process pools, and a child forked from an executor thread
+        exits non-zero when its atexit hook tries to join that thread.
+        """
+        self.ensure_meta(con)
+        selected = [n for n in self.order if only is None or n in set(only)]
+        status, remaining, running = {}, list(selected), 0
+        done = queue.Queue()
+
+        while remaining or running:
+            for name in list(remaining):
+                ups = self.upstream[name] & set(selected)
+                if any(status.get(u) in ("failed", "blocked") for u in ups):
+                    status[name] = "blocked"
+                    say(f"⛔ {name}: blocked by a failed upstream stage")
+                    remaining.remove(name)
+                elif running < max_workers and all(u in status for u in ups):
+                    threading.Thread(target=self._worker, name=f"stage-{name}",
+                                     args=(con, self.stages[name], force, done)).start()
+                    remaining.remove(name)
+                    running += 1
+
+            if running:
+                name, result = done.get()
+                status[name] = result
+                running -= 1
+        return status
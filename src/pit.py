@@ -0,0 +1,111 @@
+# src/pit.py
+"""
+Point-in-time layer: validity intervals and as-of alignment, inside DuckDB.
+
+ - valid_to: a row of a (ticker, date) table is valid from its date until the
+   ticker's next row. It is one LEAD() window pass, computed while the rows
+   are written (valid_to_sql). After an incremental upsert, only the last
+   row before the written range has to be closed (close_intervals).
+ - as-of joins: a series keyed by date (benchmarks, and later macro prints,
+   fundamentals, FX fixes), optionally also by an entity key, is put onto the
+   ticker × date panel with DuckDB's ASOF JOIN. Each panel row gets the
+   latest series row dated on or before it, so panel dates missing from the
+   series (other exchanges' calendars, monthly or quarterly data) take the
+   last known value instead of NULL. DuckDB sorts both sides once and merges,
+   O(n log n), instead of reindexing per ticker; only the panel's distinct
+   (key, date) pairs take part in the merge and are hash-joined back, O(n).
+ - series tables (create_series) are written sorted by (key, date) with a
+   primary key, so the min/max zonemap of each row group works as a range
+   index for date filters and the as-of merge reads them in order.
+"""
+
+
+def valid_to_sql(date: str = "date", key: str = "ticker") -> str:
+    """SQL for the row's valid_to: the next date of the same `key`, NULL for the latest row."""
+    return f"LEAD({date}) OVER (PARTITION BY {key} ORDER BY {date})"
+
+
+def close_intervals(con, table: str, plan: str) -> int:
+    """
+    After rows from `plan`.write_from on were upserted into `table` (with
+    valid_to_sql), set valid_to of each planned ticker's last earlier row to
+    the first rewritten date. Returns the number of rows updated.
+    """
+    return con.execute(f"""
+        UPDATE {table} t SET valid_to = c.next_date
+        FROM (
+            SELECT s.ticker,
+                   MAX(s.date) FILTER (WHERE s.date <  p.write_from) AS date,
+                   MIN(s.date) FILTER (WHERE s.date >= p.write_from) AS next_date
+            FROM {table} s JOIN {plan} p USING (ticker)
+            GROUP BY s.ticker
+        ) c
+        WHERE t.ticker = c.ticker AND t.date = c.date
+          AND t.valid_to IS DISTINCT FROM c.next_date
+    """).fetchone()[0]
+
+
+def fill_valid_to(con, table: str) -> int:
+    """Recompute valid_to for the whole of `table` in one window pass; returns rows changed."""
+    return con.execute(f"""
+        UPDATE {table} t SET valid_to = n.valid_to
+        FROM (SELECT ticker, date, {valid_to_sql()} AS valid_to FROM {table}) n
+        WHERE t.ticker = n.ticker AND t.date = n.date
+          AND t.valid_to IS DISTINCT FROM n.valid_to
+    """).fetchone()[0]
+
+
+def open_intervals(con, table: str) -> int:
+    """Rows with a NULL valid_to beyond the one latest row per ticker (0 once filled)."""
+    return con.execute(
+        f"SELECT COUNT(*) FILTER (WHERE valid_to IS NULL) - COUNT(DISTINCT ticker) FROM {table}"
+    ).fetchone()[0]
+
+
+def create_series(con, table: str, select_sql: str, key: str = None, temp: bool = False) -> int:
+    """
+    Materialise `select_sql` (a date column, optionally `key`, and values) as
+    `table`, sorted by (key, date) with that primary key. Returns its row count.
+    """
+    cols = f"{key}, date" if key else "date"
+    con.execute(f"""
+        CREATE OR REPLACE {"TEMP " if temp else ""}TABLE {table} AS
+        SELECT * FROM ({select_sql}) ORDER BY {cols}
+    """)
+    con.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({cols})")
+    return con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def asof_sql(panel_sql: str, series: str, columns, by: str = None, max_age: int = None,
+             order_by=None) -> str:
+    """
+    SELECT every column of `panel_sql` plus `columns` of `series` (a list, or
+    a dict renaming series columns to output names) as of each panel row's
+    date: from the latest series row with series.date <= date (and the same
+    `by` key). With `max_age` (days), values older than that are NULL.
+    `order_by` lists panel columns to sort the result by.
+
+    The as-of merge runs over the panel's distinct (by, date) pairs (a few
+    thousand dates per key for a benchmark) and is hash-joined back, so the
+    panel itself is never sorted for the join.
+    """
+    names = columns if isinstance(columns, dict) else {c: c for c in columns}
+    if max_age is None:
+        picked = [f"s.{c} AS {out}" for c, out in names.items()]
+    else:
+        picked = [f"CASE WHEN p.date - s.date <= {int(max_age)} THEN s.{c} END AS {out}"
+                  for c, out in names.items()]
+    keys = [by, "date"] if by else ["date"]
+    on = f"p.{by} = s.{by} AND p.date >= s.date" if by else "p.date >= s.date"
+    order = f"ORDER BY {', '.join(f'p.{c}' for c in order_by)}" if order_by else ""
+    return f"""
+        WITH panel AS ({panel_sql}),
+        as_of AS (
+            SELECT {", ".join(f"p.{k}" for k in keys)}, {", ".join(picked)}
+            FROM (SELECT DISTINCT {", ".join(keys)} FROM panel) p
+            ASOF LEFT JOIN {series} s ON {on}
+        )
+        SELECT p.*, {", ".join(f"a.{out}" for out in names.values())}
+        FROM panel p LEFT JOIN as_of a USING ({", ".join(keys)})
+        {order}
+    """
@@ -0,0 +1,44 @@
+# src/prices.py
+"""
+The raw.prices layout and the market benchmark ticker.
+
+Shared by the ingest (etl/ingest_raw.py), the gold stage
+(etl/generate_gold.py) and the synthetic data generator (src/synthetic.py),
+so nothing under src/ has to import an etl script.
+"""
+
+import pyarrow as pa
+
+from src import incremental
+
+BENCHMARK_TKR = "SPY"  # market benchmark, and the benchmark of unmapped tickers
+PRICE_COLUMNS = ["date", "open", "high", "low", "close", "adj_close", "volume", "ticker"]
+PRICE_SCHEMA  = pa.schema([
+    ("date",      pa.date32()),
+    ("open",      pa.float64()),
+    ("high",      pa.float64()),
+    ("low",       pa.float64()),
+    ("close",     pa.float64()),
+    ("adj_close", pa.float64()),
+    ("volume",    pa.int64()),
+    ("ticker",    pa.string()),
+])
+
+
+def create_raw_table(con, full: bool = False):
+    con.execute("CREATE SCHEMA IF NOT EXISTS raw")
+    if full:
+        con.execute("DROP TABLE IF EXISTS raw.prices")
+        incremental.bump(con, "raw.prices")  # a reload of the same size must still look new
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS raw.prices (
+            date       DATE,
+            open       DOUBLE,
+            high       DOUBLE,
+            low        DOUBLE,
+            close      DOUBLE,
+            adj_close  DOUBLE,
+            volume     BIGINT,
+            ticker     VARCHAR
+        )
+    """)
@@ -0,0 +1,202 @@
+# src/quality.py
+"""
+Data-quality expectations compiled to DuckDB SQL.
+
+Every expectation becomes one aggregate that counts failing rows:
+
+    not_null("ticker")   → COUNT(*) FILTER (WHERE _new AND ticker IS NULL)
+    unique("ticker", "date")
+                         → COUNT(*) FILTER (WHERE _new) - COUNT(DISTINCT (ticker, date)) FILTER (WHERE _new)
+
+All the aggregates of a table run as a single SELECT, i.e. one scan. Only
+partitions added since the last check are counted: a (ticker, date) row is
+new when its date is past the ticker's watermark in ops.dq_watermarks. As in
+src/incremental.py, the watermark also holds the ticker's row count up to
+that date. If the count changed (rows backfilled at older dates), the whole
+ticker is checked again. The last validated row of each ticker is also
+scanned, so max_gap() can see across the boundary. Watermarks advance past the rows checked whether or not
+they passed: a failure is reported once, in ops.dq_results, and a bad
+partition that is never fixed does not pin the watermark and get re-scanned
+(and re-reported) every night. --full re-checks whole tables. Schema and
+minimum row-count checks read metadata or a COUNT(*) and do not scan the
+column data.
+
+Results go to ops.dq_results, one row per expectation per run, for alerting.
+"""
+
+import datetime
+import re
+from dataclasses import dataclass, field
+
+RESULTS_TABLE    = "ops.dq_results"
+WATERMARKS_TABLE = "ops.dq_watermarks"
+
+
+@dataclass(frozen=True)
+class Expectation:
+    name: str
+    aggregate: str         # SQL aggregate → number of failing rows
+    window: bool = False   # needs _prev_date (previous row of the same ticker)
+
+
+@dataclass(frozen=True)
+class Suite:
+    table: str
+    columns: list = field(default_factory=list)  # [(name, DuckDB type)] in table order
+    expectations: list = field(default_factory=list)
+    min_rows: int = 0  # whole-table row count
+
+
+def _failing(predicate: str) -> str:
+    return f"COUNT(*) FILTER (WHERE _new AND ({predicate}))"
+
+
+def not_null(*cols) -> list:
+    return [Expectation(f"not_null({c})", _failing(f"{c} IS NULL")) for c in cols]
+
+
+def between(col: str, lo=None, hi=None, strict: bool = False) -> Expectation:
+    """lo ≤ col ≤ hi (lo < col < hi if strict); NULLs pass, see not_null."""
+    bad = []
+    if lo is not None:
+        bad.append(f"{col} {'<=' if strict else '<'} {lo!r}")
+    if hi is not None:
+        bad.append(f"{col} {'>=' if strict else '>'} {hi!r}")
+    return Expectation(f"between({col}, {lo}, {hi}{', strict' if strict else ''})", _failing(" OR ".join(bad)))
+
+
+def unique(*cols) -> Expectation:
+    key = ", ".join(cols)
+    return Expectation(
+        f"unique({key})",
+        f"COUNT(*) FILTER (WHERE _new) - COUNT(DISTINCT ({key})) FILTER (WHERE _new)",
+    )
+
+
+def ohlc_consistent(open_="open", high="high", low="low", close="close") -> Expectation:
+    return Expectation(
+        "ohlc_consistent",
+        _failing(f"{low} > LEAST({open_}, {close}) OR {high} < GREATEST({open_}, {close}) OR {low} > {high}"),
+    )
+
+
+def max_gap(days: int, date_col: str = "date") -> Expectation:
+    """No more than `days` calendar days between consecutive rows of a ticker."""
+    return Expectation(f"max_gap({days}d)", _failing(f"{date_col} - _prev_date > {days}"), window=True)
+
+
+def parse_columns(ddl: str) -> list:
+    """'date DATE, open DOUBLE, …' (the etl COLUMNS strings) → [(name, type)]."""
+    return [tuple(m) for m in re.findall(r"(\w+)\s+(\w+)", ddl)]
+
+
+# ─── Storage ──────────────────────────────────────────────────────────────────────
+def create_tables(con):
+    con.execute("CREATE SCHEMA IF NOT EXISTS ops")
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {RESULTS_TABLE} (
+            checked_at   TIMESTAMP,
+            layer        VARCHAR,
+            table_name   VARCHAR,
+            expectation  VARCHAR,
+            rows_checked BIGINT,
+            failures     BIGINT,
+            success      BOOLEAN,
+            details      VARCHAR
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {WATERMARKS_TABLE} (
+            table_name VARCHAR,
+            ticker     VARCHAR,
+            last_date  DATE,
+            checked_at TIMESTAMP,
+            row_count  BIGINT,
+            PRIMARY KEY (table_name, ticker)
+        )
+    """)
+    con.execute(f"ALTER TABLE {WATERMARKS_TABLE} ADD COLUMN IF NOT EXISTS row_count BIGINT")
+
+
+# ─── Checks ───────────────────────────────────────────────────────────────────────
+def check_schema(con, suite: Suite):
+    schema, name = suite.table.split(".")
+    actual = con.execute("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = ? AND table_name = ?
+        ORDER BY ordinal_position
+    """, [schema, name]).fetchall()
+    expected = [(c, t.upper()) for c, t in suite.columns]
+    if actual == expected:
+        return 0, ""
+    missing = [c for c in expected if c not in actual]
+    extra = [c for c in actual if c not in expected]
+    details = f"missing {missing}, unexpected {extra}" if missing or extra else f"column order {actual}"
+    return 1, details
+
+
+def scan_sql(suite: Suite) -> str:
+    """The one SELECT that evaluates every expectation of `suite` on new rows."""
+    window = any(e.window for e in suite.expectations)
+    prev = ", LAG(t.date) OVER (PARTITION BY t.ticker ORDER BY t.date) AS _prev_date" if window else ""
+    aggregates = ",\n               ".join(e.aggregate for e in suite.expectations)
+    return f"""
+        WITH marks AS (SELECT ticker, last_date, row_count FROM {WATERMARKS_TABLE} WHERE table_name = ?),
+        -- a ticker whose row count up to its watermark changed is checked whole
+        w AS (
+            SELECT m.ticker, ANY_VALUE(m.last_date) AS last_date
+            FROM marks m LEFT JOIN {suite.table} t ON t.ticker = m.ticker AND t.date <= m.last_date
+            GROUP BY m.ticker
+            HAVING ANY_VALUE(m.row_count) IS NULL OR COUNT(t.date) = ANY_VALUE(m.row_count)
+        ),
+        scoped AS (
+            SELECT t.*, w.last_date IS NULL OR t.date > w.last_date AS _new {prev}
+            FROM {suite.table} t LEFT JOIN w USING (ticker)
+            WHERE w.last_date IS NULL OR t.date >= w.last_date
+        )
+        SELECT COUNT(*) FILTER (WHERE _new),
+               {aggregates}
+        FROM scoped
+    """
+
+
+def validate(con, layer: str, suite: Suite, full: bool = False) -> list:
+    """
+    Run `suite` against the partitions of suite.table added since its last
+    check (all of them if `full`). Returns the result rows, which are also
+    appended to ops.dq_results.
+    """
+    create_tables(con)
+    checked_at = datetime.datetime.now()
+    if full:
+        con.execute(f"DELETE FROM {WATERMARKS_TABLE} WHERE table_name = ?", [suite.table])
+
+    results = []
+    if suite.columns:
+        failures, details = check_schema(con, suite)
+        results.append(("schema", None, failures, details))
+    if suite.min_rows:
+        n = con.execute(f"SELECT COUNT(*) FROM {suite.table}").fetchone()[0]
+        results.append((f"min_rows({suite.min_rows})", None, int(n < suite.min_rows), f"{n} rows in table"))
+
+    rows_checked = 0
+    if suite.expectations:
+        counts = con.execute(scan_sql(suite), [suite.table]).fetchone()
+        rows_checked = counts[0]
+        results += [(e.name, rows_checked, int(f or 0), "") for e, f in zip(suite.expectations, counts[1:])]
+
+    rows = [
+        (checked_at, layer, suite.table, name, checked if checked is not None else rows_checked,
+         failures, failures == 0, details or None)
+        for name, checked, failures, details in results
+    ]
+    con.executemany(f"INSERT INTO {RESULTS_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    if rows_checked:  # failures are in ops.dq_results; the next run checks only later rows
+        con.execute(f"""
+            INSERT OR REPLACE INTO {WATERMARKS_TABLE} (table_name, ticker, last_date, checked_at, row_count)
+            SELECT ?, ticker, MAX(date), ?, COUNT(*) FROM {suite.table}
+            WHERE ticker IS NOT NULL AND date IS NOT NULL
+            GROUP BY ticker
+        """, [suite.table, checked_at])
+    return rows
@@ -0,0 +1,202 @@
+# src/registry.py
+"""
+File-based model registry: every trained model is a version directory,
+stored in the model's native compact format.
+
+    models/registry/<name>/
+        CURRENT                   the promoted version, one line
+        <name>-<hash>/
+            meta.json             kind, features, data fingerprint, params, metrics
+            model.txt             LightGBM: the booster's own text dump
+            coef.npy              linear: coefficients, (features,) float64
+            intercept.npy         linear: intercept, () float64
+
+A version's id is the model name plus a hash of its artifact files, so the
+same fit saved twice is one version and a retrain is a new one. Version
+directories are immutable once published (written to a temp directory and
+renamed), so every version can be kept and compared side by side without
+copies, and a loaded version can be cached in-process for good:
+ - linear coefficients are memory-mapped (np.load(mmap_mode="r")); loading
+   needs neither sklearn nor a pickle
+ - a LightGBM booster is parsed from model.txt once per process; forked
+   workers inherit it
+
+The CURRENT pointer is what scoring, SHAP and the pipeline's fingerprints
+read: promoting a version rewrites that one small file atomically.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+ROOT          = os.path.join("models", "registry")
+POINTER       = "CURRENT"
+META          = "meta.json"
+KEEP_VERSIONS = 5  # versions kept per model besides the current one
+
+_cache = {}  # version directory → loaded model
+_cache_lock = threading.Lock()
+
+
+class LinearModel:
+    """A fitted linear model as raw arrays; `coef_`/`intercept_` as sklearn and SHAP expect."""
+
+    def __init__(self, coef: np.ndarray, intercept: np.ndarray):
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return X @ self.coef_ + self.intercept_
+
+
+def current_path(name: str, root: str = ROOT) -> str:
+    return os.path.join(root, name, POINTER)
+
+
+def version_dir(path: str) -> str:
+    """Version directory of a CURRENT pointer file or of a version directory itself."""
+    if os.path.isdir(path):
+        return path
+    with open(path) as f:
+        return os.path.join(os.path.dirname(path), f.read().strip())
+
+
+def meta(path: str) -> dict:
+    with open(os.path.join(version_dir(path), META)) as f:
+        return json.load(f)
+
+
+def _is_booster(model) -> bool:
+    return type(model).__module__.startswith("lightgbm")
+
+
+def _write_artifacts(model, directory: str) -> str:
+    if _is_booster(model):
+        model.save_model(os.path.join(directory, "model.txt"))
+        return "lightgbm"
+    if hasattr(model, "coef_") and hasattr(model, "intercept_"):
+        np.save(os.path.join(directory, "coef.npy"), np.ravel(np.asarray(model.coef_, dtype=np.float64)))
+        np.save(os.path.join(directory, "intercept.npy"), np.asarray(model.intercept_, dtype=np.float64))
+        return "linear"
+    raise TypeError(f"cannot register a {type(model).__name__}: expected a LightGBM Booster or a linear model")
+
+
+def _artifact_hash(directory: str) -> str:
+    h = hashlib.sha256()
+    for f in sorted(os.listdir(directory)):
+        if f != META:
+            with open(os.path.join(directory, f), "rb") as fh:
+                h.update(f.encode() + b"\0" + fh.read())
+    return h.hexdigest()[:12]
+
+
+def save(name: str, model, data=None, params: dict = None, metrics: dict = None,
+         root: str = ROOT, promote: bool = True) -> str:
+    """
+    Register a fitted model as a new version of `name` and, by default, make
+    it current. `data` is the TrainingData it was fit on (features, rows and
+    the .npy cache key as the data fingerprint). Returns the version id.
+    """
+    base = os.path.join(root, name)
+    os.makedirs(base, exist_ok=True)
+    tmp = os.path.join(base, f".tmp-{os.getpid()}-{threading.get_ident()}")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    kind = _write_artifacts(model, tmp)
+    version = f"{name}-{_artifact_hash(tmp)}"
+    info = {
+        "name": name,
+        "version": version,
+        "kind": kind,
+        "created_at": datetime.datetime.now().isoformat(),
+        "features": list(data.feature_names) if data is not None else None,
+        "rows": int(len(data.X)) if data is not None else None,
+        "data_fingerprint": os.path.basename(data.path) if data is not None and data.path else None,
+        "params": params or {},
+        "metrics": metrics or {},
+    }
+    with open(os.path.join(tmp, META), "w") as f:
+        json.dump(info, f, indent=2, default=str)
+
+    final = os.path.join(base, version)
+    if os.path.exists(final):  # the same artifacts again: keep the published copy
+        shutil.rmtree(tmp)
+    else:
+        os.replace(tmp, final)
+    if promote:
+        set_current(name, version, root)
+    prune(name, root=root)
+    return version
+
+
+def set_current(name: str, version: str, root: str = ROOT):
+    if not os.path.isdir(os.path.join(root, name, version)):
+        raise FileNotFoundError(f"{name} has no version {version}")
+    pointer = current_path(name, root)
+    with open(f"{pointer}.tmp", "w") as f:
+        f.write(version + "\n")
+    os.replace(f"{pointer}.tmp", pointer)
+
+
+def versions(name: str, root: str = ROOT) -> list:
+    """meta.json of every version of `name`, oldest first."""
+    base = os.path.join(root, name)
+    if not os.path.isdir(base):
+        return []
+    out = [meta(os.path.join(base, d)) for d in os.listdir(base)
+           if os.path.exists(os.path.join(base, d, META))]
+    return sorted(out, key=lambda m: (m["created_at"], m["version"]))
+
+
+def compare(name: str, root: str = ROOT):
+    """One row per version of `name`: data fingerprint, rows, metrics and params side by side."""
+    import pandas as pd
+
+    pointer = current_path(name, root)
+    current = os.path.basename(version_dir(pointer)) if os.path.exists(pointer) else None
+    return pd.DataFrame([
+        {"version": m["version"], "current": m["version"] == current, "created_at": m["created_at"],
+         "data_fingerprint": m["data_fingerprint"], "rows": m["rows"],
+         **{f"metric_{k}": v for k, v in m["metrics"].items()},
+         **{f"param_{k}": v for k, v in m["params"].items()}}
+        for m in versions(name, root)
+    ])
+
+
+def prune(name: str, keep: int = KEEP_VERSIONS, root: str = ROOT) -> list:
+    """Delete all but the newest `keep` versions of `name`; the current version is always kept."""
+    pointer = current_path(name, root)
+    current = os.path.basename(version_dir(pointer)) if os.path.exists(pointer) else None
+    old = [m["version"] for m in versions(name, root) if m["version"] != current]
+    dropped = old[:max(0, len(old) - keep)]
+    for version in dropped:
+        path = os.path.join(root, name, version)
+        with _cache_lock:
+            _cache.pop(path, None)
+        shutil.rmtree(path)
+    return dropped
+
+
+def load(path: str):
+    """The model behind a CURRENT pointer or version directory, loaded once per process."""
+    directory = version_dir(path)
+    model = _cache.get(directory)
+    if model is not None:
+        return model
+    with _cache_lock:
+        if directory not in _cache:
+            if os.path.exists(os.path.join(directory, "model.txt")):
+                import lightgbm as lgb
+
+                model = lgb.Booster(model_file=os.path.join(directory, "model.txt"))
+            else:
+                model = LinearModel(np.load(os.path.join(directory, "coef.npy"), mmap_mode="r"),
+                                    np.load(os.path.join(directory, "intercept.npy")))
+            _cache[directory] = model
+        return _cache[directory]
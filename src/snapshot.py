@@ -0,0 +1,152 @@
+# src/snapshot.py
+"""
+Published read-only snapshots of the warehouse, for readers outside the
+nightly writer.
+
+DuckDB gives one process data/punta.duckdb read-write. A dashboard,
+notebook or training job started during a run either fails on the lock or,
+had it got in between two commits, would see some tables already rebuilt
+and others not. The writer instead publishes the tables readers need as
+Parquet once they are consistent:
+
+    data/snapshots/
+        CURRENT                   the last published snapshot, one line
+        <UTC timestamp>/
+            manifest.json         table → {file, rows, version}
+            gold.features.parquet
+            ...
+
+ - all tables are exported inside one transaction, so they are a
+   consistent cut, into a temp directory that is renamed when complete.
+   Then CURRENT is swapped atomically (write + os.replace), so a reader
+   sees the previous snapshot or the new one, never a mix
+ - a table whose version (row count and write counter, as the pipeline
+   fingerprints it) is the same as in the previous snapshot is hard-linked
+   from it rather than exported again
+ - connect() opens an in-memory DuckDB with one view per table over the
+   snapshot's files. It takes no lock on the warehouse, so any number of
+   readers run alongside the writer
+ - gc() deletes all but the KEEP newest snapshots, sparing any superseded
+   less than GRACE_SECONDS ago: a reader that connected just before the
+   swap may still be scanning it
+"""
+
+import datetime
+import json
+import os
+import shutil
+import time
+
+import duckdb
+
+from src.pipeline import table_exists, table_version
+
+ROOT          = os.path.join("data", "snapshots")
+POINTER       = "CURRENT"
+MANIFEST      = "manifest.json"
+KEEP          = 3        # snapshots kept besides the current one
+GRACE_SECONDS = 6 * 3600  # never delete a snapshot younger than this
+
+
+def current_path(root: str = ROOT) -> str:
+    return os.path.join(root, POINTER)
+
+
+def current(root: str = ROOT) -> str:
+    """Id of the last published snapshot, or None."""
+    try:
+        with open(current_path(root)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def manifest(snapshot: str, root: str = ROOT) -> dict:
+    with open(os.path.join(root, snapshot, MANIFEST)) as f:
+        return json.load(f)
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:  # no hard links on this filesystem
+        shutil.copy2(src, dst)
+
+
+def publish(con, tables, root: str = ROOT) -> str:
+    """Export `tables` (those that exist) as a new snapshot, make it current and return its id."""
+    previous = current(root)
+    before = manifest(previous, root)["tables"] if previous else {}
+    snapshot = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    tmp = os.path.join(root, f".tmp-{snapshot}")
+    os.makedirs(tmp)
+
+    out = {}
+    con.begin()  # one consistent cut of every table
+    try:
+        for table in tables:
+            if not table_exists(con, table):
+                continue
+            version = table_version(con, table)
+            file = f"{table}.parquet"
+            if before.get(table, {}).get("version") == version:
+                _link_or_copy(os.path.join(root, previous, before[table]["file"]), os.path.join(tmp, file))
+            else:
+                con.execute(f"COPY (SELECT * FROM {table}) TO '{os.path.join(tmp, file)}' "
+                            "(FORMAT PARQUET, COMPRESSION ZSTD)")
+            out[table] = {"file": file, "rows": int(version.split("|")[0]), "version": version,
+                          "exported": before.get(table, {}).get("version") != version}
+    except Exception:
+        con.rollback()
+        shutil.rmtree(tmp)
+        raise
+    con.commit()
+
+    with open(os.path.join(tmp, MANIFEST), "w") as f:
+        json.dump({"snapshot": snapshot, "previous": previous, "tables": out}, f, indent=2)
+    os.replace(tmp, os.path.join(root, snapshot))
+    with open(f"{current_path(root)}.tmp", "w") as f:
+        f.write(snapshot + "\n")
+    os.replace(f"{current_path(root)}.tmp", current_path(root))
+    return snapshot
+
+
+def snapshots(root: str = ROOT) -> list:
+    """Published snapshot ids, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if os.path.exists(os.path.join(root, d, MANIFEST)))
+
+
+def gc(root: str = ROOT, keep: int = KEEP, grace: float = GRACE_SECONDS) -> list:
+    """Delete old snapshots (and abandoned temp directories); returns the names removed."""
+    live, published = current(root), snapshots(root)
+    # a snapshot's last reader connected before its successor was published
+    superseded = {s: os.path.getmtime(os.path.join(root, nxt, MANIFEST)) for s, nxt in zip(published, published[1:])}
+    old = [s for s in published if s != live]
+    old = [(s, superseded.get(s)) for s in old[:max(0, len(old) - keep)]]
+    if os.path.isdir(root):
+        old += [(d, os.path.getmtime(os.path.join(root, d))) for d in os.listdir(root) if d.startswith(".tmp-")]
+
+    now, removed = time.time(), []
+    for name, since in old:
+        if since is not None and now - since >= grace:
+            shutil.rmtree(os.path.join(root, name))
+            removed.append(name)
+    return removed
+
+
+def connect(root: str = ROOT, snapshot: str = None):
+    """
+    An in-memory DuckDB connection with a view per table of `snapshot`
+    (default: the current one), under the warehouse's table names.
+    """
+    snapshot = snapshot or current(root)
+    if snapshot is None:
+        raise FileNotFoundError(f"nothing published under {root} yet")
+    con = duckdb.connect()
+    for table, info in manifest(snapshot, root)["tables"].items():
+        path = os.path.abspath(os.path.join(root, snapshot, info["file"]))
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {table.split('.')[0]}")
+        con.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{path}')")
+    return con
@@ -0,0 +1,116 @@
+# src/synthetic.py
+"""
+Seeded synthetic OHLCV data in the raw.prices layout.
+
+Each ticker follows a geometric Brownian motion with its own drift and
+volatility. Bars are made dirty in the ways the bronze and silver stages
+clean up:
+ - gaps: missing trading days, late listings and early delistings
+ - duplicate (ticker, date) rows
+ - zero-volume days and non-positive prices
+ - price outliers (fat-finger spikes ×10 / ×0.1)
+
+Ticker i is drawn from its own generator seeded with (seed, i), so the
+first 500 tickers of a 5,000-ticker universe are identical to a
+500-ticker universe with the same seed. The first ticker is the benchmark
+(SPY). It has full history and no outliers.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src import incremental
+from src.prices import BENCHMARK_TKR, PRICE_COLUMNS, PRICE_SCHEMA, create_raw_table
+
+START_DATE     = "2013-01-01"
+GAP_RATE       = 0.01    # share of trading days missing per ticker
+DUPLICATE_RATE = 0.005   # share of rows repeated
+ZERO_VOL_RATE  = 0.005   # share of rows with volume 0
+BAD_PRICE_RATE = 0.0005  # share of rows with a non-positive price
+OUTLIER_RATE   = 0.001   # share of rows with a ×10 / ×0.1 price spike
+LATE_LISTING   = 0.2     # share of tickers listed after the first day
+DELISTED       = 0.05    # share of tickers delisted before the last day
+CHUNK_TICKERS  = 1_000   # tickers generated and inserted at a time
+
+
+def ticker_names(n_tickers: int) -> list:
+    return [BENCHMARK_TKR] + [f"T{i:05d}" for i in range(1, n_tickers)]
+
+
+def _one_ticker(i: int, ticker: str, dates: np.ndarray, seed: int) -> dict:
+    rng = np.random.default_rng([seed, i])
+    n = len(dates)
+    clean = ticker == BENCHMARK_TKR
+
+    # ─── listing window ───────────────────────────────────────────────────────
+    lo, hi = 0, n
+    if not clean and rng.random() < LATE_LISTING:
+        lo = int(rng.integers(1, n // 2))
+    if not clean and rng.random() < DELISTED:
+        hi = int(rng.integers(lo + (hi - lo) // 2, hi))
+    m = hi - lo
+
+    # ─── GBM path ─────────────────────────────────────────────────────────────
+    mu = rng.normal(0.0003, 0.0003)
+    sigma = rng.uniform(0.01, 0.03)
+    close = rng.uniform(10, 500) * np.exp(np.cumsum(rng.normal(mu - sigma ** 2 / 2, sigma, m)))
+    prev = np.concatenate([[close[0]], close[:-1]])
+    open_ = prev * np.exp(rng.normal(0, sigma / 4, m))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, sigma / 2, m)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, sigma / 2, m)))
+    dividend_yield = rng.uniform(0, 0.03)
+    adj_close = close * (1 - dividend_yield) ** ((m - 1 - np.arange(m)) / 252)
+    volume = rng.lognormal(13, 1, m).astype(np.int64) + 1
+
+    if not clean:
+        spike = rng.random(m) < OUTLIER_RATE
+        factor = np.where(rng.random(m) < 0.5, 10.0, 0.1)
+        close = np.where(spike, close * factor, close)
+        adj_close = np.where(spike, adj_close * factor, adj_close)
+        high = np.maximum(high, close)
+        low = np.minimum(low, close)
+        close = np.where(rng.random(m) < BAD_PRICE_RATE, 0.0, close)
+        volume = np.where(rng.random(m) < ZERO_VOL_RATE, 0, volume)
+
+    # ─── gaps and duplicates ──────────────────────────────────────────────────
+    keep = np.flatnonzero(rng.random(m) >= (0.0 if clean else GAP_RATE))
+    dup = keep[rng.random(len(keep)) < DUPLICATE_RATE]
+    rows = np.sort(np.concatenate([keep, dup]), kind="stable")
+    return {
+        "date": dates[lo:hi][rows], "open": open_[rows], "high": high[rows], "low": low[rows],
+        "close": close[rows], "adj_close": adj_close[rows], "volume": volume[rows],
+        "ticker": np.full(len(rows), ticker, dtype=object),
+    }
+
+
+def iter_prices(n_tickers: int, n_days: int, seed: int = 0, start: str = START_DATE,
+                chunk_tickers: int = CHUNK_TICKERS):
+    """Yield raw.prices-shaped Arrow tables, `chunk_tickers` tickers at a time."""
+    dates = pd.bdate_range(start, periods=n_days).values.astype("datetime64[D]")
+    names = ticker_names(n_tickers)
+    for lo in range(0, n_tickers, chunk_tickers):
+        parts = [_one_ticker(i, names[i], dates, seed) for i in range(lo, min(lo + chunk_tickers, n_tickers))]
+        yield pa.table(
+            {c: np.concatenate([p[c] for p in parts]) for c in PRICE_COLUMNS},
+            schema=PRICE_SCHEMA,
+        )
+
+
+def synthetic_prices(n_tickers: int, n_days: int, seed: int = 0, start: str = START_DATE) -> pa.Table:
+    return pa.concat_tables(iter_prices(n_tickers, n_days, seed, start))
+
+
+def write_raw_prices(con, n_tickers: int, n_days: int, seed: int = 0, start: str = START_DATE) -> int:
+    """Replace raw.prices with a synthetic universe; returns the rows written."""
+    create_raw_table(con, full=True)
+    rows = 0
+    for chunk in iter_prices(n_tickers, n_days, seed, start):
+        con.register("synthetic_prices", chunk)
+        try:
+            con.execute(f"INSERT INTO raw.prices SELECT {', '.join(PRICE_COLUMNS)} FROM synthetic_prices")
+        finally:
+            con.unregister("synthetic_prices")
+        rows += chunk.num_rows
+    incremental.bump(con, "raw.prices")
+    return rows
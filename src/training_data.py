@@ -0,0 +1,254 @@
+# src/training_data.py
+"""
+Shared training-data loader for the trainers and SHAP.
+
+ - features (from the feature cache) and labels are joined on (ticker, date)
+   inside DuckDB, never by row position
+ - only the requested columns are projected, already cast to FLOAT
+ - the result comes back through Arrow and is copied once, column by column,
+   into a contiguous float32 matrix (C or Fortran order)
+ - rows are ordered by (date, ticker), so TimeSeriesSplit folds are chronological
+ - optionally the matrix is cached as .npy files keyed by the feature
+   definition and the label data, and memory-mapped on later runs
+ - with stream=True the .npy files are written batch by batch from a DuckDB
+   query over the feature-cache Parquet files (DuckDB sorts and joins out of
+   core), so the matrix never has to fit in memory. It is read back in row
+   blocks (TrainingData.blocks) or by LightGBM (src/lgb_dataset.py)
+ - loads in one process are serialised, so stages running side by side
+   (etl/pipeline.py) never refresh the feature cache at the same time
+"""
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.feature_cache import FeatureCache
+from src.perf import Timer, peak_rss_mb
+
+LABEL_TABLE = "gold.labels"
+NPY_CACHE   = os.path.join("data", "cache", "training")
+BLOCK_ROWS  = 262_144  # rows per Arrow batch / row block when streaming
+
+_load_lock = threading.Lock()
+
+
+@dataclass
+class TrainingData:
+    X: np.ndarray              # (rows, features) float32
+    y: np.ndarray              # (rows,) float32, or None when loaded without a label
+    tickers: np.ndarray        # (rows,) str
+    dates: np.ndarray          # (rows,) datetime64[D]
+    feature_names: list
+    path: str = None           # .npy cache directory, if the matrix came from one
+
+    def blocks(self, rows: int = BLOCK_ROWS):
+        """
+        Yield (lo, X[lo:hi]) row blocks. From an .npy cache they are read with
+        plain file reads, so scanning a large X does not map it all in.
+        """
+        n = len(self.X)
+        if self.path is None or not self.X.flags.c_contiguous:
+            for lo in range(0, n, rows):
+                yield lo, np.asarray(self.X[lo:lo + rows])
+            return
+        for lo in range(0, n, rows):
+            yield lo, read_rows(os.path.join(self.path, "X.npy"), lo, min(lo + rows, n))
+
+
+def npy_layout(path: str):
+    """(shape, dtype, data offset) of a C-order .npy file."""
+    with open(path, "rb") as f:
+        major, _ = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+        shape, fortran, dtype = read_header(f)
+        if fortran:
+            raise ValueError(f"{path} is Fortran-ordered")
+        return shape, dtype, f.tell()
+
+
+def read_rows(path: str, lo: int, hi: int) -> np.ndarray:
+    """Rows lo:hi of a 2-D C-order .npy file, read without a memory map."""
+    shape, dtype, offset = npy_layout(path)
+    row_bytes = int(np.prod(shape[1:], dtype=np.int64)) * dtype.itemsize
+    with open(path, "rb") as f:
+        f.seek(offset + lo * row_bytes)
+        return np.fromfile(f, dtype=dtype, count=(hi - lo) * (row_bytes // dtype.itemsize)).reshape(
+            (hi - lo,) + tuple(shape[1:]))
+
+
+def to_matrix(table: pa.Table, columns, order: str = "C") -> np.ndarray:
+    """Copy float32 Arrow columns into one contiguous (rows, columns) matrix."""
+    X = np.empty((table.num_rows, len(columns)), dtype=np.float32, order=order)
+    for j, name in enumerate(columns):
+        offset = 0
+        for chunk in table.column(name).chunks:
+            # zero-copy view of the Arrow buffer (no nulls) → single copy into X
+            X[offset:offset + len(chunk), j] = chunk.to_numpy(zero_copy_only=False)
+            offset += len(chunk)
+    return X
+
+
+def _strings(col: pa.ChunkedArray) -> np.ndarray:
+    """Low-cardinality string column → numpy str array via its dictionary."""
+    enc = pc.dictionary_encode(col).combine_chunks()
+    return np.asarray(enc.dictionary.to_pylist(), dtype=str)[enc.indices.to_numpy()]
+
+
+def _label_fingerprint(con, label: str) -> str:
+    n, h = con.execute(
+        f"SELECT COUNT(*), SUM(HASH(ticker, date, {label})) FROM {LABEL_TABLE}"
+    ).fetchone()
+    return f"{n}|{h}"
+
+
+def load_training_data(con, features, passthrough=(), label: str = "excess_return_12m",
+                       exclude=(), order: str = "C", cache: FeatureCache = None,
+                       npy_cache: str = None, stream: bool = False) -> TrainingData:
+    """
+    Load (X, y) for `passthrough + features`, dropping rows with any null.
+
+    With label=None only features are loaded (e.g. to explain every row).
+    Pass `npy_cache` (a directory) to keep the matrix as memory-mappable .npy
+    files for repeated runs on unchanged data. `stream=True` builds those
+    files out of core (C order only).
+    """
+    if stream and (not npy_cache or order != "C"):
+        raise ValueError("stream=True needs an npy_cache and order='C'")
+    cache = cache or FeatureCache()
+    columns = list(passthrough) + list(features)
+
+    with _load_lock, Timer() as t:
+        def_hash = cache.refresh(con, features, passthrough)
+        path = None
+        if npy_cache:
+            parts = [def_hash, order, ",".join(columns), ",".join(exclude),
+                     label or "", _label_fingerprint(con, label) if label else ""]
+            path = os.path.join(npy_cache, hashlib.sha256("|".join(parts).encode()).hexdigest()[:16])
+
+        if path and os.path.exists(path):
+            how = "memory-mapped"
+            data = _open_npy(path, columns, label)
+        elif stream:
+            how = "streamed"
+            _stream_npy(con, cache, def_hash, columns, label, exclude, path)
+            data = _open_npy(path, columns, label)
+        else:
+            how = "loaded"
+            data = _query(con, cache, features, passthrough, label, exclude, order)
+            if path:
+                _save_npy(path, data)
+
+    rows, cols = data.X.shape
+    print(f"📦 {how} {rows:,}×{cols} float32 in {t.elapsed:.2f}s · peak RSS {peak_rss_mb():,.0f} MiB")
+    return data
+
+
+def _query(con, cache, features, passthrough, label, exclude, order) -> TrainingData:
+    columns = list(passthrough) + list(features)
+    feats = cache.load(con, features, passthrough=passthrough, exclude=exclude,
+                       refresh=False, sort=False)  # sorted after the join
+
+    select = ", ".join(f"CAST(f.{c} AS FLOAT) AS {c}" for c in columns)
+    not_null = " AND ".join(f"f.{c} IS NOT NULL" for c in columns)
+    join, y_col = "", ""
+    if label:
+        join = f"JOIN {LABEL_TABLE} l USING (ticker, date)"
+        y_col = f", CAST(l.{label} AS FLOAT) AS __y"
+        not_null += f" AND l.{label} IS NOT NULL"
+
+    con.register("feature_rows", feats)
+    try:
+        table = con.execute(f"""
+            SELECT f.ticker, f.date, {select}{y_col}
+            FROM feature_rows f {join}
+            WHERE {not_null}
+        """).fetch_arrow_table()
+    finally:
+        con.unregister("feature_rows")
+    # Arrow's sort is ~2x faster than ORDER BY on the joined result here
+    table = table.sort_by([("date", "ascending"), ("ticker", "ascending")])
+
+    return TrainingData(
+        X=to_matrix(table, columns, order=order),
+        y=to_matrix(table, ["__y"])[:, 0] if label else None,
+        tickers=_strings(table.column("ticker")),
+        dates=table.column("date").to_numpy(),
+        feature_names=columns,
+    )
+
+
+def _open_npy(path: str, columns, label) -> TrainingData:
+    return TrainingData(
+        X=np.load(os.path.join(path, "X.npy"), mmap_mode="r"),
+        y=np.load(os.path.join(path, "y.npy"), mmap_mode="r") if label else None,
+        tickers=np.load(os.path.join(path, "tickers.npy"), mmap_mode="r"),
+        dates=np.load(os.path.join(path, "dates.npy"), mmap_mode="r"),
+        feature_names=columns,
+        path=path,
+    )
+
+
+def _stream_npy(con, cache, def_hash, columns, label, exclude, path, batch_rows: int = BLOCK_ROWS):
+    """Write the .npy files of `path` from a DuckDB stream, one Arrow batch at a time."""
+    files = os.path.join(cache.root, def_hash, "year=*", "bucket=*", "part.parquet")
+    select = ", ".join(f"CAST(f.{c} AS FLOAT) AS {c}" for c in columns)
+    not_null = " AND ".join(f"f.{c} IS NOT NULL" for c in columns)
+    join, y_col = "", ""
+    if label:
+        join = f"JOIN {LABEL_TABLE} l USING (ticker, date)"
+        y_col = f", CAST(l.{label} AS FLOAT) AS __y"
+        not_null += f" AND l.{label} IS NOT NULL"
+    query = f"""
+        SELECT f.ticker, f.date, {select}{y_col}
+        FROM read_parquet('{files}') f {join}
+        WHERE {not_null} AND NOT list_contains(?::VARCHAR[], f.ticker)
+    """
+    n, width = con.execute(f"SELECT COUNT(*), COALESCE(MAX(LENGTH(ticker)), 1) FROM ({query})",
+                           [list(exclude)]).fetchone()
+    layout = {
+        "X.npy": (np.dtype(np.float32), (n, len(columns))),
+        "y.npy": (np.dtype(np.float32), (n,)),
+        "tickers.npy": (np.dtype(f"<U{width}"), (n,)),
+        "dates.npy": (np.dtype("datetime64[D]"), (n,)),
+    }
+    if not label:
+        del layout["y.npy"]
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    out = {}
+    try:
+        for name, (dtype, shape) in layout.items():
+            out[name] = open(os.path.join(tmp, name), "wb")
+            np.lib.format.write_array_header_1_0(out[name], {
+                "descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape,
+            })
+        reader = con.execute(f"{query} ORDER BY f.date, f.ticker", [list(exclude)]).fetch_record_batch(batch_rows)
+        for batch in reader:
+            chunk = pa.Table.from_batches([batch])
+            out["X.npy"].write(to_matrix(chunk, columns).tobytes())
+            if label:
+                out["y.npy"].write(to_matrix(chunk, ["__y"]).tobytes())
+            tickers = chunk.column("ticker").to_numpy(zero_copy_only=False)
+            out["tickers.npy"].write(tickers.astype(layout["tickers.npy"][0]).tobytes())
+            out["dates.npy"].write(chunk.column("date").to_numpy().astype("datetime64[D]").tobytes())
+    finally:
+        for f in out.values():
+            f.close()
+    os.replace(tmp, path)  # publish the whole directory at once
+
+
+def _save_npy(path: str, data: TrainingData):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, "X.npy"), data.X)
+    if data.y is not None:
+        np.save(os.path.join(tmp, "y.npy"), data.y)
+    np.save(os.path.join(tmp, "tickers.npy"), data.tickers)
+    np.save(os.path.join(tmp, "dates.npy"), data.dates)
+    os.replace(tmp, path)  # publish the whole directory at once
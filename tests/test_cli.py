@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+import pytest
+
+from etl import cli
+
+HEAVY = {"sklearn", "lightgbm", "optuna", "shap", "yfinance", "scipy"}
+BUDGETS = {  # module → (import-time budget in seconds, heavy modules it may load)
+    "etl.cli":              (0.25, set()),
+    "etl.ingest_raw":       (1.0,  {"pandas"}),  # its sources and Arrow load work on DataFrames
+    "etl.bronze_transform": (0.5,  set()),
+    "etl.silver_transform": (0.5,  set()),
+    "etl.generate_gold":    (1.0,  set()),
+    "etl.grade":            (1.0,  set()),
+    "etl.train_baseline":   (1.0,  set()),
+    "etl.train_lightgbm":   (1.0,  set()),
+    "etl.score":            (1.0,  set()),
+    "etl.explain":          (1.0,  set()),
+    "etl.drift":            (1.0,  set()),
+    "etl.validate":         (1.0,  set()),
+    "etl.backtest":         (1.0,  set()),
+    "etl.publish":          (1.0,  set()),
+    "etl.pipeline":         (2.0,  {"pandas"}),
+}
+
+
+def import_time(module: str):
+    """(seconds, top-level packages imported) for `import module` in a fresh interpreter."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         capture_output=True, text=True, check=True).stderr
+    total, packages = 0, set()
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        packages.add(name.strip().split(".")[0])
+        if not name.startswith("  "):  # top-level import: its cumulative time covers the nested ones
+            total += int(cumulative)
+    return total / 1e6, packages
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_import_time_budget(module):
+    budget, allowed = BUDGETS[module]
+    seconds, packages = import_time(module)
+    heavy = packages & (HEAVY | {"pandas"}) - allowed
+    assert not heavy, f"{module} imports {sorted(heavy)}"
+    assert seconds < budget, f"import {module} took {seconds:.2f}s (budget {budget}s)"
+
+
+def test_train_dispatches_to_the_trainer():
+    assert cli.resolve("train", ["lightgbm", "--trials", "5"]) == ("etl.train_lightgbm", ["--trials", "5"])
+    assert cli.resolve("bronze", ["--full"]) == ("etl.bronze_transform", ["--full"])
+    with pytest.raises(SystemExit):
+        cli.resolve("train", ["xgboost"])
@@ -0,0 +1,61 @@
+import duckdb
+import numpy as np
+import pandas as pd
+
+from etl import grade
+from etl.ingest_raw import bulk_insert, create_raw_table
+from src.cross_section import CrossSection
+from tests.test_incremental import make_prices, run_pipeline
+
+
+def test_rank_and_zscore_match_pandas_groupby():
+    rng = np.random.default_rng(0)
+    dates = np.sort(rng.integers(0, 20, 500))
+    x = np.round(rng.normal(size=500), 1)  # rounded: plenty of ties
+    x[::17] = np.nan
+    cs = CrossSection(dates)
+
+    by_date = pd.Series(x).groupby(dates)
+    rank = (by_date.rank() - 1) / (by_date.transform("count") - 1)
+    z = ((pd.Series(x) - by_date.transform("mean")) / by_date.transform("std")).clip(-3, 3)
+    np.testing.assert_allclose(cs.rank(x), rank)
+    np.testing.assert_allclose(cs.zscore(x[:, None])[:, 0], z, atol=1e-12)
+
+
+def test_grades_span_zero_to_five_per_date_and_regrade_incrementally():
+    prices = make_prices([f"T{i:02d}" for i in range(12)], periods=300, seed=4)
+    con = duckdb.connect()
+    create_raw_table(con)
+    bulk_insert(con, [prices[prices["date"] < "2021-01-01"]])
+    run_pipeline(con)
+    grade.run(con)
+    bulk_insert(con, [prices[prices["date"] >= "2021-01-01"]])
+    run_pipeline(con)
+    grade.run(con)
+
+    grades = con.execute("SELECT * FROM gold.grades ORDER BY date, ticker").fetchdf()
+    per_date = grades.groupby("date")["grade"].agg(["min", "max"])
+    assert (per_date["min"] == 0).all() and (per_date["max"] == grade.GRADE_MAX).all()
+    assert grades["fundamentals"].isna().all() and grades["technicals"].notna().all()
+
+    grade.run(con, full=True)
+    full = con.execute("SELECT * FROM gold.grades ORDER BY date, ticker").fetchdf()
+    pd.testing.assert_frame_equal(grades, full)
+
+
+def test_benchmarks_are_not_graded():
+    tickers = [f"T{i:02d}" for i in range(6)]
+    prices = make_prices(["SPY", "XLK"] + tickers, periods=300, seed=5)
+    con = duckdb.connect()
+    create_raw_table(con)
+    bulk_insert(con, [prices])
+    con.execute("CREATE SCHEMA silver")
+    con.execute("CREATE TABLE silver.benchmarks (ticker VARCHAR PRIMARY KEY, benchmark VARCHAR NOT NULL)")
+    con.executemany("INSERT INTO silver.benchmarks VALUES (?, 'XLK')", [[t] for t in tickers[:3]])
+    run_pipeline(con)
+    grade.run(con)
+
+    graded = {t for (t,) in con.execute("SELECT DISTINCT ticker FROM gold.grades").fetchall()}
+    assert graded == set(tickers)
+    per_date = con.execute("SELECT MIN(grade), MAX(grade) FROM gold.grades GROUP BY date").fetchall()
+    assert set(per_date) == {(0.0, grade.GRADE_MAX)}
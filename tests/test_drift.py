@@ -0,0 +1,103 @@
+import datetime
+
+import duckdb
+import numpy as np
+
+from src import drift
+from src.training_data import TrainingData
+
+VERSION = "m-abc"
+TICKERS = np.array(["AAA", "BBB", "1211.HK"])
+
+
+def reference(rng, n=3000):
+    tickers = TICKERS[rng.integers(0, 3, n)]
+    dates = np.datetime64("2020-01-01") + rng.integers(0, 365, n).astype("timedelta64[D]")
+    X = rng.normal(0, 1, (n, 2)).astype(np.float32)
+    return TrainingData(X, None, tickers, dates, ["f1", "f2"])
+
+
+def score_rows(con, rng, start, n, shift, scored_at):
+    tickers = TICKERS[rng.integers(0, 3, n)]
+    dates = [start + datetime.timedelta(days=int(d)) for d in rng.permutation(n)]  # unique per row
+    X = rng.normal(shift, 1, (n, 2))
+    con.executemany("INSERT INTO features VALUES (?, ?, ?, ?)",
+                    [(t, d, float(a), float(b)) for t, d, (a, b) in zip(tickers, dates, X)])
+    con.executemany("INSERT INTO scores VALUES (?, ?, ?, ?)",
+                    [(t, d, VERSION, scored_at) for t, d in zip(tickers, dates)])
+    return tickers, X
+
+
+def setup():
+    con = duckdb.connect()
+    con.execute("CREATE TABLE features (ticker VARCHAR, date DATE, f1 DOUBLE, f2 DOUBLE)")
+    con.execute("CREATE TABLE scores (ticker VARCHAR, date DATE, model_version VARCHAR, scored_at TIMESTAMP)")
+    return con
+
+
+def test_ticker_groups_agree_in_python_and_sql():
+    tickers = ["MSFT", "1211.HK", "600519.SS", "RELIANCE.NS", "BRK.B"]
+    sql = duckdb.sql(f"SELECT {drift.ticker_group_sql('t')} FROM unnest(?) AS u(t)", params=[tickers])
+    assert [r[0] for r in sql.fetchall()] == [drift.ticker_group(t) for t in tickers] \
+        == ["US", "HK", "CN", "IN", "US"]
+
+
+def test_sketches_match_a_full_recount_and_update_incrementally():
+    rng = np.random.default_rng(0)
+    con = setup()
+    ref = reference(rng)
+    drift.save_reference(con, VERSION, ref)
+
+    first = datetime.datetime(2021, 6, 1)
+    t1, X1 = score_rows(con, rng, datetime.date(2021, 2, 1), 400, 0.0, first)
+    assert drift.update_current(con, VERSION, "features", "scores") == 400
+    assert drift.update_current(con, VERSION, "features", "scores") == 0  # nothing new
+
+    t2, X2 = score_rows(con, rng, datetime.date(2023, 3, 1), 300, 1.0, first + datetime.timedelta(days=1))
+    assert drift.update_current(con, VERSION, "features", "scores") == 300
+
+    # PSI from the stored sketches = PSI recomputed from the raw values
+    psi = {(f, g): (v, r, c) for f, g, v, r, c in drift.compute_psi(con, VERSION, window_months=120)}
+    for j, feature in enumerate(ref.feature_names):
+        edges = drift.quantile_edges(ref.X[:, j])
+        p = np.bincount(np.searchsorted(edges, ref.X[:, j]), minlength=len(edges) + 1)
+        cur = np.concatenate([X1[:, j], X2[:, j]]).astype(np.float32)
+        q = np.bincount(np.searchsorted(edges, cur), minlength=len(edges) + 1)
+        value, ref_rows, cur_rows = psi[(feature, drift.ALL_GROUP)]
+        assert (ref_rows, cur_rows) == (3000, 700)
+        assert abs(value - drift.psi(p, q)) < 1e-9
+        hk = psi[(feature, "HK")]
+        assert hk[2] == np.sum(t1 == "1211.HK") + np.sum(t2 == "1211.HK")
+
+    # the recent window holds only the shifted batch, which has drifted
+    recent = {(f, g): v for f, g, v, _, _ in drift.compute_psi(con, VERSION, window_months=3)}
+    assert recent[("f1", drift.ALL_GROUP)] > drift.ALERT_PSI
+    assert drift.status_of(recent[("f1", drift.ALL_GROUP)], 300) == "alert"
+    assert drift.status_of(0.01, 10) == "too_few_rows"
+
+
+def test_rescored_rows_are_counted_once_with_their_new_values():
+    rng = np.random.default_rng(1)
+    con = setup()
+    ref = reference(rng)
+    drift.save_reference(con, VERSION, ref)
+    first = datetime.datetime(2021, 6, 1)
+    score_rows(con, rng, datetime.date(2021, 2, 1), 400, 0.0, first)
+    drift.update_current(con, VERSION, "features", "scores")
+
+    # generate_gold rewrites some feature rows and forgets their scores; scoring redoes them
+    changed = "ticker = 'AAA' AND date < DATE '2021-04-01'"
+    n = con.execute(f"SELECT COUNT(*) FROM scores WHERE {changed}").fetchone()[0]
+    con.execute(f"UPDATE features SET f1 = f1 + 5 WHERE {changed}")
+    con.execute(f"UPDATE scores SET scored_at = ? WHERE {changed}", [first + datetime.timedelta(days=1)])
+    assert drift.update_current(con, VERSION, "features", "scores") == n > 0
+
+    f1 = np.array([r[0] for r in con.execute("SELECT f1 FROM features").fetchall()], dtype=np.float32)
+    edges = drift.quantile_edges(ref.X[:, 0])
+    q = np.bincount(np.searchsorted(edges, f1), minlength=len(edges) + 1)
+    stored = con.execute(f"""
+        SELECT bin, SUM(n) FROM {drift.HISTOGRAMS_TABLE}
+        WHERE kind = 'current' AND feature = 'f1' AND grp = '{drift.ALL_GROUP}'
+        GROUP BY bin ORDER BY bin
+    """).fetchall()
+    assert {b: n for b, n in stored} == {b: n for b, n in enumerate(q) if n}
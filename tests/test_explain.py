@@ -0,0 +1,66 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import lightgbm as lgb
+import numpy as np
+import pytest
+from sklearn.linear_model import ElasticNet
+
+from src import explain, registry
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 4)).astype(np.float32)
+    y = X[:, 0] - 0.5 * X[:, 1] + 0.1 * rng.normal(size=600)
+    return X, y
+
+
+def test_tree_shap_adds_up_and_parallel_matches(data, tmp_path):
+    X, y = data
+    booster = lgb.train({"objective": "regression", "verbosity": -1}, lgb.Dataset(X, y), 20)
+    path = registry.current_path("lightgbm", str(tmp_path))
+    registry.save("lightgbm", booster, root=str(tmp_path))
+
+    serial, base = explain.explain(str(path), X, chunk_rows=100)
+    parallel, _ = explain.explain(str(path), X, workers=2, chunk_rows=100)
+    np.testing.assert_allclose(serial.sum(axis=1) + base, booster.predict(X), atol=1e-5)
+    np.testing.assert_array_equal(serial, parallel)
+
+
+def test_linear_shap_against_kmeans_background(data, tmp_path):
+    X, y = data
+    model = ElasticNet(alpha=0.01).fit(X, y)
+    path = registry.current_path("elasticnet", str(tmp_path))
+    registry.save("elasticnet", model, root=str(tmp_path))
+
+    mean, cov = explain.summarise_background(X, k=20)
+    values, base = explain.explain(str(path), X[:50], (mean, cov))
+    np.testing.assert_allclose(values, model.coef_ * (X[:50] - mean), rtol=1e-4, atol=1e-5)
+    assert base == pytest.approx(model.predict(mean[None, :])[0])
+
+
+def test_concurrent_explains_keep_their_own_explainer(data, tmp_path):
+    X, y = data
+    root = str(tmp_path)
+    booster = lgb.train({"objective": "regression", "verbosity": -1}, lgb.Dataset(X, y), 20)
+    enet = ElasticNet(alpha=0.01).fit(X, y)
+    registry.save("lightgbm", booster, root=root)
+    registry.save("elasticnet", enet, root=root)
+    mean, cov = explain.summarise_background(X, k=20)
+    jobs = {
+        "lightgbm": (registry.current_path("lightgbm", root), None, booster),
+        "elasticnet": (registry.current_path("elasticnet", root), (mean, cov), enet),
+    }
+    expected = {name: explain.explain(path, X[:1], bg)[1] for name, (path, bg, _) in jobs.items()}
+    assert expected["lightgbm"] != pytest.approx(expected["elasticnet"])
+
+    # the pipeline explains both models on two threads at once
+    with ThreadPoolExecutor(2) as pool:
+        futures = [(name, pool.submit(explain.explain, path, X[:200], bg, 1, 20))
+                   for _ in range(10) for name, (path, bg, _) in jobs.items()]
+        for name, future in futures:
+            values, base = future.result()
+            assert base == pytest.approx(expected[name])
+            np.testing.assert_allclose(values.sum(axis=1) + base, jobs[name][2].predict(X[:200]),
+                                       rtol=1e-4, atol=1e-4)
@@ -0,0 +1,59 @@
+import duckdb
+import pandas as pd
+import pytest
+
+from src import features as fx
+from src.feature_cache import FeatureCache, definition_hash
+from tests.test_incremental import make_prices
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    con.execute("CREATE SCHEMA silver")
+    return con
+
+
+def load_silver(con, df):
+    con.register("df", df)
+    con.execute("CREATE OR REPLACE TABLE silver.prices AS SELECT * FROM df")
+    con.unregister("df")
+
+
+def test_only_stale_partitions_are_recomputed(con, tmp_path, capsys):
+    prices = make_prices(["AAA", "B.HK"], periods=600)  # 2020-01-01 … 2022-04
+    load_silver(con, prices[prices["date"] < "2022-03-01"])
+    cache = FeatureCache(str(tmp_path))
+
+    first = cache.load(con, ["momentum_12m"], passthrough=["volume"])
+    assert "recomputing 6/6" in capsys.readouterr().out
+
+    cache.load(con, ["momentum_12m"], passthrough=["volume"])
+    assert "recomputing" not in capsys.readouterr().out
+
+    load_silver(con, prices)  # new bars in 2022 only
+    full = cache.load(con, ["momentum_12m"], passthrough=["volume"])
+    assert "recomputing 2/6" in capsys.readouterr().out
+    assert full.num_rows == len(prices)
+    pd.testing.assert_frame_equal(
+        full.slice(0, first.num_rows // 2).to_pandas(),
+        first.slice(0, first.num_rows // 2).to_pandas(),
+    )
+
+    part = cache.load(con, ["momentum_12m"], passthrough=["volume"], columns=["momentum_12m"],
+                      start="2022-01-01", tickers=["B.HK"])
+    assert part.column_names == ["ticker", "date", "momentum_12m"]
+    assert set(part.column("ticker").to_pylist()) == {"B.HK"}
+    assert min(part.column("date").to_pylist()).isoformat() >= "2022-01-01"
+
+
+def test_lru_eviction_keeps_current_definition(con, tmp_path):
+    load_silver(con, make_prices(["AAA"], periods=300))
+    fx.register(fx.Feature("t_double", lambda panel, x: 2 * x, inputs=("adj_close",)))
+    try:
+        cache = FeatureCache(str(tmp_path), max_bytes=1)
+        cache.load(con, ["momentum_12m"])
+        cache.load(con, ["t_double"])
+        assert list(cache._read_manifest()) == [definition_hash(["t_double"])]
+    finally:
+        del fx.REGISTRY["t_double"]
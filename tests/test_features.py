@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import features as fx
+from src.panel import Panel
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    saved = dict(fx.REGISTRY)
+    yield
+    fx.REGISTRY.clear()
+    fx.REGISTRY.update(saved)
+
+
+def test_shared_intermediates_are_computed_once():
+    calls = []
+
+    @fx.feature("t_ret", inputs=("adj_close",), lookback=1, intermediate=True)
+    def t_ret(panel, adj_close):
+        calls.append("t_ret")
+        return panel.pct_change(adj_close, 1)
+
+    vol = fx.rolling_std("t_ret", 5)
+
+    @fx.feature("t_sharpe", deps=("t_ret", vol), lookback=0)
+    def t_sharpe(panel, ret, std):
+        return ret / std
+
+    @fx.feature("t_vol_x2", deps=(vol,))
+    def t_vol_x2(panel, std):
+        return std * 2
+
+    tickers = np.repeat([0, 1], [20, 10])
+    px = np.linspace(10, 20, 30)
+    out = fx.compute(Panel(tickers), {"adj_close": px}, ["t_sharpe", "t_vol_x2"])
+
+    assert calls == ["t_ret"]
+    expected = pd.Series(px).groupby(tickers).pct_change().groupby(tickers).rolling(5).std().to_numpy()
+    np.testing.assert_allclose(out["t_vol_x2"], 2 * expected)
+    assert fx.required_history(["t_sharpe"]) == (5, 0)
+    assert fx.required_inputs(["t_sharpe", "t_vol_x2"]) == ["adj_close"]
+
+
+def test_registry_metadata_for_gold():
+    assert fx.required_history(["momentum_12m"]) == (252, 0)
+
+
+def test_cycles_are_rejected():
+    fx.register(fx.Feature("t_a", lambda p, b: b, deps=("t_b",)))
+    fx.register(fx.Feature("t_b", lambda p, a: a, deps=("t_a",)))
+    with pytest.raises(ValueError, match="cycle"):
+        fx.resolve(["t_a"])
+
+
+def test_technical_kernels_match_pandas_rolling():
+    rng = np.random.default_rng(3)
+    tickers = np.repeat([0, 1], [400, 300])
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, 700)))
+    high, low = close * (1 + rng.uniform(0, 0.02, 700)), close * (1 - rng.uniform(0, 0.02, 700))
+    volume = rng.integers(1_000, 5_000, 700).astype(float)
+    names = ["rsi_14", "realized_vol_21", "ma_cross_50_200", "atr_pct_14", "volume_z_21", "dist_52w_high"]
+    out = fx.compute(Panel(tickers), {"adj_close": close, "close": close, "high": high, "low": low,
+                                      "volume": volume}, names)
+
+    df = pd.DataFrame({"t": tickers, "c": close, "h": high, "l": low, "v": volume})
+    g = df.groupby("t")
+    roll = lambda s, n: s.groupby(tickers).rolling(n)
+    diff = g["c"].diff()
+    gain, loss = roll(diff.clip(lower=0), 14).mean(), roll((-diff).clip(lower=0), 14).mean()
+    prev = g["c"].shift(1)
+    tr = pd.concat([df["h"] - df["l"], (df["h"] - prev).abs(), (df["l"] - prev).abs()], axis=1).max(axis=1)
+    tr[prev.isna()] = np.nan  # no true range without a previous close
+    expected = {
+        "rsi_14": 100 * gain / (gain + loss),
+        "realized_vol_21": roll(np.log(df["c"] / prev), 21).std() * np.sqrt(252),
+        "ma_cross_50_200": roll(df["c"], 50).mean().to_numpy() / roll(df["c"], 200).mean().to_numpy() - 1,
+        "atr_pct_14": roll(tr, 14).mean().to_numpy() / close,
+        "volume_z_21": (volume - roll(df["v"], 21).mean().to_numpy()) / roll(df["v"], 21).std().to_numpy(),
+        "dist_52w_high": close / roll(df["c"], 252).max().to_numpy() - 1,
+    }
+    for name in names:
+        np.testing.assert_allclose(out[name], np.asarray(expected[name], dtype=float), rtol=1e-7, err_msg=name)
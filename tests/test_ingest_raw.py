@@ -0,0 +1,114 @@
+import duckdb
+import pandas as pd
+import pytest
+
+from etl import bronze_transform
+from etl.ingest_raw import CachedSource, FixtureSource, fetch_with_retry, run
+from src.pipeline import Pipeline, Stage
+
+
+def write_fixture(root, ticker, start, periods, adj_close=10.4):
+    dates = pd.bdate_range(start, periods=periods)
+    pd.DataFrame({
+        "Date": dates,
+        "Open": 10.0, "High": 11.0, "Low": 9.0, "Close": 10.5,
+        "Adj Close": adj_close, "Volume": 1000,
+    }).to_csv(root / f"{ticker}.csv", index=False)
+
+
+class CountingSource:
+    def __init__(self, source):
+        self.source = source
+        self.calls = []
+
+    def fetch(self, ticker, start, end):
+        self.calls.append((ticker, start, end))
+        return self.source.fetch(ticker, start, end)
+
+
+def count_dupes(con):
+    return con.execute("""
+        SELECT COUNT(*) FROM (
+            SELECT ticker, date FROM raw.prices GROUP BY ALL HAVING COUNT(*) > 1
+        )
+    """).fetchone()[0]
+
+
+def test_incremental_ingest_fetches_the_missing_range_and_a_trailing_window(tmp_path):
+    write_fixture(tmp_path, "AAA", "2024-01-01", 20)
+    write_fixture(tmp_path, "BBB", "2024-01-01", 5)
+    con = duckdb.connect()
+
+    source = CountingSource(FixtureSource(str(tmp_path)))
+    assert run(con, tickers=["AAA", "BBB"], start="2024-01-01", end="2024-01-20", source=source) == 20
+
+    # AAA's last bar is 2024-01-19: the rerun asks for everything from REFETCH_DAYS before it
+    source.calls.clear()
+    upserted = run(con, tickers=["AAA", "BBB"], start="2024-01-01", end="2024-01-27", source=source)
+
+    assert [c[1] for c in source.calls if c[0] == "AAA"] == ["2024-01-09"]
+    assert upserted == 14 + 5  # AAA 2024-01-09…2024-01-26, BBB's window reaches back to the start
+    assert con.execute("SELECT COUNT(*) FROM raw.prices").fetchone()[0] == 20 + 5
+    assert count_dupes(con) == 0
+
+
+def test_revised_adj_close_refetches_the_whole_ticker(tmp_path):
+    write_fixture(tmp_path, "AAA", "2024-01-01", 20)
+    write_fixture(tmp_path, "BBB", "2024-01-01", 20)
+    con = duckdb.connect()
+    source = CountingSource(FixtureSource(str(tmp_path)))
+    run(con, tickers=["AAA", "BBB"], start="2024-01-01", end="2024-01-20", source=source)
+
+    write_fixture(tmp_path, "AAA", "2024-01-01", 20, adj_close=5.2)  # a split re-adjusts the history
+    source.calls.clear()
+    run(con, tickers=["AAA", "BBB"], start="2024-01-01", end="2024-01-27", source=source)
+
+    assert sorted(c[1] for c in source.calls if c[0] == "AAA") == ["2024-01-01", "2024-01-09"]
+    assert [c[1] for c in source.calls if c[0] == "BBB"] == ["2024-01-09"]
+    assert con.execute("""
+        SELECT ticker, COUNT(*), MIN(adj_close), MAX(adj_close) FROM raw.prices GROUP BY ticker ORDER BY ticker
+    """).fetchall() == [("AAA", 20, 5.2, 5.2), ("BBB", 20, 10.4, 10.4)]
+    assert count_dupes(con) == 0
+
+
+def test_full_reload_of_the_same_size_reruns_bronze(tmp_path):
+    write_fixture(tmp_path, "AAA", "2024-01-01", 10)
+    con = duckdb.connect()
+    source = FixtureSource(str(tmp_path))
+    pipeline = Pipeline([Stage("bronze", bronze_transform.run, inputs=("raw.prices",), outputs=("bronze.prices",))])
+    run(con, tickers=["AAA"], start="2024-01-01", end="2024-01-20", source=source)
+    assert pipeline.run(con) == {"bronze": "ran"}
+    assert pipeline.run(con) == {"bronze": "skipped"}
+
+    write_fixture(tmp_path, "AAA", "2024-01-01", 10, adj_close=5.2)  # split-adjusted
+    run(con, tickers=["AAA"], start="2024-01-01", end="2024-01-20", full=True, source=source)
+    assert pipeline.run(con) == {"bronze": "ran"}
+    assert con.execute("SELECT DISTINCT adj_close FROM bronze.prices").fetchall() == [(5.2,)]
+
+
+def test_cache_serves_repeat_requests(tmp_path):
+    write_fixture(tmp_path, "AAA", "2024-01-01", 10)
+    inner = CountingSource(FixtureSource(str(tmp_path)))
+    cached = CachedSource(inner, cache_dir=str(tmp_path / "cache"))
+
+    first = cached.fetch("AAA", "2024-01-01", "2024-01-10")
+    second = cached.fetch("AAA", "2024-01-01", "2024-01-10")
+
+    assert len(inner.calls) == 1
+    pd.testing.assert_frame_equal(first.reset_index(drop=True), second)
+
+
+def test_fetch_with_retry_recovers_and_gives_up():
+    class Flaky:
+        def __init__(self, failures):
+            self.failures = failures
+
+        def fetch(self, ticker, start, end):
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("rate limited")
+            return "ok"
+
+    assert fetch_with_retry(Flaky(2), "AAA", "a", "b", retries=3, backoff=0) == "ok"
+    with pytest.raises(ConnectionError):
+        fetch_with_retry(Flaky(3), "AAA", "a", "b", retries=3, backoff=0)
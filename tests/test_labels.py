@@ -0,0 +1,33 @@
+import duckdb
+import numpy as np
+import pandas as pd
+
+from etl import generate_gold
+from etl.ingest_raw import bulk_insert, create_raw_table
+from tests.test_incremental import make_prices, run_pipeline
+
+
+def test_label_grid_uses_mapped_benchmarks():
+    prices = make_prices(["SPY", "XLK", "AAA", "BBB"], periods=400)
+    con = duckdb.connect()
+    create_raw_table(con)
+    bulk_insert(con, [prices])
+    con.execute("CREATE SCHEMA IF NOT EXISTS silver")
+    generate_gold.benchmarks(con)
+    con.execute("INSERT INTO silver.benchmarks VALUES ('AAA', 'XLK')")
+    run_pipeline(con)
+
+    px = prices.pivot(index="date", columns="ticker", values="adj_close")
+    labels = con.execute("SELECT * FROM gold.labels ORDER BY ticker, date").fetchdf()
+    for tkr, bench in [("AAA", "XLK"), ("BBB", "SPY")]:
+        got = labels[labels["ticker"] == tkr].set_index("date")
+        assert (got["benchmark"] == bench).all()
+        for h, n in generate_gold.HORIZONS.items():
+            fwd = px[tkr].shift(-n) / px[tkr] - 1
+            excess = fwd - (px[bench].shift(-n) / px[bench] - 1)
+            np.testing.assert_allclose(got[f"fwd_ret_{h}"], fwd.to_numpy())
+            np.testing.assert_allclose(got[f"excess_bench_{h}"], excess.to_numpy())
+            np.testing.assert_allclose(got[f"excess_spy_{h}"], fwd - (px["SPY"].shift(-n) / px["SPY"] - 1))
+            np.testing.assert_array_equal(got[f"hit_bench_{h}_2pct"], (excess >= 0.02).astype(int))
+        # the original labels are the 12-month SPY members of the grid
+        pd.testing.assert_series_equal(got["excess_return_12m"], got["excess_spy_12m"], check_names=False)
@@ -0,0 +1,56 @@
+import contextlib
+import io
+import os
+
+import duckdb
+import lightgbm as lgb
+import numpy as np
+import pytest
+
+from etl import bronze_transform, generate_gold, silver_transform
+from etl.train_lightgbm import DATASET_PARAMS
+from src import lgb_dataset, synthetic
+from src.feature_cache import FeatureCache
+from src.training_data import load_training_data
+
+
+@pytest.fixture(scope="module")
+def con():
+    con = duckdb.connect()
+    synthetic.write_raw_prices(con, 10, 900, seed=3)
+    with contextlib.redirect_stdout(io.StringIO()):
+        bronze_transform.run(con)
+        silver_transform.run(con)
+        con.execute("CREATE SCHEMA IF NOT EXISTS gold")
+        generate_gold.run(con)
+    return con
+
+
+def load(con, tmp_path, **kw):
+    return load_training_data(con, generate_gold.FEATURES, passthrough=generate_gold.PASSTHROUGH,
+                              exclude=[generate_gold.BENCHMARK_TKR],
+                              cache=FeatureCache(str(tmp_path / "features")), **kw)
+
+
+def test_streamed_matrix_matches_in_memory_load(con, tmp_path):
+    memory = load(con, tmp_path)
+    streamed = load(con, tmp_path, npy_cache=str(tmp_path / "npy"), stream=True)
+    assert streamed.path and len(memory.X) > 1000
+    for name in ("X", "y", "tickers", "dates"):
+        np.testing.assert_array_equal(getattr(streamed, name), getattr(memory, name))
+    np.testing.assert_array_equal(np.concatenate([b for _, b in streamed.blocks(333)]), memory.X)
+
+
+def test_binary_dataset_bins_like_an_in_memory_dataset(con, tmp_path):
+    data = load(con, tmp_path, npy_cache=str(tmp_path / "npy"), stream=True)
+    path = lgb_dataset.build(data.path, data.feature_names, DATASET_PARAMS, batch_rows=1000)
+    mtime = os.path.getmtime(path)
+    assert lgb_dataset.build(data.path, data.feature_names, DATASET_PARAMS) == path  # reused
+    assert os.path.getmtime(path) == mtime
+
+    X, y = np.asarray(data.X), np.asarray(data.y)
+    params = {"objective": "regression", "verbosity": -1, "num_threads": 1, "min_data_in_leaf": 5}
+    from_file = lgb.train(params, lgb_dataset.load(path, DATASET_PARAMS).subset(np.arange(2000)).construct(), 10)
+    in_memory = lgb.train(params, lgb.Dataset(X, label=y, params=DATASET_PARAMS, free_raw_data=False)
+                          .construct().subset(np.arange(2000)).construct(), 10)
+    np.testing.assert_allclose(from_file.predict(X), in_memory.predict(X))
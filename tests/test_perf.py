@@ -0,0 +1,53 @@
+import json
+
+import duckdb
+import pytest
+
+from src import perf
+
+
+@perf.instrument("demo")
+def demo(con, fail: bool = False):
+    con.execute("CREATE OR REPLACE TABLE t AS SELECT range AS x FROM range(1000)")
+    with perf.current().profile(con, "sum"):
+        total = con.execute("SELECT SUM(x) FROM t").fetchone()[0]
+    perf.current().rows(rows_in=1000, rows_out=1)
+    if fail:
+        raise RuntimeError("boom")
+    return total
+
+
+def runs(con):
+    return con.execute(
+        "SELECT stage, status, rows_in, rows_out, profile FROM ops.stage_runs ORDER BY started_at"
+    ).fetchall()
+
+
+def test_disabled_records_nothing(monkeypatch):
+    monkeypatch.delenv(perf.ENV_VAR, raising=False)
+    con = duckdb.connect()
+    assert demo(con) == 499500
+    assert con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = 'stage_runs'"
+    ).fetchone()[0] == 0
+
+
+def test_records_runs_profiles_and_failures(monkeypatch):
+    monkeypatch.setenv(perf.ENV_VAR, "sql")
+    con = duckdb.connect()
+    demo(con)
+    with pytest.raises(RuntimeError):
+        demo(con, fail=True)
+
+    (stage, status, rows_in, rows_out, profile), failed = runs(con)
+    assert (stage, status, rows_in, rows_out) == ("demo", "ok", 1000, 1)
+    [query] = json.loads(profile)
+    assert query["label"] == "sum" and "SUM(x)" in query["query"]
+    assert failed[1] == "failed"
+
+
+def test_plain_mode_skips_profiles(monkeypatch):
+    monkeypatch.setenv(perf.ENV_VAR, "1")
+    con = duckdb.connect()
+    demo(con)
+    assert runs(con) == [("demo", "ok", 1000, 1, None)]
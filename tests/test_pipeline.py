@@ -0,0 +1,91 @@
+import threading
+
+import duckdb
+import pytest
+
+from src import incremental
+from src.pipeline import Pipeline, Stage, table_version
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    con.execute("CREATE SCHEMA src")
+    con.execute("CREATE TABLE src.t AS SELECT range AS x FROM range(10)")
+    return con
+
+
+calls = []
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+
+def copy(dst):
+    def fn(con):
+        calls.append(dst)
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {dst.split('.')[0]}")
+        con.execute(f"CREATE OR REPLACE TABLE {dst} AS SELECT * FROM src.t")
+    return fn
+
+
+def test_skips_unchanged_stages_and_reruns_downstream_of_a_change(con):
+    pipeline = Pipeline([
+        Stage("a", copy("a.t"), inputs=("src.t",), outputs=("a.t",)),
+        Stage("b", copy("b.t"), inputs=("a.t",), outputs=("b.t",), config={"k": 1}),
+    ])
+    assert pipeline.run(con) == {"a": "ran", "b": "ran"}
+    assert pipeline.run(con) == {"a": "skipped", "b": "skipped"}
+
+    con.execute("INSERT INTO src.t VALUES (99)")
+    assert pipeline.run(con) == {"a": "ran", "b": "ran"}  # b sees the new a.t
+    assert calls == ["a.t", "b.t", "a.t", "b.t"]
+
+    con.execute("DROP TABLE b.t")  # a missing output forces a rerun
+    assert pipeline.run(con) == {"a": "skipped", "b": "ran"}
+
+
+def test_table_version_counts_rows_and_recorded_writes(con):
+    pipeline = Pipeline([Stage("a", copy("a.t"), inputs=("src.t",), outputs=("a.t",))])
+    pipeline.run(con)
+    version = table_version(con, "src.t")
+    assert version == "10|0"
+
+    con.execute("UPDATE src.t SET x = x + 1")  # an in-place rewrite is only seen once recorded
+    assert table_version(con, "src.t") == version
+    incremental.bump(con, "src.t")
+    assert table_version(con, "src.t") == "10|1"
+    assert pipeline.run(con) == {"a": "ran"}
+
+
+def test_independent_stages_run_concurrently_and_failures_block_dependents(con):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def side(dst):
+        def fn(con):
+            barrier.wait()  # only returns once both stages are running
+            copy(dst)(con)
+        return fn
+
+    def boom(con):
+        raise ValueError("boom")
+
+    pipeline = Pipeline([
+        Stage("left", side("l.t"), inputs=("src.t",), outputs=("l.t",)),
+        Stage("right", side("r.t"), inputs=("src.t",), outputs=("r.t",)),
+        Stage("bad", boom, inputs=("l.t", "r.t"), outputs=("x.t",)),
+        Stage("after_bad", copy("y.t"), inputs=("x.t",), outputs=("y.t",)),
+    ])
+    status = pipeline.run(con, max_workers=2)
+    assert status == {"left": "ran", "right": "ran", "bad": "failed", "after_bad": "blocked"}
+    assert con.execute("SELECT COUNT(*) FROM meta.stage_fingerprints WHERE stage = 'bad'").fetchone()[0] == 0
+
+
+def test_rejects_cycles():
+    with pytest.raises(ValueError, match="cycle"):
+        Pipeline([
+            Stage("a", copy("a.t"), inputs=("b.t",), outputs=("a.t",)),
+            Stage("b", copy("b.t"), inputs=("a.t",), outputs=("b.t",)),
+        ])
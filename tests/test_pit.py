@@ -0,0 +1,52 @@
+import duckdb
+import numpy as np
+import pandas as pd
+
+from etl import bronze_transform, generate_gold, silver_transform
+from etl.ingest_raw import bulk_insert, create_raw_table
+from tests.test_incremental import make_prices, run_pipeline
+
+
+def test_valid_to_is_next_date_after_incremental_and_backfill():
+    prices = make_prices(["SPY", "AAA"], periods=300)
+    con = duckdb.connect()
+    create_raw_table(con)
+    bulk_insert(con, [prices[prices["date"] < "2020-09-01"]])
+    run_pipeline(con)
+    bulk_insert(con, [prices[prices["date"] >= "2020-09-01"]])
+    run_pipeline(con)
+
+    silver = con.execute("SELECT ticker, date, valid_to FROM silver.prices ORDER BY ticker, date").fetchdf()
+    expected = silver.groupby("ticker")["date"].shift(-1)
+    pd.testing.assert_series_equal(silver["valid_to"], expected, check_names=False)
+
+    # tables written before valid_to was filled get it in one pass on the next run
+    con.execute("UPDATE silver.prices SET valid_to = NULL")
+    silver_transform.run(con)
+    filled = con.execute("SELECT valid_to FROM silver.prices ORDER BY ticker, date").fetchdf()["valid_to"]
+    pd.testing.assert_series_equal(filled, expected, check_names=False)
+
+
+def test_benchmark_is_joined_as_of_on_other_calendars():
+    prices = make_prices(["SPY", "AAA", "600519.SS"], periods=400)
+    days = prices["date"].drop_duplicates().sort_values()
+    us_holidays, cn_holidays = days.iloc[5::20], days.iloc[11::20]
+    prices = prices[~(((prices["ticker"] != "600519.SS") & prices["date"].isin(us_holidays))
+                      | ((prices["ticker"] == "600519.SS") & prices["date"].isin(cn_holidays)))]
+
+    con = duckdb.connect()
+    create_raw_table(con)
+    bulk_insert(con, [prices])
+    bronze_transform.run(con)
+    silver_transform.run(con)
+    generate_gold.run(con)
+
+    spy = con.execute("SELECT date, spy_fwd_ret FROM gold.labels WHERE ticker = 'AAA'").fetchdf()
+    spy = spy.set_index("date").sort_index()["spy_fwd_ret"].dropna()
+    cn = con.execute(
+        "SELECT date, spy_fwd_ret FROM gold.labels WHERE ticker = '600519.SS' AND date <= ? ORDER BY date",
+        [spy.index[-1]],
+    ).fetchdf().set_index("date")["spy_fwd_ret"]
+
+    assert cn.notna().all()  # an exact-date join leaves a NULL on every US holiday
+    np.testing.assert_allclose(cn, spy.reindex(cn.index, method="ffill"))
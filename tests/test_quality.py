@@ -0,0 +1,93 @@
+import duckdb
+
+from src import quality
+from src.quality import Suite, between, max_gap, not_null, ohlc_consistent, unique
+
+COLUMNS = [("date", "DATE"), ("ticker", "VARCHAR"), ("open", "DOUBLE"), ("high", "DOUBLE"),
+           ("low", "DOUBLE"), ("close", "DOUBLE"), ("volume", "BIGINT")]
+SUITE = Suite("bronze.prices", COLUMNS, [
+    unique("ticker", "date"),
+    *not_null("ticker", "close"),
+    between("volume", lo=0, strict=True),
+    ohlc_consistent(),
+    max_gap(5),
+])
+
+
+def make_table(con):
+    con.execute("CREATE SCHEMA IF NOT EXISTS bronze")
+    con.execute(f"CREATE TABLE bronze.prices ({', '.join(f'{c} {t}' for c, t in COLUMNS)})")
+
+
+def add(con, rows):
+    con.executemany("INSERT INTO bronze.prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def bar(date, ticker="AAA", close=10.0, volume=100):
+    return (date, ticker, close, close + 1, close - 1, close, volume)
+
+
+def failures(rows):
+    return {r[3]: r[5] for r in rows if not r[6]}
+
+
+def test_only_new_partitions_are_checked():
+    con = duckdb.connect()
+    make_table(con)
+    add(con, [bar(f"2024-01-0{d}") for d in range(1, 6)] + [bar("2024-01-02", "BBB")])
+    rows = quality.validate(con, "bronze", SUITE)
+    assert failures(rows) == {} and rows[-1][4] == 6
+
+    assert quality.validate(con, "bronze", SUITE)[-1][4] == 0
+
+    # new BBB bars are checked from the watermark on, and the gap from the
+    # last validated bar is measured across the boundary
+    add(con, [bar("2024-01-09", "BBB")])
+    rows = quality.validate(con, "bronze", SUITE)
+    assert rows[-1][4] == 1
+    assert failures(rows) == {"max_gap(5d)": 1}
+
+    # a bar backfilled behind AAA's watermark changes its row count: all of AAA is checked again
+    add(con, [bar("2024-01-03", volume=0), bar("2024-01-06")])
+    rows = quality.validate(con, "bronze", SUITE)
+    assert rows[-1][4] == 7
+    assert failures(rows) == {"between(volume, 0, None, strict)": 1, "unique(ticker, date)": 1}
+
+    # each failure is recorded once; the watermarks moved past them
+    rows = quality.validate(con, "bronze", SUITE)
+    assert failures(rows) == {} and rows[-1][4] == 0
+    assert failures(quality.validate(con, "bronze", SUITE, full=True)) == {
+        "max_gap(5d)": 1, "between(volume, 0, None, strict)": 1, "unique(ticker, date)": 1,
+    }
+    assert con.execute(f"SELECT COUNT(*) FROM {quality.RESULTS_TABLE} WHERE NOT success").fetchone()[0] == 6
+
+
+def test_a_failing_night_does_not_pin_the_watermark():
+    con = duckdb.connect()
+    make_table(con)
+    add(con, [bar("2024-01-01"), bar("2024-01-01", "BBB")])
+    quality.validate(con, "bronze", SUITE)
+
+    add(con, [bar("2024-01-02", volume=0), bar("2024-01-02", "BBB")])  # a bad AAA bar, never fixed
+    assert failures(quality.validate(con, "bronze", SUITE)) == {"between(volume, 0, None, strict)": 1}
+
+    add(con, [bar("2024-01-03"), bar("2024-01-03", "BBB")])
+    rows = quality.validate(con, "bronze", SUITE)
+    assert failures(rows) == {} and rows[-1][4] == 2  # only the clean night's bars
+    assert dict(con.execute(f"SELECT ticker, last_date::VARCHAR FROM {quality.WATERMARKS_TABLE}").fetchall()) == {
+        "AAA": "2024-01-03", "BBB": "2024-01-03",
+    }
+
+
+def test_detects_dupes_nulls_ohlc_and_schema():
+    con = duckdb.connect()
+    make_table(con)
+    add(con, [bar("2024-01-01"), bar("2024-01-01"), bar("2024-01-02", None),
+              ("2024-01-03", "AAA", 10.0, 9.0, 8.0, 10.0, 5)])  # high below open
+    assert failures(quality.validate(con, "bronze", SUITE)) == {
+        "unique(ticker, date)": 1, "not_null(ticker)": 1, "ohlc_consistent": 1,
+    }
+
+    con.execute("ALTER TABLE bronze.prices ADD COLUMN extra INTEGER")
+    schema = {r[3]: r for r in quality.validate(con, "bronze", SUITE)}["schema"]
+    assert not schema[6] and "extra" in schema[7]
@@ -1,7 +1,12 @@
+import os
+import shutil
+
 import duckdb
-import pandas as pd
 import pytest
 
+from etl import validate
+from src import quality, synthetic
+
 # === CONFIG ===
 DB_PATH = "data/punta.duckdb"
 MIN_ROWS = 500
@@ -10,18 +15,39 @@ EXPECTED_COLUMNS = [
     "close", "adj_close", "volume", "ticker"
 ]
 
-def test_raw_prices_quality():
-    # 1) Load data via DuckDB into a pandas DataFrame
-    con = duckdb.connect(DB_PATH)
-    df = con.execute("SELECT * FROM raw.prices").df()
 
-    # 2a) Row count >= MIN_ROWS
-    assert len(df) >= MIN_ROWS, f"Only {len(df)} rows; expected ≥ {MIN_ROWS}"
+def check_raw_prices(con):
+    (suite,) = validate.SUITES["raw"]
+    results = {r[3]: r for r in quality.validate(con, "raw", suite, full=True)}
 
-    # 2b) No nulls in 'ticker'
-    nulls = df['ticker'].isna().sum()
+    # 1) Row count >= MIN_ROWS
+    assert validate.MIN_ROWS == MIN_ROWS
+    n = con.execute("SELECT COUNT(*) FROM raw.prices").fetchone()[0]
+    assert n >= MIN_ROWS, f"Only {n} rows; expected ≥ {MIN_ROWS}"
+    assert results[f"min_rows({MIN_ROWS})"][6]
+
+    # 2) No nulls in 'ticker'
+    nulls = results["not_null(ticker)"][5]
     assert nulls == 0, f"Found {nulls} null(s) in 'ticker'"
 
-    # 2c) Exact columns
-    cols = list(df.columns)
+    # 3) Exact columns
+    cols = [c for c, _ in suite.columns]
     assert cols == EXPECTED_COLUMNS, f"Columns {cols} ≠ expected {EXPECTED_COLUMNS}"
+    assert results["schema"][6], results["schema"][7]
+
+
+def test_raw_prices_quality_synthetic():
+    con = duckdb.connect()
+    synthetic.write_raw_prices(con, 5, 300, seed=0)
+    check_raw_prices(con)
+
+
+@pytest.mark.skipif(not os.path.exists(DB_PATH), reason=f"{DB_PATH} not built")
+def test_raw_prices_quality(tmp_path):
+    # validate() records watermarks and results: check a copy, not the warehouse
+    path = tmp_path / os.path.basename(DB_PATH)
+    shutil.copy(DB_PATH, path)
+    if os.path.exists(f"{DB_PATH}.wal"):
+        shutil.copy(f"{DB_PATH}.wal", f"{path}.wal")
+    con = duckdb.connect(str(path))
+    check_raw_prices(con)
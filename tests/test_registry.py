@@ -0,0 +1,53 @@
+import lightgbm as lgb
+import numpy as np
+import pytest
+from sklearn.linear_model import ElasticNet
+
+from src import registry
+from src.models import load_model, model_version, predict
+from src.training_data import TrainingData
+
+
+@pytest.fixture
+def data(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 3)).astype(np.float32)
+    y = X[:, 0] - 0.5 * X[:, 1] + 0.1 * rng.normal(size=400)
+    return TrainingData(X, y, None, None, ["a", "b", "c"], path=str(tmp_path / "cache" / "abc123"))
+
+
+def test_native_artifacts_predict_like_the_fitted_models(data, tmp_path):
+    root = str(tmp_path / "registry")
+    enet = ElasticNet(alpha=0.01).fit(data.X, data.y)
+    booster = lgb.train({"objective": "regression", "verbosity": -1}, lgb.Dataset(data.X, data.y), 10)
+
+    for name, model in [("elasticnet", enet), ("lightgbm", booster)]:
+        version = registry.save(name, model, data, params={"p": 1}, metrics={"rmse": 0.1}, root=root)
+        path = registry.current_path(name, root)
+        assert model_version(name, path) == version
+        loaded = load_model(path)
+        assert load_model(path) is loaded  # cached in-process
+        np.testing.assert_allclose(predict(loaded, data.X), model.predict(data.X), atol=1e-6)  # sklearn predicts float32 X in float32
+
+        info = registry.meta(path)
+        assert info["features"] == ["a", "b", "c"] and info["rows"] == 400
+        assert info["data_fingerprint"] == "abc123"
+
+    assert isinstance(load_model(registry.current_path("elasticnet", root)).coef_, np.memmap)
+
+
+def test_versions_are_kept_compared_and_pruned(data, tmp_path):
+    root = str(tmp_path / "registry")
+    saved = []
+    for alpha in (0.01, 0.02, 0.03, 0.04):
+        saved.append(registry.save("elasticnet", ElasticNet(alpha=alpha).fit(data.X, data.y), data,
+                                   params={"alpha": alpha}, root=root))
+    assert registry.save("elasticnet", ElasticNet(alpha=0.04).fit(data.X, data.y), data, root=root) == saved[-1]
+
+    registry.set_current("elasticnet", saved[0], root)
+    table = registry.compare("elasticnet", root)
+    assert len(table) == 4 and table.loc[table["current"], "version"].tolist() == [saved[0]]
+    assert sorted(table["param_alpha"]) == [0.01, 0.02, 0.03, 0.04]
+
+    assert registry.prune("elasticnet", keep=1, root=root) == saved[1:3]
+    assert [m["version"] for m in registry.versions("elasticnet", root)] == [saved[0], saved[3]]
@@ -0,0 +1,101 @@
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from etl import score
+from src import registry
+
+
+@pytest.fixture
+def con(tmp_path, monkeypatch):
+    con = duckdb.connect()
+    con.execute("CREATE SCHEMA gold")
+    cols = ", ".join(f"{c} DOUBLE" for c in score.COLUMNS)
+    con.execute(f"CREATE TABLE gold.features (ticker VARCHAR, date DATE, {cols})")
+
+    rng = np.random.default_rng(0)
+    model = LinearRegression().fit(rng.normal(size=(50, len(score.COLUMNS))), rng.normal(size=50))
+    registry.save("elasticnet", model, root=str(tmp_path))
+    monkeypatch.setattr(score, "MODEL_PATHS", {"elasticnet": registry.current_path("elasticnet", str(tmp_path))})
+    return con
+
+
+def add_features(con, dates, tickers=("AAA", "BBB", "SPY")):
+    rows = pd.DataFrame([(t, d) for d in pd.to_datetime(dates) for t in tickers], columns=["ticker", "date"])
+    for c in score.COLUMNS:
+        rows[c] = 1.0
+    con.register("rows", rows)
+    con.execute("INSERT INTO gold.features SELECT * FROM rows")
+    con.unregister("rows")
+
+
+def test_scores_only_new_rows(con):
+    add_features(con, ["2024-01-02", "2024-01-03"])
+    assert score.run(con) == {"elasticnet": 4}  # SPY is not scored
+    assert score.run(con) == {"elasticnet": 0}
+
+    add_features(con, ["2024-01-04"])
+    assert score.run(con) == {"elasticnet": 2}
+    runs = con.execute("SELECT rows FROM ops.score_runs ORDER BY started_at").fetchall()
+    assert [r[0] for r in runs] == [4, 0, 2]
+
+
+def test_sector_etfs_are_not_scored(con):
+    add_features(con, ["2024-01-02", "2024-01-03"], tickers=("AAA", "BBB", "SPY", "XLK"))
+    assert score.run(con) == {"elasticnet": 6}  # XLK is not a benchmark yet
+
+    con.execute("INSERT INTO silver.benchmarks VALUES ('AAA', 'XLK')")  # score.run created the map
+    assert score.run(con) == {"elasticnet": 0}
+    scored = {t for (t,) in con.execute("SELECT DISTINCT ticker FROM gold.scores").fetchall()}
+    assert scored == {"AAA", "BBB"}  # the same tickers grade.run grades
+
+
+def test_new_model_version_rescores_history(con, tmp_path):
+    add_features(con, ["2024-01-02", "2024-01-03"])
+    score.run(con)
+    registry.save("elasticnet", LinearRegression().fit(np.eye(len(score.COLUMNS)), np.ones(len(score.COLUMNS))),
+                  root=str(tmp_path))
+
+    assert score.run(con) == {"elasticnet": 4}
+    versions = con.execute("SELECT DISTINCT model_version FROM gold.scores").fetchall()
+    assert len(versions) == 1
+
+
+def test_changed_feature_rows_are_rescored(tmp_path, monkeypatch):
+    from etl.ingest_raw import bulk_insert, create_raw_table
+    from tests.test_incremental import make_prices, run_pipeline
+
+    rng = np.random.default_rng(0)
+    model = LinearRegression().fit(rng.normal(size=(50, len(score.COLUMNS))), rng.normal(size=50))
+    registry.save("elasticnet", model, root=str(tmp_path))
+    monkeypatch.setattr(score, "MODEL_PATHS", {"elasticnet": registry.current_path("elasticnet", str(tmp_path))})
+
+    prices = make_prices(["SPY", "AAA", "BBB"], periods=700)
+    last = sorted(prices["date"].unique())[-5:]
+    con = duckdb.connect()
+    create_raw_table(con)
+    bulk_insert(con, [prices[~prices["date"].isin(last)]])
+    run_pipeline(con)
+    score.run(con)
+
+    # new bars rewrite the lookahead margin of gold, but its features are unchanged
+    bulk_insert(con, [prices[prices["date"].isin(last)]])
+    run_pipeline(con)
+    assert score.run(con) == {"elasticnet": 10}
+
+    # a dropped AAA bar shifts AAA's later windows: those rows (and only AAA's) are rescored
+    gone = sorted(prices["date"].unique())[400]
+    con.execute("DELETE FROM raw.prices WHERE ticker = 'AAA' AND date = ?", [gone])
+    run_pipeline(con)
+    rescored = con.execute("SELECT COUNT(*) FROM gold.scores").fetchone()[0]
+    assert 0 < score.run(con)["elasticnet"] < rescored
+    assert con.execute("SELECT COUNT(*) FROM gold.scores WHERE ticker = 'AAA' AND date = ?", [gone]).fetchone()[0] == 0
+
+    incremental = con.execute("SELECT ticker, date, score FROM gold.scores ORDER BY ticker, date").fetchdf()
+    con.execute("DELETE FROM gold.scores")
+    score.run(con)
+    pd.testing.assert_frame_equal(
+        incremental, con.execute("SELECT ticker, date, score FROM gold.scores ORDER BY ticker, date").fetchdf()
+    )
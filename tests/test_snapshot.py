@@ -0,0 +1,81 @@
+import contextlib
+import io
+import os
+
+import duckdb
+import numpy as np
+import pytest
+
+from etl import generate_gold
+from etl.ingest_raw import bulk_insert, create_raw_table
+from src import snapshot
+from src.feature_cache import FeatureCache
+from src.training_data import load_training_data
+from tests.test_incremental import make_prices, run_pipeline
+
+TABLES = ("meta.universe", "silver.prices", "gold.features", "gold.labels", "gold.grades")
+
+
+@pytest.fixture
+def prices():
+    return make_prices(["SPY", "AAA", "BBB"], periods=700)
+
+
+@pytest.fixture
+def con(prices):
+    con = duckdb.connect()
+    create_raw_table(con)
+    bulk_insert(con, [prices[prices["date"] < "2022-04-01"]])
+    con.execute("CREATE SCHEMA IF NOT EXISTS meta")
+    con.execute("CREATE TABLE meta.universe AS SELECT DISTINCT ticker FROM raw.prices")
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_pipeline(con)
+    return con
+
+
+def count(con, table):
+    return con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_readers_keep_their_snapshot_and_unchanged_tables_are_linked(con, prices, tmp_path):
+    root = str(tmp_path / "snapshots")
+    first = snapshot.publish(con, TABLES, root)
+    reader = snapshot.connect(root)
+    assert "gold.grades" not in snapshot.manifest(first, root)["tables"]  # not built yet: skipped
+    assert count(reader, "gold.features") == count(con, "gold.features")
+
+    bulk_insert(con, [prices[prices["date"] >= "2022-04-01"]])
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_pipeline(con)
+    second = snapshot.publish(con, TABLES, root)
+
+    assert snapshot.current(root) == second
+    tables = snapshot.manifest(second, root)["tables"]
+    assert [t for t, info in tables.items() if not info["exported"]] == ["meta.universe"]
+    ino = [os.stat(os.path.join(root, s, "meta.universe.parquet")).st_ino for s in (first, second)]
+    assert ino[0] == ino[1]
+
+    # the open reader still sees the first snapshot; a new one sees the second
+    assert count(reader, "silver.prices") < count(snapshot.connect(root), "silver.prices") == count(con, "silver.prices")
+
+
+def test_training_data_loads_from_a_snapshot(con, tmp_path):
+    root = str(tmp_path / "snapshots")
+    snapshot.publish(con, TABLES, root)
+    with contextlib.redirect_stdout(io.StringIO()):
+        live, published = (
+            load_training_data(c, generate_gold.FEATURES, passthrough=generate_gold.PASSTHROUGH,
+                               cache=FeatureCache(str(tmp_path / name)))
+            for c, name in [(con, "live"), (snapshot.connect(root), "snapshot")]
+        )
+    assert len(live.X) > 0
+    np.testing.assert_array_equal(live.X, published.X)
+    np.testing.assert_array_equal(live.y, published.y)
+
+
+def test_gc_spares_current_recent_and_kept_snapshots(con, tmp_path):
+    root = str(tmp_path / "snapshots")
+    ids = [snapshot.publish(con, ("meta.universe",), root) for _ in range(5)]
+    assert snapshot.gc(root, keep=1) == []  # all superseded too recently
+    assert snapshot.gc(root, keep=1, grace=0) == ids[:3]
+    assert snapshot.snapshots(root) == ids[3:]
@@ -0,0 +1,32 @@
+import duckdb
+
+from etl import bronze_transform
+from src import synthetic
+
+
+def test_seeded_and_prefix_stable():
+    a = synthetic.synthetic_prices(20, 300, seed=1)
+    assert a.equals(synthetic.synthetic_prices(20, 300, seed=1))
+    assert not a.equals(synthetic.synthetic_prices(20, 300, seed=2))
+
+    # a smaller universe is the first tickers of a bigger one
+    small = synthetic.synthetic_prices(5, 300, seed=1)
+    assert a.slice(0, small.num_rows).equals(small)
+
+
+def test_dirty_rows_are_cleaned_by_bronze():
+    con = duckdb.connect()
+    rows = synthetic.write_raw_prices(con, 40, 500, seed=0)
+    dupes, zero_vol, bad_px = con.execute("""
+        SELECT COUNT(*) - COUNT(DISTINCT (ticker, date)),
+               COUNT(*) FILTER (WHERE volume = 0),
+               COUNT(*) FILTER (WHERE close <= 0)
+        FROM raw.prices
+    """).fetchone()
+    assert rows > 0 and dupes > 0 and zero_vol > 0 and bad_px > 0
+
+    bronze_transform.run(con)
+    assert con.execute("""
+        SELECT COUNT(*) - COUNT(DISTINCT (ticker, date)) + COUNT(*) FILTER (WHERE volume = 0 OR close <= 0)
+        FROM bronze.prices
+    """).fetchone()[0] == 0
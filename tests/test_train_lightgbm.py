@@ -0,0 +1,77 @@
+import lightgbm as lgb
+import numpy as np
+import pytest
+from optuna.trial import TrialState
+from sklearn.model_selection import TimeSeriesSplit
+
+from etl import train_lightgbm
+from etl.train_lightgbm import DATASET_PARAMS
+from src import lgb_dataset
+
+FINISHED = (TrialState.COMPLETE, TrialState.PRUNED)
+
+
+@pytest.fixture(scope="module")
+def binary(tmp_path_factory):
+    npy = tmp_path_factory.mktemp("npy")
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 4)).astype(np.float32)
+    y = (X[:, 0] - 0.5 * X[:, 1] + 0.1 * rng.normal(size=len(X))).astype(np.float32)
+    np.save(npy / "X.npy", X)
+    np.save(npy / "y.npy", y)
+    return lgb_dataset.build(str(npy), ["f0", "f1", "f2", "f3"], DATASET_PARAMS)
+
+
+@pytest.fixture(autouse=True)
+def short_trials(monkeypatch):
+    monkeypatch.setattr(train_lightgbm, "MAX_ROUNDS", 40)
+    monkeypatch.setattr(train_lightgbm, "EARLY_STOP", 5)
+
+
+def test_folds_are_time_ordered_subsets_binned_once(binary, tmp_path, monkeypatch):
+    full = lgb_dataset.load(binary, DATASET_PARAMS)
+    folds = train_lightgbm.fold_datasets(full)
+    splits = list(TimeSeriesSplit(n_splits=train_lightgbm.N_SPLITS).split(np.arange(full.num_data())))
+    assert len(folds) == len(splits)
+    for (train, valid), (train_idx, test_idx) in zip(folds, splits):
+        np.testing.assert_array_equal(train.used_indices, train_idx)
+        np.testing.assert_array_equal(valid.used_indices, test_idx)
+        assert train.reference is full and valid.reference is full  # full's bins, not new ones
+
+    seen, train = [], lgb.train
+    monkeypatch.setattr(lgb, "train", lambda params, data, **kw: seen.append(data) or train(params, data, **kw))
+    handles = [(t._handle, v._handle) for t, v in folds]
+    study = train_lightgbm.open_study(str(tmp_path / "study.journal"))
+    study.optimize(train_lightgbm.make_objective(folds, num_threads=1), n_trials=2)
+    assert {id(d) for d in seen} <= {id(t) for t, _ in folds}
+    assert [(t._handle, v._handle) for t, v in folds] == handles  # no fold was rebuilt
+
+
+def test_rerun_resumes_the_study_up_to_n_finished_trials(binary, tmp_path):
+    path = str(tmp_path / "study.journal")
+    train_lightgbm.open_study(path)
+    train_lightgbm.worker(binary, 6, 1, path)
+    train_lightgbm.worker(binary, 8, 1, path)  # a second run resumes: 2 more trials, not 8
+
+    trials = train_lightgbm.open_study(path).get_trials(deepcopy=False)
+    assert len(trials) == 8
+    assert all(t.state in FINISHED for t in trials)
+    complete = [t for t in trials if t.state == TrialState.COMPLETE]
+    assert all(sorted(t.intermediate_values) == list(range(train_lightgbm.N_SPLITS)) for t in complete)
+    train_lightgbm.worker(binary, 8, 1, path)  # already full: nothing to do
+    assert len(train_lightgbm.open_study(path).get_trials(deepcopy=False)) == 8
+
+    assert train_lightgbm.open_study(path, fresh=True).get_trials(deepcopy=False) == []
+
+
+def test_final_booster_when_the_first_trial_wins(binary, tmp_path):
+    path = str(tmp_path / "study.journal")
+    train_lightgbm.open_study(path)
+    train_lightgbm.worker(binary, 1, 1, path)
+    study = train_lightgbm.open_study(path)
+    assert study.best_trial.number == 0
+
+    booster, params = train_lightgbm.final_booster(study, binary)
+    rounds = study.best_trial.user_attrs["num_boost_round"]
+    assert 0 < rounds <= train_lightgbm.MAX_ROUNDS
+    assert booster.num_trees() == params["num_boost_round"] == rounds